@@ -4,6 +4,25 @@ Coin Metrics API Module Includes
 
 from .base import Base
 from .community import Community
-from .utils import cm_to_pandas, normalize, csv
+from .utils import cm_to_pandas, cm_to_numpy, normalize, csv
+from .backfill import Backfill
+from .store import SeriesStore
+from .planner import QueryPlanner
+from .verify import Verifier
+from .shared import SharedCache
+from .cache import ResponseCache
+from .decode import DecodePool
+from .limiter import AdaptiveLimiter
+from .shaping import RequestShaper
+from .deadline import Deadline, Hedger
+from .resilience import ResilientCache, CircuitBreaker
+from .refresher import Refresher
+from .fixed import FixedColumn, cm_to_fixed
+from .metadata import MetadataIndex
+from .batching import InfoBatcher
+from .stats import StreamingStats
+from .correlation import IncrementalCorrelation
+from .pipeline import Pipeline
+from .bounded import BoundedBatch
 
 __version__ = '0.2.5'
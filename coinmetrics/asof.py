@@ -0,0 +1,135 @@
+"""
+Coin Metrics API As-Of Lookups
+
+Resolve many query times against a sorted series at once: for every query
+time the value of the latest point at or before it, found with one
+:samp:`numpy.searchsorted` call instead of reindexing a DataFrame. Works on
+the columnar form of :py:func:`coinmetrics.utils.cm_to_numpy`, on a panel
+from :py:func:`coinmetrics.correlation.panel`, on a memory mapped
+:py:class:`coinmetrics.binary.SeriesFile` and on a
+:py:class:`coinmetrics.store.SeriesStore` cell.
+
+.. code-block:: python
+
+  from coinmetrics.asof import lookup
+
+  data = cm.get_asset_metric_data("btc", "PriceUSD,TxCnt", "2019-01-01", "2019-12-31")
+  result = lookup(data, event_times, tolerance=86400)
+  result["values"][:, 0], result["time"][:, 0], result["found"][:, 0]
+"""
+
+from .intervals import to_epoch
+
+#: Time reported for queries without a match.
+NOT_FOUND = -2 ** 63
+
+
+def epochs(queries):
+    """
+    Convert query times to an int64 array of epoch seconds.
+
+    :param queries: Epoch seconds, :samp:`datetime64` values, timestamps or datetimes.
+    :type queries: array-like
+
+    :rtype: numpy.ndarray
+    """
+    import numpy as np
+    array = np.asarray(queries)
+    if array.dtype.kind in "iu":
+        return array.astype(np.int64)
+    if array.dtype.kind == "M":
+        return array.astype("datetime64[s]").astype(np.int64)
+    return np.array([to_epoch(query) for query in array.ravel()],
+                    dtype=np.int64).reshape(array.shape)
+
+
+def asof(times, values, queries, tolerance=None, skip_missing=True):
+    """
+    Values as of each query time.
+
+    :param times: Sorted epoch seconds of the series.
+    :type times: numpy.ndarray
+
+    :param values: Values of the series, one dimensional or (time, column). NaN for missing.
+    :type values: numpy.ndarray
+
+    :param queries: Query times, see :py:func:`epochs`.
+    :type queries: array-like
+
+    :param tolerance: Largest age in seconds of a matched point, :samp:`None` for no limit.
+    :type tolerance: int, optional
+
+    :param skip_missing: Match the latest point with a value rather than the latest point.
+    :type skip_missing: bool, optional
+
+    :return: Matched :samp:`values` (NaN without a match), matched :samp:`time`
+             (:samp:`NOT_FOUND` without a match) and the :samp:`found` mask, each
+             shaped (query) or (query, column) like :samp:`values`.
+    :rtype: dict
+    """
+    import numpy as np
+    queries = epochs(queries)
+    values = np.asarray(values, dtype=np.float64)
+    flat = values.ndim == 1
+    values = values[:, None] if flat else values
+    index = np.searchsorted(times, queries, side="right") - 1
+    if not len(values):
+        index = np.full(len(queries), -1)
+        skip_missing = False
+    if skip_missing:
+        latest = np.where(~np.isnan(values), np.arange(len(values))[:, None], -1)
+        latest = np.maximum.accumulate(latest, axis=0)
+        index = np.where(index[:, None] >= 0, latest[np.maximum(index, 0)], -1)
+    else:
+        index = np.repeat(index[:, None], values.shape[1], axis=1)
+    found = index >= 0
+    clipped = np.maximum(index, 0)
+    times = np.append(np.asarray(times, dtype=np.int64), NOT_FOUND)
+    values = np.vstack([values, np.full((1, values.shape[1]), np.nan)])
+    matched = np.where(found, times[clipped], NOT_FOUND)
+    if tolerance is not None:
+        found &= queries[:, None] - matched <= tolerance
+        matched = np.where(found, matched, NOT_FOUND)
+    result = np.where(found, values[clipped, np.arange(values.shape[1])], np.nan)
+    if flat:
+        return {"values": result[:, 0], "time": matched[:, 0], "found": found[:, 0]}
+    return {"values": result, "time": matched, "found": found}
+
+
+def lookup(data, queries, tolerance=None, skip_missing=True):
+    """
+    As-of lookup on every metric of a data object.
+
+    :param data: Object returned by
+                 :py:func:`coinmetrics.community.Community.get_asset_metric_data`, its
+                 columnar form from :py:func:`coinmetrics.utils.cm_to_numpy` or a panel.
+    :type data: dict
+
+    :return: The metric (or asset) IDs under :samp:`metrics` and (query, column)
+             arrays as in :py:func:`asof`.
+    :rtype: dict
+
+    :Parameters: See :py:func:`asof` for the other parameters.
+    """
+    from .utils import cm_to_numpy
+    if "series" in data:
+        data = cm_to_numpy(data)
+    result = asof(data["time"], data["values"], queries, tolerance, skip_missing)
+    result["metrics"] = list(data.get("metrics", data.get("assets", [])))
+    return result
+
+
+def store_series(store, asset, metric, time_agg="day"):
+    """
+    Sorted arrays of a :py:class:`coinmetrics.store.SeriesStore` cell, for
+    repeated lookups with :py:func:`asof`.
+
+    :return: Epoch and float64 value arrays.
+    :rtype: tuple
+    """
+    import numpy as np
+    points = store.get(asset, metric, NOT_FOUND, 2 ** 63 - 1, time_agg)
+    times = np.array([epoch for epoch, _ in points], dtype=np.int64)
+    values = np.array([np.nan if value is None else float(value) for _, value in points],
+                      dtype=np.float64)
+    return times, values
@@ -0,0 +1,281 @@
+"""
+Coin Metrics API Backfill Module Definitions
+
+Resumable bulk downloads built on top of :py:class:`coinmetrics.community.Community`.
+The work is planned as (asset, metric group, time window) units and every
+completed unit is recorded in a local manifest, so an interrupted backfill can
+be restarted without fetching the completed units again.
+"""
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import json
+import logging
+import os
+from .deadline import Deadline, bind, within
+from .errors import ManifestMismatchError
+from .intervals import split_range, to_epoch, to_timestamp
+
+#: A single unit of backfill work. :samp:`start` and :samp:`end` are inclusive
+#: epoch seconds and :samp:`metrics` is a tuple of metric IDs.
+BackfillUnit = namedtuple("BackfillUnit", ["asset", "metrics", "start", "end", "time_agg"])
+
+
+def unit_key(unit):
+    """
+    Build the string used to identify a unit in the manifest.
+
+    :param unit: Unit of backfill work.
+    :type unit: BackfillUnit
+
+    :return: Manifest key.
+    :rtype: str
+    """
+    return "{}|{}|{}|{}|{}".format(unit.asset, ",".join(unit.metrics),
+                                   unit.start, unit.end, unit.time_agg)
+
+
+class Backfill:
+    """
+    Coin Metrics API Backfill Object
+    """
+
+    # pylint: disable=R0902,R0913
+
+    def __init__(self, community, manifest, assets=None, metrics=None, start=None,
+                 end=None, time_agg="day", group_size=10, window=365, workers=4, shaper=None):
+        """
+        Initialize a backfill job. Anything left unspecified defaults to the
+        full catalog: every asset from :py:func:`get_assets`, every metric from
+        :py:func:`get_asset_metrics` and the asset's full coverage range.
+
+        :param community: API object used for all requests.
+        :type community: coinmetrics.community.Community
+
+        :param manifest: Path of the checkpoint manifest.
+        :type manifest: str
+
+        :param assets: Asset IDs to backfill.
+        :type assets: list, optional
+
+        :param metrics: Metric IDs to backfill. Metrics an asset does not carry are skipped.
+        :type metrics: list, optional
+
+        :param start: Start of time inverval.
+        :type start: str or datetime, optional
+
+        :param end: End of time inverval.
+        :type end: str or datetime, optional
+
+        :param time_agg: Interval the time is descritized into: day, hour.
+        :type time_agg: str, optional
+
+        :param group_size: Maximum number of metrics fetched per request.
+        :type group_size: int, optional
+
+        :param window: Maximum number of points per metric fetched per request.
+        :type window: int, optional
+
+        :param workers: Number of concurrent requests.
+        :type workers: int, optional
+
+        :param shaper: When given, time ranges are clamped to each asset's coverage and
+                       windows are sized by the shaper instead of :samp:`window`.
+        :type shaper: coinmetrics.shaping.RequestShaper, optional
+        """
+        self.logger = logging.getLogger(__name__)
+        self.community = community
+        self.manifest = manifest
+        self.assets = assets
+        self.metrics = metrics
+        self.start = start
+        self.end = end
+        self.time_agg = time_agg
+        self.group_size = group_size
+        self.window = window
+        self.workers = workers
+        self.shaper = shaper
+        self.units = None
+        self.completed = set()
+        self.deadline = None
+
+    def plan(self):
+        """
+        Build the list of units for this job. The catalog is only queried
+        once: after that the plan is read back from the manifest so that a
+        resumed job works on exactly the same units. The manifest records the
+        job's parameters, and resuming it with different ones raises
+        :samp:`ManifestMismatchError` instead of silently working on the old plan.
+
+        :return: All units of the job, completed or not.
+        :rtype: list of BackfillUnit
+        """
+        if self.units is None:
+            self._load()
+        if self.units is None:
+            self.units = self._build_plan()
+            self._append({"plan": [list(unit) for unit in self.units], "job": self.job()})
+        return self.units
+
+    def job(self):
+        """
+        Describe the parameters that decide the plan, as recorded in the manifest.
+
+        :return: JSON encodable job parameters.
+        :rtype: dict
+        """
+        return {"assets": list(self.assets) if self.assets is not None else None,
+                "metrics": list(self.metrics) if self.metrics is not None else None,
+                "start": to_epoch(self.start) if self.start is not None else None,
+                "end": to_epoch(self.end) if self.end is not None else None,
+                "time_agg": self.time_agg, "group_size": self.group_size,
+                "window": None if self.shaper is not None else self.window}
+
+    def pending(self):
+        """
+        List the units that have not been completed yet.
+
+        :return: Units still to be fetched.
+        :rtype: list of BackfillUnit
+        """
+        return [unit for unit in self.plan() if unit_key(unit) not in self.completed]
+
+    def run(self, handler, deadline=None):
+        """
+        Fetch every pending unit. :samp:`handler` is called from the calling
+        thread as :samp:`handler(unit, data)` once per unit, with the
+        :samp:`metricData` object returned by :py:func:`get_asset_metric_data`.
+        A unit is only recorded as completed once its handler returned, and
+        failed units are left pending for the next run. When the handler
+        raises, the units not yet fetched are cancelled and the error is raised.
+
+        :param handler: Callback receiving each fetched unit.
+        :type handler: callable
+
+        :param deadline: Seconds the whole run may take. Units not started in time,
+                         or after :py:func:`cancel`, fail and stay pending.
+        :type deadline: float, optional
+
+        :return: Number of completed units and the units that failed.
+        :rtype: dict
+        """
+        pending = self.pending()
+        self.logger.info("Backfill: %s of %s units pending.", len(pending), len(self.units))
+        failed = []
+        self.deadline = Deadline(deadline)
+        with within(self.deadline), ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(bind(self.fetch), unit): unit for unit in pending}
+            for future in as_completed(futures):
+                unit = futures[future]
+                try:
+                    data = future.result()
+                except Exception as error:  # pylint: disable=W0703
+                    self.logger.warning("Backfill unit failed '%s': %s", unit_key(unit), error)
+                    failed.append(unit)
+                    continue
+                try:
+                    handler(unit, data)
+                except BaseException:
+                    self.deadline.cancel()
+                    for other in futures:
+                        other.cancel()
+                    raise
+                self._complete(unit)
+        return {"completed": len(pending) - len(failed), "failed": failed}
+
+    def cancel(self):
+        """
+        Stop a running job: units that have not started fail and stay pending.
+        """
+        if self.deadline is not None:
+            self.deadline.cancel()
+
+    def fetch(self, unit):
+        """
+        Fetch the data for a single unit.
+
+        :param unit: Unit of backfill work.
+        :type unit: BackfillUnit
+
+        :return: Coin Metrics API data object.
+        :rtype: dict
+        """
+        return self.community.get_asset_metric_data(unit.asset, ",".join(unit.metrics),
+                                                    to_timestamp(unit.start),
+                                                    to_timestamp(unit.end), unit.time_agg)
+
+    def _build_plan(self):
+        """
+        Query the catalog and split it into units.
+        """
+        units = []
+        catalog = self.community.get_asset_info(",".join(self.assets)
+                                                if self.assets is not None else "")
+        infos = {info["id"]: info for info in catalog}
+        if self.shaper is not None:
+            with self.shaper.lock:
+                for asset, info in infos.items():
+                    self.shaper.infos.setdefault(asset, info)
+        for asset in self.assets if self.assets is not None else list(infos):
+            info = infos[asset]
+            metrics = [metric for metric in info["metrics"]
+                       if self.metrics is None or metric in self.metrics]
+            groups = [tuple(metrics[i:i + self.group_size])
+                      for i in range(0, len(metrics), self.group_size)]
+            if self.shaper is not None:
+                for group in groups:
+                    for _, low, high in self.shaper.shape(asset, ",".join(group), self.start,
+                                                          self.end, self.time_agg):
+                        units.append(BackfillUnit(asset, group, low, high, self.time_agg))
+                continue
+            start = self.start if self.start is not None else info["minTime"]
+            end = self.end if self.end is not None else info["maxTime"]
+            if not metrics or to_epoch(start) > to_epoch(end):
+                continue
+            for low, high in split_range(start, end, self.window, self.time_agg):
+                for group in groups:
+                    units.append(BackfillUnit(asset, group, low, high, self.time_agg))
+        self.logger.debug("Backfill planned %s units.", len(units))
+        return units
+
+    def _load(self):
+        """
+        Read the plan and the completed units back from the manifest. The
+        manifest is an append-only JSON lines file, so a truncated last
+        line left by a crash is ignored.
+        """
+        job = self.job()
+        if not os.path.exists(self.manifest):
+            return
+        with open(self.manifest) as manifest:
+            for line in manifest:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if "plan" in record:
+                    if record.get("job") != job:
+                        raise ManifestMismatchError(
+                            "Manifest '{}' was planned for {}, not {}.".format(
+                                self.manifest, record.get("job"), job))
+                    self.units = [BackfillUnit(asset, tuple(metrics), start, end, time_agg)
+                                  for asset, metrics, start, end, time_agg in record["plan"]]
+                elif "done" in record:
+                    self.completed.add(record["done"])
+
+    def _complete(self, unit):
+        """
+        Record a unit as completed.
+        """
+        key = unit_key(unit)
+        self.completed.add(key)
+        self._append({"done": key})
+
+    def _append(self, record):
+        """
+        Append a record to the manifest and flush it to disk.
+        """
+        with open(self.manifest, "a") as manifest:
+            manifest.write(json.dumps(record) + "\n")
+            manifest.flush()
+            os.fsync(manifest.fileno())
@@ -3,11 +3,13 @@ Coin Metrics API Base Module Definitions
 """
 
 from decimal import Decimal
+import functools
 import json
 import logging
 import urllib.parse
 import requests
 from dateutil import parser
+from . import deadline
 from .errors import (InvalidAssetError, InvalidTimeRangeError,
                      InvalidMetricError, InvalidExchangeError, InvalidMarketError)
 
@@ -15,6 +17,8 @@ class Base:
     """
     Coin Metrics API Base Object
     """
+    # pylint: disable=R0902
+
     def __init__(self, api_key=""):
         """
         Initialize API to use the Base API endpoints by default.
@@ -26,6 +30,18 @@ class Base:
         self.logger = logging.getLogger(__name__)
         self.host_url = 'https://community-api.coinmetrics.io/v2/'
         self.headers = {"api_key": api_key} if api_key != '' else {}
+        #: Optional :py:class:`coinmetrics.cache.ResponseCache` shared by all queries.
+        self.cache = None
+        #: Optional :py:class:`coinmetrics.limiter.AdaptiveLimiter` bounding upstream requests.
+        self.limiter = None
+        #: Optional :py:class:`coinmetrics.deadline.Hedger` duplicating slow requests.
+        self.hedger = None
+        #: Optional :py:class:`coinmetrics.resilience.CircuitBreaker` guarding the upstream.
+        self.breaker = None
+        #: Optional :py:class:`coinmetrics.metadata.MetadataIndex` the checkers validate against.
+        self.metadata = None
+        #: (connect, read) timeout in seconds, shortened by any active deadline.
+        self.timeout = (3.05, 60)
 
     def _api_query(self, endpoint, options=None):
         """
@@ -46,12 +62,73 @@ class Base:
         self.logger.debug("Endpoint: '%s'", endpoint)
         self.logger.debug("Options: '%s'", str(options))
         self.logger.debug("Headers: '%s'", str(self.headers))
-        encoded_options = urllib.parse.urlencode(options if options is not None else {})
-        request_url = self.host_url + endpoint + '?' + encoded_options
+        request_url = self._request_url(endpoint, options)
         self.logger.debug("Request URL: '%s'", str(request_url))
-        response = requests.get(request_url, headers=self.headers).content.decode('utf-8')
+        _, response = self._get(request_url)
+        return json.loads(response.decode('utf-8'), parse_float=Decimal, parse_int=Decimal)
+
+    def _request_url(self, endpoint, options=None):
+        """
+        Build the complete request URL for an endpoint.
+
+        :return: Request URL.
+        :rtype: str
+        """
+        encoded_options = urllib.parse.urlencode(options if options is not None else {})
+        return self.host_url + endpoint + '?' + encoded_options
+
+    def _get(self, request_url):
+        """
+        Fetch a request URL through the response cache when one is set.
+
+        :param request_url: Complete request URL.
+        :type request_url: str
+
+        :return: HTTP status code and raw response body.
+        :rtype: tuple
+        """
+        if self.cache is None:
+            return self._send(request_url)
+        return self.cache.get_or_fetch(request_url, lambda: self._send(request_url))
+
+    def _send(self, request_url):
+        """
+        Send a request upstream through the circuit breaker, the concurrency
+        limiter and the hedger when they are set.
+
+        :param request_url: Complete request URL.
+        :type request_url: str
+
+        :return: HTTP status code and raw response body.
+        :rtype: tuple
+
+        :raises: DeadlineExceededError, RequestCancelledError, CircuitOpenError
+        """
+        if deadline.current() is not None:
+            deadline.current().check()
+        fetch = self._fetch
+        if self.limiter is not None:
+            fetch = functools.partial(self.limiter.call, fetch)
+        if self.breaker is not None:
+            fetch = functools.partial(self.breaker.call, fetch)
+        if self.hedger is not None:
+            return self.hedger.call(fetch, request_url)
+        return fetch(request_url)
+
+    def _fetch(self, request_url):
+        """
+        Send a request upstream.
+
+        :param request_url: Complete request URL.
+        :type request_url: str
+
+        :return: HTTP status code and raw response body.
+        :rtype: tuple
+        """
+        response = requests.get(request_url, headers=self.headers,
+                                timeout=deadline.timeout(self.timeout))
         self.logger.debug("API query sent.")
-        return json.loads(response, parse_float=Decimal, parse_int=Decimal)
+        return response.status_code, response.content
 
     def get_assets(self):
         """
@@ -77,7 +154,10 @@ class Base:
         """
         self.logger.debug("Checking assets: '%s'", assets)
         assets = assets.split(",")
-        reference = self.get_assets()
+        if self.metadata is None:
+            reference = self.get_assets()
+        else:
+            reference = self.metadata.catalogs["assets"]
         for asset in assets:
             if asset in reference:
                 pass
@@ -108,7 +188,10 @@ class Base:
         """
         self.logger.debug("Checking metrics: '%s'", metrics)
         metrics = metrics.split(",")
-        reference = self.get_metrics()
+        if self.metadata is None:
+            reference = self.get_metrics()
+        else:
+            reference = self.metadata.catalogs["metrics"]
         for metric in metrics:
             if metric in reference:
                 pass
@@ -139,7 +222,10 @@ class Base:
         """
         self.logger.debug("Checking exchanges: '%s'", exchanges)
         exchanges = exchanges.split(",")
-        reference = self.get_exchanges()
+        if self.metadata is None:
+            reference = self.get_exchanges()
+        else:
+            reference = self.metadata.catalogs["exchanges"]
         for exchange in exchanges:
             if exchange in reference:
                 pass
@@ -170,7 +256,10 @@ class Base:
         """
         self.logger.debug("Checking markets: '%s'", markets)
         markets = markets.split(",")
-        reference = self.get_markets()
+        if self.metadata is None:
+            reference = self.get_markets()
+        else:
+            reference = self.metadata.catalogs["markets"]
         for market in markets:
             if market in reference:
                 pass
@@ -0,0 +1,165 @@
+"""
+Coin Metrics API Batched Info Fetching
+
+The :samp:`*_info` methods send the whole :samp:`subset` in one URL and
+validate it with a checker that downloads the catalog first. For long
+subsets :samp:`InfoBatcher` validates against a catalog fetched once per
+batcher (or the API object's :py:class:`coinmetrics.metadata.MetadataIndex`),
+splits the subset into groups whose URL stays under a length limit, fetches
+the groups concurrently and merges the results in the requested order.
+
+.. code-block:: python
+
+  batcher = coinmetrics.InfoBatcher(cm)
+  markets = batcher.market_info(cm.get_markets())
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import threading
+import urllib.parse
+from .deadline import bind
+from .errors import (InvalidAssetError, InvalidExchangeError, InvalidMarketError,
+                     InvalidMetricError)
+
+#: For each catalog: info endpoint, response key, method listing the IDs and error raised.
+ENDPOINTS = {
+    "assets": ("asset_info", "assetsInfo", "get_assets", InvalidAssetError),
+    "exchanges": ("exchange_info", "exchangesInfo", "get_exchanges", InvalidExchangeError),
+    "markets": ("market_info", "marketsInfo", "get_markets", InvalidMarketError),
+    "metrics": ("metric_info", "metricsInfo", "get_metrics", InvalidMetricError),
+}
+
+
+class InfoBatcher:
+    """
+    Coin Metrics API Batched Info Object
+    """
+    def __init__(self, community, max_length=2000, workers=8):
+        """
+        :param community: API object used for all requests.
+        :type community: coinmetrics.community.Community
+
+        :param max_length: Longest request URL sent, in characters.
+        :type max_length: int, optional
+
+        :param workers: Number of concurrent requests.
+        :type workers: int, optional
+        """
+        self.logger = logging.getLogger(__name__)
+        self.community = community
+        self.max_length = max_length
+        self.workers = workers
+        self.catalogs = {}
+        self.lock = threading.Lock()
+
+    def catalog(self, kind):
+        """
+        IDs of a catalog, from the metadata index when the API object has one,
+        otherwise fetched once per batcher.
+
+        :param kind: One of :samp:`assets`, :samp:`exchanges`, :samp:`markets`, :samp:`metrics`.
+        :type kind: str
+
+        :return: Valid IDs, as a set or the index's dict keyed by ID.
+        :rtype: collection
+        """
+        if self.community.metadata is not None:
+            return self.community.metadata.catalogs[kind]
+        with self.lock:
+            if kind not in self.catalogs:
+                self.catalogs[kind] = set(getattr(self.community, ENDPOINTS[kind][2])())
+            return self.catalogs[kind]
+
+    def groups(self, endpoint, ids):
+        """
+        Split IDs into subsets whose request URL fits in :samp:`max_length`.
+
+        :param endpoint: Info endpoint.
+        :type endpoint: str
+
+        :param ids: IDs to split.
+        :type ids: list
+
+        :return: Comma separated subsets, in order.
+        :rtype: list of str
+        """
+        # pylint: disable=W0212
+        budget = self.max_length - len(self.community._request_url(endpoint, {"subset": ""}))
+        groups, group, length = [], [], 0
+        for key in ids:
+            size = len(urllib.parse.quote_plus(key)) + (3 if group else 0)
+            if group and length + size > budget:
+                groups.append(",".join(group))
+                group, length = [], 0
+                size -= 3
+            group.append(key)
+            length += size
+        if group:
+            groups.append(",".join(group))
+        return groups
+
+    def fetch(self, kind, ids):
+        """
+        Fetch information objects for a list of IDs.
+
+        :param kind: One of :samp:`assets`, :samp:`exchanges`, :samp:`markets`, :samp:`metrics`.
+        :type kind: str
+
+        :param ids: IDs, as a list or a comma separated string. Duplicates are fetched once.
+        :type ids: list or str
+
+        :return: Information objects in the order of :samp:`ids`.
+        :rtype: list of dict
+
+        :raises: InvalidAssetError, InvalidExchangeError, InvalidMarketError, InvalidMetricError
+        """
+        endpoint, key, _, error = ENDPOINTS[kind]
+        ids = ids.split(",") if isinstance(ids, str) else list(ids)
+        catalog = self.catalog(kind)
+        for item in ids:
+            if item not in catalog:
+                raise error("Invalid {}: '{}'".format(kind[:-1], item))
+        unique = list(dict.fromkeys(ids))
+        groups = self.groups(endpoint, unique)
+        self.logger.debug("Fetching %s %s in %s requests.", len(unique), kind, len(groups))
+
+        def query(subset):
+            # pylint: disable=W0212
+            return self.community._api_query(endpoint, {"subset": subset})[key]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(bind(query), groups))
+        infos = {info["id"]: info for result in results for info in result}
+        return [infos[item] for item in ids if item in infos]
+
+    def asset_info(self, assets):
+        """
+        Batched :py:func:`coinmetrics.community.Community.get_asset_info`.
+
+        :rtype: list of dict
+        """
+        return self.fetch("assets", assets)
+
+    def exchange_info(self, exchanges):
+        """
+        Batched :py:func:`coinmetrics.community.Community.get_exchange_info`.
+
+        :rtype: list of dict
+        """
+        return self.fetch("exchanges", exchanges)
+
+    def market_info(self, markets):
+        """
+        Batched :py:func:`coinmetrics.community.Community.get_market_info`.
+
+        :rtype: list of dict
+        """
+        return self.fetch("markets", markets)
+
+    def metric_info(self, metrics):
+        """
+        Batched :py:func:`coinmetrics.community.Community.get_metric_info`.
+
+        :rtype: list of dict
+        """
+        return self.fetch("metrics", metrics)
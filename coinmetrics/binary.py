@@ -0,0 +1,198 @@
+"""
+Coin Metrics API Binary Series Files
+
+A compact on-disk format for a single (asset, metric, time_agg) series: a
+sorted int64 epoch column and a float64 value column, each stored in its own
+file behind a small header and memory-mapped on read. Time range reads use a
+binary search over the epoch column and return views into the mapping, so
+reading a month from a ten year hourly series only touches a few pages.
+
+File layout, for both :samp:`<path>.time` and :samp:`<path>.value`::
+
+    bytes 0-7      magic b"CMSERIES"
+    bytes 8-255    JSON schema padded with spaces:
+                   {"version", "column", "dtype", "asset", "metric", "time_agg"}
+    bytes 256-     little endian column data
+"""
+
+import json
+import os
+
+MAGIC = b"CMSERIES"
+HEADER_SIZE = 256
+VERSION = 1
+COLUMNS = {"time": "<i8", "value": "<f8"}
+
+
+def _header(schema):
+    """
+    Encode a column header.
+    """
+    body = json.dumps(schema).encode("utf-8")
+    if len(MAGIC) + len(body) > HEADER_SIZE:
+        raise ValueError("Series schema does not fit in the header.")
+    return MAGIC + body.ljust(HEADER_SIZE - len(MAGIC))
+
+
+def _read_header(path):
+    """
+    Decode a column header.
+    """
+    with open(path, "rb") as column:
+        raw = column.read(HEADER_SIZE)
+    if len(raw) != HEADER_SIZE or not raw.startswith(MAGIC):
+        raise ValueError("Not a binary series file: '{}'".format(path))
+    return json.loads(raw[len(MAGIC):].decode("utf-8"))
+
+
+class SeriesFile:
+    """
+    Coin Metrics API Binary Series File Object
+    """
+    def __init__(self, path, asset=None, metric=None, time_agg="day"):
+        """
+        Open a series, creating it when it does not exist yet.
+
+        :param path: Path prefix of the two column files.
+        :type path: str
+
+        :param asset: Unique ID corresponding to the asset's ticker. Required to create.
+        :type asset: str, optional
+
+        :param metric: Unique ID corresponding to the metric. Required to create.
+        :type metric: str, optional
+
+        :param time_agg: Interval the time is descritized into: day, hour.
+        :type time_agg: str, optional
+        """
+        self.path = path
+        if not os.path.exists(path + ".time"):
+            if asset is None or metric is None:
+                raise ValueError("asset and metric are required to create a series.")
+            for column, dtype in COLUMNS.items():
+                with open("{}.{}".format(path, column), "wb") as output:
+                    output.write(_header({"version": VERSION, "column": column,
+                                          "dtype": dtype, "asset": asset,
+                                          "metric": metric, "time_agg": time_agg}))
+        self.schema = _read_header(path + ".time")
+        if self.schema["version"] != VERSION:
+            raise ValueError("Unsupported series version: {}".format(self.schema["version"]))
+        self.times, self.values = self._map()
+
+    def _map(self):
+        """
+        (Re)create the memory mappings after the files changed size.
+
+        :return: Time and value arrays.
+        :rtype: tuple
+        """
+        import numpy as np
+        sizes = [(os.path.getsize("{}.{}".format(self.path, column)) - HEADER_SIZE) // 8
+                 for column in COLUMNS]
+        count = min(sizes)  # An interrupted append may have left one column longer.
+        mapped = {}
+        for column, dtype in COLUMNS.items():
+            if count:
+                mapped[column] = np.memmap("{}.{}".format(self.path, column), dtype=dtype,
+                                           mode="r", offset=HEADER_SIZE, shape=(count,))
+            else:
+                mapped[column] = np.empty(0, dtype=dtype)
+        return mapped["time"], mapped["value"]
+
+    def __len__(self):
+        return len(self.times)
+
+    def append(self, times, values):
+        """
+        Append points to the end of the series.
+
+        :param times: Epoch seconds, strictly increasing and after the last stored point.
+        :type times: array-like of int
+
+        :param values: Values, NaN for missing.
+        :type values: array-like of float
+
+        :raises: ValueError
+        """
+        import numpy as np
+        times = np.ascontiguousarray(times, dtype=COLUMNS["time"])
+        values = np.ascontiguousarray(values, dtype=COLUMNS["value"])
+        if times.shape != values.shape or times.ndim != 1:
+            raise ValueError("times and values must be one dimensional and of equal length.")
+        if not len(times):
+            return
+        if np.any(np.diff(times) <= 0) or (len(self) and times[0] <= self.times[-1]):
+            raise ValueError("Appended times must be increasing and after the last point.")
+        count = len(self)
+        for column, data in (("value", values), ("time", times)):
+            with open("{}.{}".format(self.path, column), "r+b") as output:
+                output.seek(HEADER_SIZE + count * 8)
+                output.truncate()
+                output.write(data.tobytes())
+        self.times, self.values = self._map()
+
+    def range(self, start, end):
+        """
+        Read the points within an inclusive time range.
+
+        :param start: Start of time inverval in epoch seconds.
+        :type start: int
+
+        :param end: End of time inverval in epoch seconds.
+        :type end: int
+
+        :return: Epoch and value arrays, both views into the memory mapping.
+        :rtype: tuple
+        """
+        import numpy as np
+        low = int(np.searchsorted(self.times, start, side="left"))
+        high = int(np.searchsorted(self.times, end, side="right"))
+        return self.times[low:high], self.values[low:high]
+
+    def asof(self, queries, tolerance=None, skip_missing=True):
+        """
+        Values as of each query time, searched directly in the memory mapping.
+
+        :return: See :py:func:`coinmetrics.asof.asof`.
+        :rtype: dict
+
+        :Parameters: See :py:func:`coinmetrics.asof.asof`.
+        """
+        from .asof import asof
+        return asof(self.times, self.values, queries, tolerance, skip_missing)
+
+
+def write_metric_data(directory, asset, data, time_agg="day"):
+    """
+    Append a Coin Metrics API data object to one series file per metric
+    named :samp:`<asset>.<metric>.<time_agg>`. Points at or before the last
+    stored point of a series are skipped.
+
+    :param directory: Directory holding the series files.
+    :type directory: str
+
+    :param asset: Unique ID corresponding to the asset's ticker.
+    :type asset: str
+
+    :param data: Coin Metrics API data object.
+    :type data: dict
+
+    :param time_agg: Interval the time is descritized into: day, hour.
+    :type time_agg: str, optional
+
+    :return: Series file for each metric.
+    :rtype: dict
+    """
+    from .utils import cm_to_numpy
+    columnar = cm_to_numpy(data)
+    os.makedirs(directory, exist_ok=True)
+    series = {}
+    for i, metric in enumerate(columnar["metrics"]):
+        path = os.path.join(directory, "{}.{}.{}".format(asset, metric, time_agg))
+        series[metric] = SeriesFile(path, asset, metric, time_agg)
+        times, values = columnar["time"], columnar["values"][:, i]
+        if len(series[metric]):
+            keep = times > series[metric].times[-1]
+            times, values = times[keep], values[keep]
+        series[metric].append(times, values)
+    return series
@@ -0,0 +1,203 @@
+"""
+Coin Metrics API Memory-Bounded Batches
+
+Fetches many :py:func:`coinmetrics.community.Community.get_asset_metric_data`
+requests concurrently while capping the memory their results take. Every
+request reserves its estimated size from a byte budget before it is sent,
+and keeps it until the caller is done with the result, so fetches in flight
+and results waiting to be consumed never exceed the budget together. Results
+are handed over as they complete, through a callback or an iterator.
+
+Sizes are estimated with :py:func:`coinmetrics.shaping.RequestShaper.estimate`
+using the in-memory size of parsed rows, and the reservation is corrected to
+the actual row count once a response arrives.
+
+.. code-block:: python
+
+  batch = coinmetrics.BoundedBatch(cm, max_bytes=512 * 2 ** 20, workers=8)
+  for request, data in batch.iterate(requests):
+      process(data)
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import queue
+import threading
+from .deadline import bind
+from .intervals import step, to_epoch
+from .shaping import RequestShaper
+
+
+class _Budget:
+    """
+    Byte budget shared by the requests of a batch.
+    """
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self.peak = 0
+        self.condition = threading.Condition()
+
+    def acquire(self, size, stopped):
+        """
+        Reserve bytes, blocking until they fit. A request larger than the
+        whole budget proceeds alone. Returns false when the batch stopped.
+        """
+        with self.condition:
+            while self.used and self.used + size > self.limit and not stopped.is_set():
+                self.condition.wait()
+            if stopped.is_set():
+                return False
+            self._add(size)
+            return True
+
+    def _add(self, size):
+        self.used += size
+        self.peak = max(self.peak, self.used)
+
+    def adjust(self, size):
+        """
+        Change a reservation by :samp:`size` bytes, releasing when negative.
+        """
+        with self.condition:
+            self._add(size)
+            self.condition.notify_all()
+
+    def wake(self):
+        """
+        Wake every waiting request.
+        """
+        with self.condition:
+            self.condition.notify_all()
+
+
+class BoundedBatch:
+    """
+    Coin Metrics API Memory-Bounded Batch Object
+    """
+    # pylint: disable=R0913
+
+    def __init__(self, community, max_bytes=256 * 2 ** 20, workers=8, shaper=None):
+        """
+        :param community: API object used for all requests.
+        :type community: coinmetrics.community.Community
+
+        :param max_bytes: Estimated bytes of results in flight and waiting to be consumed.
+        :type max_bytes: int, optional
+
+        :param workers: Number of concurrent requests.
+        :type workers: int, optional
+
+        :param shaper: Size estimator, defaults to one sized for parsed rows (about 350
+                       bytes per row and 110 bytes per :samp:`Decimal` value).
+        :type shaper: coinmetrics.shaping.RequestShaper, optional
+        """
+        self.logger = logging.getLogger(__name__)
+        self.community = community
+        self.max_bytes = max_bytes
+        self.workers = workers
+        self.shaper = shaper if shaper is not None else \
+            RequestShaper(community, row_bytes=350, value_bytes=110)
+        #: (request, error) pairs of the requests that failed in the last batch.
+        self.failed = []
+        #: Largest number of bytes reserved at once during the last batch.
+        self.peak = 0
+
+    def estimate(self, request):
+        """
+        Estimate the size of a request's result from its time range and metric count.
+
+        :param request: (asset, metrics, start, end[, time_agg]) tuple.
+        :type request: tuple
+
+        :return: Estimated size in bytes.
+        :rtype: int
+        """
+        _, metrics, start, end, time_agg = (tuple(request) + ("day",))[:5]
+        rows = max((to_epoch(end) - to_epoch(start)) // step(time_agg) + 1, 0)
+        return self.shaper.estimate(rows, len(metrics.split(",")))
+
+    def iterate(self, requests):
+        """
+        Fetch requests concurrently and yield the results as they complete.
+        A result's memory is released from the budget when the next one is
+        requested, so keep only what is needed from each. Failed requests
+        are logged and recorded in :samp:`failed`.
+
+        :param requests: (asset, metrics, start, end[, time_agg]) tuples, for instance
+                         from :py:func:`coinmetrics.pipeline.Pipeline.plan`.
+        :type requests: list of tuple
+
+        :return: Iterator of (request, data) pairs in completion order.
+        :rtype: iterator
+        """
+        requests = list(requests)
+        budget = _Budget(self.max_bytes)
+        stopped = threading.Event()
+        results = queue.Queue()
+        self.failed = []
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        dispatcher = threading.Thread(target=bind(self._dispatch), daemon=True,
+                                      args=(requests, executor, budget, stopped, results))
+        dispatcher.start()
+        try:
+            for _ in requests:
+                request, data, size, error = results.get()
+                if error is not None:
+                    self.logger.warning("Batch request failed %s: %s", request, error)
+                    self.failed.append((request, error))
+                if data is not None:
+                    yield request, data
+                budget.adjust(-size)
+        finally:
+            stopped.set()
+            budget.wake()
+            dispatcher.join()
+            executor.shutdown(wait=True)
+            self.peak = budget.peak
+
+    def run(self, requests, callback):
+        """
+        Fetch requests concurrently and pass each result to :samp:`callback`
+        as :samp:`callback(request, data)` from the calling thread as it completes.
+
+        :param requests: See :py:func:`iterate`.
+        :type requests: list of tuple
+
+        :param callback: Function receiving each result.
+        :type callback: callable
+
+        :return: Number of completed requests and the failed (request, error) pairs.
+        :rtype: dict
+        """
+        completed = 0
+        for request, data in self.iterate(requests):
+            callback(request, data)
+            completed += 1
+        return {"completed": completed, "failed": self.failed}
+
+    def _dispatch(self, requests, executor, budget, stopped, results):
+        """
+        Submit requests as their estimated size fits in the budget.
+        """
+        fetch = bind(self._fetch)
+        for request in requests:
+            size = self.estimate(request)
+            if not budget.acquire(size, stopped):
+                results.put((request, None, 0, None))
+                continue
+            executor.submit(fetch, request, size, budget, results)
+
+    def _fetch(self, request, size, budget, results):
+        """
+        Fetch one request and correct its reservation to the actual row count.
+        """
+        asset, metrics, start, end, time_agg = (tuple(request) + ("day",))[:5]
+        try:
+            data = self.community.get_asset_metric_data(asset, metrics, start, end, time_agg)
+        except Exception as error:  # pylint: disable=W0703
+            results.put((request, None, size, error))
+            return
+        actual = self.shaper.estimate(len(data["series"]), len(data["metrics"]))
+        budget.adjust(actual - size)
+        results.put((request, data, actual, None))
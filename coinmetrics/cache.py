@@ -0,0 +1,143 @@
+"""
+Coin Metrics API Response Cache
+
+An in-process cache of raw API responses keyed by request URL. Concurrent
+requests for the same URL are coalesced: the first caller fetches while the
+others wait for its result, so each unique query is sent upstream once.
+
+Enable it on any API object with:
+
+.. code-block:: python
+
+  cm = coinmetrics.Community()
+  cm.cache = coinmetrics.ResponseCache(ttl=300)
+"""
+
+from collections import OrderedDict
+import logging
+import threading
+import time
+
+
+class _Flight:
+    """
+    A fetch in progress that other callers can wait for.
+    """
+    # pylint: disable=R0903
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class ResponseCache:
+    """
+    Coin Metrics API Response Cache Object
+    """
+    # pylint: disable=R0902
+
+    def __init__(self, ttl=300, max_entries=1024):
+        """
+        :param ttl: Seconds a response is served from the cache. :samp:`None` never expires.
+        :type ttl: int, optional
+
+        :param max_entries: Number of responses kept, least recently used are evicted first.
+        :type max_entries: int, optional
+        """
+        self.logger = logging.getLogger(__name__)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.flights = {}
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key):
+        """
+        Read a cached response regardless of its age.
+
+        :param key: Request URL.
+        :type key: str
+
+        :return: (status, body, age in seconds), or :samp:`None` when not cached.
+        :rtype: tuple
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+            stored, status, body = entry
+        return status, body, time.time() - stored
+
+    def store(self, key, status, body):
+        """
+        Cache a response. Only successful responses are kept.
+
+        :param key: Request URL.
+        :type key: str
+
+        :param status: HTTP status code.
+        :type status: int
+
+        :param body: Raw response body.
+        :type body: bytes
+        """
+        if status != 200:
+            return
+        with self.lock:
+            self.entries[key] = (time.time(), status, body)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def get_or_fetch(self, key, fetch):
+        """
+        Return a fresh cached response or fetch it, coalescing concurrent
+        fetches of the same key.
+
+        :param key: Request URL.
+        :type key: str
+
+        :param fetch: Called without arguments, returns (status, body).
+        :type fetch: callable
+
+        :return: (status, body)
+        :rtype: tuple
+        """
+        cached = self.lookup(key)
+        if cached is not None and (self.ttl is None or cached[2] < self.ttl):
+            self.hits += 1
+            return cached[0], cached[1]
+        with self.lock:
+            flight = self.flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.flights[key] = _Flight()
+        if not leader:
+            self.logger.debug("Coalescing request: '%s'", key)
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        self.misses += 1
+        try:
+            flight.result = fetch()
+            self.store(key, *flight.result)
+            return flight.result
+        except Exception as error:
+            flight.error = error
+            raise
+        finally:
+            with self.lock:
+                del self.flights[key]
+            flight.done.set()
+
+    def clear(self):
+        """
+        Remove every cached response.
+        """
+        with self.lock:
+            self.entries.clear()
@@ -0,0 +1,175 @@
+"""
+Coin Metrics API Command Line Interface
+
+Usage Examples::
+
+    coinmetrics export --assets btc,eth --metrics PriceUSD,TxCnt \\
+        --start 2015-01-01 --end 2019-12-31 --format ndjson --output prices.ndjson
+
+    # Continue an interrupted export.
+    coinmetrics export ... --resume
+
+    # Share one response cache across a team.
+    coinmetrics proxy --host 0.0.0.0 --port 8080
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from .backfill import Backfill
+from .cache import ResponseCache
+from .community import Community
+from .errors import ManifestMismatchError
+from .proxy import ProxyServer
+from .shaping import RequestShaper
+from .sinks import SINKS
+
+
+def parse_args(argv=None):
+    """
+    Parse the command line arguments.
+
+    :param argv: Arguments, defaults to :samp:`sys.argv[1:]`.
+    :type argv: list, optional
+
+    :return: Parsed arguments.
+    :rtype: argparse.Namespace
+    """
+    parser = argparse.ArgumentParser(prog="coinmetrics",
+                                     description="Coin Metrics API command line interface.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Enable debug logging.")
+    commands = parser.add_subparsers(dest="command")
+    commands.required = True
+
+    export_parser = commands.add_parser("export", help="Export asset metric data to a file.")
+    export_parser.add_argument("--assets", help="Comma delimited asset IDs (default: all).")
+    export_parser.add_argument("--metrics", help="Comma delimited metric IDs (default: all).")
+    export_parser.add_argument("--start",
+                               help="Start of time interval (default: asset coverage).")
+    export_parser.add_argument("--end",
+                               help="End of time interval (default: asset coverage).")
+    export_parser.add_argument("--time-agg", default="day", choices=["day", "hour"],
+                               help="Interval the time is descritized into.")
+    export_parser.add_argument("--format", default="csv", choices=sorted(SINKS),
+                               help="Output format. Parquet output is a directory of part files, "
+                                    "SQLite output a database file with a metric_data table.")
+    export_parser.add_argument("--output", required=True, help="Output file or directory.")
+    export_parser.add_argument("--manifest",
+                               help="Checkpoint manifest (default: <output>.manifest).")
+    export_parser.add_argument("--workers", type=int, default=4, help="Concurrent requests.")
+    export_parser.add_argument("--window", type=int, default=365,
+                               help="Maximum points per metric per request.")
+    export_parser.add_argument("--group-size", type=int, default=10,
+                               help="Maximum metrics per request.")
+    export_parser.add_argument("--target-bytes", type=int,
+                               help="Size requests to this estimated payload and clamp them "
+                                    "to each asset's coverage (overrides --window).")
+    export_parser.add_argument("--resume", action="store_true",
+                               help="Continue a previous export instead of starting over.")
+
+    proxy_parser = commands.add_parser("proxy",
+                                       help="Serve the API through a local caching proxy.")
+    proxy_parser.add_argument("--host", default="127.0.0.1", help="Interface to listen on.")
+    proxy_parser.add_argument("--port", type=int, default=8080, help="Port to listen on.")
+    proxy_parser.add_argument("--ttl", type=int, default=300,
+                              help="Seconds a response is served from the cache.")
+    proxy_parser.add_argument("--max-entries", type=int, default=1024,
+                              help="Number of responses kept in the cache.")
+    return parser.parse_args(argv)
+
+
+def export(args, community=None):
+    """
+    Run the :samp:`export` command.
+
+    :param args: Parsed arguments.
+    :type args: argparse.Namespace
+
+    :param community: API object used for all requests.
+    :type community: coinmetrics.community.Community, optional
+
+    :return: Exit status.
+    :rtype: int
+    """
+    logger = logging.getLogger(__name__)
+    community = community if community is not None else Community()
+    manifest = args.manifest or args.output.rstrip(os.sep) + ".manifest"
+    if not args.resume and os.path.exists(manifest):
+        os.remove(manifest)
+    job = Backfill(community, manifest,
+                   assets=args.assets.split(",") if args.assets else None,
+                   metrics=args.metrics.split(",") if args.metrics else None,
+                   start=args.start, end=args.end, time_agg=args.time_agg,
+                   group_size=args.group_size, window=args.window, workers=args.workers,
+                   shaper=RequestShaper(community, args.target_bytes)
+                   if args.target_bytes else None)
+    try:
+        total = len(job.plan())
+    except ManifestMismatchError as error:
+        logger.error("%s Rerun without --resume to start over.", error)
+        return 2
+    sink = SINKS[args.format](args.output, append=args.resume)
+    progress = {"units": total - len(job.pending()), "rows": 0}
+    began = time.time()
+
+    def handler(unit, data):
+        progress["units"] += 1
+        progress["rows"] += sink.write(unit.asset, data)
+        elapsed = max(time.time() - began, 1e-9)
+        logger.info("%s/%s units, %s rows, %.1f rows/s", progress["units"], total,
+                    progress["rows"], progress["rows"] / elapsed)
+
+    try:
+        summary = job.run(handler)
+    finally:
+        sink.close()
+    elapsed = max(time.time() - began, 1e-9)
+    logger.info("Exported %s rows in %.1fs (%.1f rows/s).", progress["rows"], elapsed,
+                progress["rows"] / elapsed)
+    if summary["failed"]:
+        logger.error("%s units failed, rerun with --resume to retry them.",
+                     len(summary["failed"]))
+        return 1
+    return 0
+
+
+def proxy(args):
+    """
+    Run the :samp:`proxy` command until interrupted.
+
+    :param args: Parsed arguments.
+    :type args: argparse.Namespace
+
+    :return: Exit status.
+    :rtype: int
+    """
+    server = ProxyServer(args.host, args.port,
+                         cache=ResponseCache(ttl=args.ttl, max_entries=args.max_entries))
+    logging.getLogger(__name__).info("Proxy listening on %s", server.url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+def main(argv=None):
+    """
+    Console entry point.
+    """
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format="%(message)s", stream=sys.stderr)
+    if args.command == "export":
+        return export(args)
+    if args.command == "proxy":
+        return proxy(args)
+    return 2  # pragma: no cover
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,6 +5,8 @@ Coin Metrics API Community Module Definitions
 import logging
 from .base import Base
 from .errors import InvalidAssetError, InvalidMetricError
+from .query import LazyQuery
+from .refresher import Refresher
 
 
 class Community(Base):
@@ -140,7 +142,10 @@ class Community(Base):
         self.logger.debug("Asset: '%s'", asset)
         self.logger.debug("Metrics: '%s'", metrics)
         metrics = metrics.split(",")
-        reference = self.get_asset_metrics(asset)
+        if self.metadata is None:
+            reference = self.get_asset_metrics(asset)
+        else:
+            reference = self.metadata.asset_metrics(asset)
         for metric in metrics:
             if metric in reference:
                 pass
@@ -192,6 +197,50 @@ class Community(Base):
     #: An alias for :py:func:`get_asset_metric_data` (backwards compatibility)
     get_asset_data_for_time_range = get_asset_metric_data
 
+    def query(self, asset, start, end, time_agg="day"):
+        """
+        Start a lazy query. Conveniance methods called on the query record
+        their metric instead of fetching it, and :samp:`execute()` sends a
+        single request for all of them.
+
+        .. code-block:: python
+
+          data = cm.query("btc", "2019-01-01", "2019-01-08") \\
+                   .get_price_usd().get_tx_count().get_fee_mean().execute()
+          price = data["PriceUSD"]
+
+        :Parameters: See see :py:func:`get_asset_metric_data` for parameter details.
+
+        :return: Lazy query object.
+        :rtype: coinmetrics.query.LazyQuery
+        """
+        return LazyQuery(self, asset, start, end, time_agg)
+
+    def refresher(self, watchlist, time_agg="day", capacity=365):
+        """
+        Create a background refresher keeping the latest points of a watchlist
+        in memory. Call :samp:`start()` on it to begin polling.
+
+        .. code-block:: python
+
+          refresher = cm.refresher({"btc": ["PriceUSD", "TxCnt"]}, capacity=30)
+          refresher.start()
+          prices = refresher.latest("btc", "PriceUSD", 7)
+
+        :param watchlist: Metric IDs to keep, by asset ID.
+        :type watchlist: dict
+
+        :param time_agg: Interval the time is descritized into: day, hour.
+        :type time_agg: str, optional
+
+        :param capacity: Number of points kept per series.
+        :type capacity: int, optional
+
+        :return: Refresher object.
+        :rtype: coinmetrics.refresher.Refresher
+        """
+        return Refresher(self, watchlist, time_agg, capacity)
+
     def get_active_addresses(self, assets, start, end):
         """
         The sum count of unique addresses that were active in the network
@@ -0,0 +1,286 @@
+"""
+Coin Metrics API Cross-Asset Correlation
+
+Covariance and correlation matrices across many assets, computed from a
+(time, asset) panel of one metric with a handful of matrix products instead
+of a pandas :samp:`.corr()` per pair. Missing values are handled
+pairwise-complete: each pair uses the rows where both assets have a value.
+
+Every estimate is built from the same additive moments (pair counts, sums,
+sums of squares and cross products), so rolling windows add the row
+entering and drop the row leaving instead of summing every window, and
+:samp:`IncrementalCorrelation` folds in a new day without recomputing the
+window.
+
+.. code-block:: python
+
+  panel = coinmetrics.correlation.panel(cm, assets, "PriceUSD", "2018-01-01", "2019-01-01")
+  changes = coinmetrics.correlation.returns(panel["values"])
+  matrix = coinmetrics.correlation.correlation(changes)
+  rolling = coinmetrics.correlation.rolling(changes, window=30)
+"""
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from .deadline import bind
+
+
+def panel(community, assets, metric, start, end, time_agg="day", workers=8):
+    """
+    Fetch one metric for many assets and align it on a common time axis.
+
+    :param community: API object used for all requests.
+    :type community: coinmetrics.community.Community
+
+    :param assets: Asset IDs, one column each.
+    :type assets: list
+
+    :param metric: Unique ID corresponding to the metric.
+    :type metric: str
+
+    :param workers: Number of concurrent requests.
+    :type workers: int, optional
+
+    :return: Asset IDs under :samp:`assets`, the union of timestamps as int64 epoch
+             seconds under :samp:`time` and a float64 (time, asset) array under
+             :samp:`values`, NaN where an asset has no value.
+    :rtype: dict
+
+    :Parameters: See :py:func:`coinmetrics.community.Community.get_asset_metric_data`
+                 for :samp:`start`, :samp:`end` and :samp:`time_agg`.
+    """
+    # pylint: disable=R0913,R0914
+    import numpy as np
+    from .utils import cm_to_numpy
+
+    def fetch(asset):
+        return cm_to_numpy(community.get_asset_metric_data(asset, metric, start, end, time_agg))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        columns = list(executor.map(bind(fetch), assets))
+    stamps = [column["time"] for column in columns]
+    times = np.unique(np.concatenate(stamps + [np.zeros(0, dtype=np.int64)]))
+    values = np.full((len(times), len(assets)), np.nan)
+    for index, column in enumerate(columns):
+        values[np.searchsorted(times, column["time"]), index] = column["values"][:, 0]
+    return {"assets": list(assets), "time": times, "values": values}
+
+
+def returns(values, log=True):
+    """
+    Period over period returns of a price panel.
+
+    :param values: (time, asset) array of prices.
+    :type values: numpy.ndarray
+
+    :param log: Log returns when true, simple returns otherwise.
+    :type log: bool, optional
+
+    :return: (time - 1, asset) array of returns, NaN where either price is missing.
+    :rtype: numpy.ndarray
+    """
+    import numpy as np
+    values = np.asarray(values, dtype=np.float64)
+    if log:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.diff(np.log(values), axis=0)
+    return values[1:] / values[:-1] - 1
+
+
+def moments(values):
+    """
+    Pairwise-complete moments of a panel.
+
+    :param values: (time, asset) array, NaN for missing values.
+    :type values: numpy.ndarray
+
+    :return: (count, sums, squares, products), each of shape (asset, asset). Entry
+             (i, j) of :samp:`sums` and :samp:`squares` covers asset i over the rows
+             where asset j also has a value.
+    :rtype: tuple
+    """
+    import numpy as np
+    values = np.asarray(values, dtype=np.float64)
+    present = (~np.isnan(values)).astype(np.float64)
+    filled = np.where(present > 0, values, 0.0)
+    return (present.T @ present, filled.T @ present, (filled ** 2).T @ present,
+            filled.T @ filled)
+
+
+def _centered(values):
+    """
+    Shift each column by its mean, which leaves the estimates unchanged but
+    keeps the sums small.
+    """
+    import numpy as np
+    values = np.asarray(values, dtype=np.float64)
+    present = ~np.isnan(values)
+    counts = present.sum(axis=0)
+    means = np.where(present, values, 0.0).sum(axis=0) / np.maximum(counts, 1)
+    return values - means
+
+
+def _finish(stats, ddof, min_periods, normalize):
+    """
+    Covariance or correlation from pairwise moments, for one matrix or a
+    stack of them.
+    """
+    import numpy as np
+    count, sums, squares, products = stats
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result = (products - sums * np.swapaxes(sums, -1, -2) / count) / (count - ddof)
+        if normalize:
+            variance = (squares - sums ** 2 / count) / (count - ddof)
+            result = np.clip(result / np.sqrt(variance * np.swapaxes(variance, -1, -2)),
+                             -1.0, 1.0)
+    result[count < max(min_periods, ddof + 1)] = np.nan
+    return result
+
+
+def covariance(values, ddof=1, min_periods=2):
+    """
+    Pairwise-complete covariance matrix.
+
+    :param values: (time, asset) array, NaN for missing values.
+    :type values: numpy.ndarray
+
+    :param ddof: Delta degrees of freedom.
+    :type ddof: int, optional
+
+    :param min_periods: Fewest common rows for a pair to get a value.
+    :type min_periods: int, optional
+
+    :return: (asset, asset) array, NaN for pairs with too few common rows.
+    :rtype: numpy.ndarray
+    """
+    return _finish(moments(_centered(values)), ddof, min_periods, False)
+
+
+def correlation(values, min_periods=2):
+    """
+    Pairwise-complete Pearson correlation matrix.
+
+    :param values: (time, asset) array, NaN for missing values.
+    :type values: numpy.ndarray
+
+    :param min_periods: Fewest common rows for a pair to get a value.
+    :type min_periods: int, optional
+
+    :return: (asset, asset) array, NaN for pairs with too few common rows or
+             no variance.
+    :rtype: numpy.ndarray
+    """
+    return _finish(moments(_centered(values)), 1, min_periods, True)
+
+
+def _row_moments(values):
+    """
+    Moments contributed by each row of a panel, stacked along the first axis.
+    """
+    import numpy as np
+    present = (~np.isnan(values)).astype(np.float64)
+    filled = np.where(present > 0, values, 0.0)
+    return (np.einsum("ti,tj->tij", present, present), np.einsum("ti,tj->tij", filled, present),
+            np.einsum("ti,tj->tij", filled ** 2, present), np.einsum("ti,tj->tij", filled, filled))
+
+
+def rolling(values, window, min_periods=None, kind="correlation", chunk=64):
+    """
+    Rolling covariance or correlation matrices. Each window's moments are
+    the previous window's plus the row entering and minus the row leaving,
+    so the cost does not grow with :samp:`window`.
+
+    :param values: (time, asset) array, NaN for missing values.
+    :type values: numpy.ndarray
+
+    :param window: Number of rows per window.
+    :type window: int
+
+    :param min_periods: Fewest common rows for a pair to get a value, defaults to :samp:`window`.
+    :type min_periods: int, optional
+
+    :param kind: :samp:`correlation` or :samp:`covariance`.
+    :type kind: str, optional
+
+    :param chunk: Number of windows computed per batch. Every batch starts from moments
+                  summed afresh, bounding temporary memory and rounding drift.
+    :type chunk: int, optional
+
+    :return: (time - window + 1, asset, asset) array. Entry k covers rows k to k + window - 1.
+    :rtype: numpy.ndarray
+    """
+    import numpy as np
+    if kind not in ("correlation", "covariance"):
+        raise ValueError("Unsupported kind: '{}'".format(kind))
+    values = _centered(values)
+    min_periods = window if min_periods is None else min_periods
+    windows = max(len(values) - window + 1, 0)
+    result = np.empty((windows, values.shape[1], values.shape[1]))
+    for low in range(0, windows, chunk):
+        high = min(low + chunk, windows)
+        entering = _row_moments(values[low + window:high + window - 1])
+        leaving = _row_moments(values[low:high - 1])
+        stats = tuple(np.concatenate([first[np.newaxis],
+                                      first + np.cumsum(added - dropped, axis=0)])
+                      for first, added, dropped in zip(moments(values[low:low + window]),
+                                                       entering, leaving))
+        result[low:high] = _finish(stats, 1, min_periods, kind == "correlation")
+    return result
+
+
+class IncrementalCorrelation:
+    """
+    Coin Metrics API Incremental Correlation Object
+
+    Keeps the moments of the latest :samp:`window` rows so the matrices can be
+    updated one row at a time, for instance when a new day is published.
+    """
+    def __init__(self, assets, window=None, min_periods=2):
+        """
+        :param assets: Number of assets.
+        :type assets: int
+
+        :param window: Number of rows kept, :samp:`None` to keep every row.
+        :type window: int, optional
+
+        :param min_periods: Fewest common rows for a pair to get a value.
+        :type min_periods: int, optional
+        """
+        import numpy as np
+        self.window = window
+        self.min_periods = min_periods
+        self.stats = tuple(np.zeros((assets, assets)) for _ in range(4))
+        self.rows = deque()
+
+    def update(self, rows):
+        """
+        Add rows, dropping the oldest ones beyond the window.
+
+        :param rows: (time, asset) array or a single row, NaN for missing values.
+        :type rows: numpy.ndarray
+        """
+        import numpy as np
+        rows = np.atleast_2d(np.asarray(rows, dtype=np.float64))
+        self.stats = tuple(total + part for total, part in zip(self.stats, moments(rows)))
+        if self.window is None:
+            return
+        self.rows.extend(rows)
+        expired = len(self.rows) - self.window
+        if expired > 0:
+            old = np.array([self.rows.popleft() for _ in range(expired)])
+            self.stats = tuple(total - part for total, part in zip(self.stats, moments(old)))
+
+    def covariance(self, ddof=1):
+        """
+        Covariance matrix of the rows held.
+
+        :rtype: numpy.ndarray
+        """
+        return _finish(self.stats, ddof, self.min_periods, False)
+
+    def correlation(self):
+        """
+        Correlation matrix of the rows held.
+
+        :rtype: numpy.ndarray
+        """
+        return _finish(self.stats, 1, self.min_periods, True)
@@ -0,0 +1,219 @@
+"""
+Coin Metrics API Deadlines and Hedging
+
+A :samp:`Deadline` bounds the total time of a call, including every request
+it sends. Deadlines are attached to the current thread with :py:func:`within`
+and are picked up by :py:func:`coinmetrics.base.Base._fetch`, which shortens
+its timeouts to the time remaining and refuses to start once the deadline
+expired or was cancelled. Batch APIs carry the caller's deadline into their
+worker threads with :py:func:`bind`.
+
+.. code-block:: python
+
+  with coinmetrics.deadline.within(30):
+      data = cm.get_asset_metric_data("btc", "PriceUSD", "2019-01-01", "2019-12-31")
+
+A :samp:`Hedger` set on an API object sends a duplicate of any request that
+is slower than a percentile of recent latencies and takes whichever response
+arrives first. Every API request is an idempotent GET, so this is always safe.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from collections import deque
+from contextlib import contextmanager
+import logging
+import threading
+import time
+from .errors import DeadlineExceededError, RequestCancelledError
+
+_LOCAL = threading.local()
+
+
+class Deadline:
+    """
+    Coin Metrics API Deadline Object
+    """
+    def __init__(self, seconds=None):
+        """
+        :param seconds: Time allowed from now, :samp:`None` for no time limit
+                        (the deadline can still be cancelled).
+        :type seconds: float, optional
+        """
+        self.expires = None if seconds is None else time.monotonic() + seconds
+        self.cancelled = threading.Event()
+
+    def remaining(self):
+        """
+        Seconds left before the deadline.
+
+        :return: Seconds left, :samp:`None` without a time limit.
+        :rtype: float
+        """
+        return None if self.expires is None else self.expires - time.monotonic()
+
+    def cancel(self):
+        """
+        Cancel every request that has not started yet under this deadline.
+        """
+        self.cancelled.set()
+
+    def check(self):
+        """
+        Raise when no further request may start.
+
+        :raises: RequestCancelledError, DeadlineExceededError
+        """
+        if self.cancelled.is_set():
+            raise RequestCancelledError("Request cancelled.")
+        remaining = self.remaining()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceededError("Deadline exceeded.")
+
+
+def current():
+    """
+    Deadline attached to the current thread.
+
+    :return: The deadline, or :samp:`None`.
+    :rtype: Deadline
+    """
+    return getattr(_LOCAL, "deadline", None)
+
+
+@contextmanager
+def within(deadline):
+    """
+    Attach a deadline to the current thread for the duration of the block.
+
+    :param deadline: A deadline, or seconds from now (:samp:`None` for a deadline
+                     that can only be cancelled).
+    :type deadline: Deadline or float
+
+    :return: The attached deadline.
+    :rtype: Deadline
+    """
+    if not isinstance(deadline, Deadline):
+        deadline = Deadline(deadline)
+    previous = current()
+    _LOCAL.deadline = deadline
+    try:
+        yield deadline
+    finally:
+        _LOCAL.deadline = previous
+
+
+def bind(function):
+    """
+    Wrap a function so it runs under the calling thread's deadline, for
+    handing work to other threads.
+
+    :param function: Function to wrap.
+    :type function: callable
+
+    :return: Wrapped function.
+    :rtype: callable
+    """
+    deadline = current()
+    if deadline is None:
+        return function
+
+    def bound(*args, **kwargs):
+        with within(deadline):
+            return function(*args, **kwargs)
+    return bound
+
+
+def timeout(default):
+    """
+    Shorten a :samp:`requests` (connect, read) timeout to the current
+    deadline, raising when no time is left.
+
+    :param default: Timeout used without a deadline.
+    :type default: tuple
+
+    :return: (connect, read) timeout in seconds.
+    :rtype: tuple
+    """
+    deadline = current()
+    if deadline is None:
+        return default
+    deadline.check()
+    remaining = deadline.remaining()
+    if remaining is None:
+        return default
+    return tuple(remaining if limit is None else min(limit, remaining) for limit in default)
+
+
+class Hedger:
+    """
+    Coin Metrics API Request Hedging Object
+    """
+    def __init__(self, percentile=95, samples=256, min_samples=20, workers=16):
+        """
+        :param percentile: Latency percentile after which a duplicate request is sent.
+        :type percentile: float, optional
+
+        :param samples: Number of recent latencies the percentile is computed from.
+        :type samples: int, optional
+
+        :param min_samples: Latencies needed before hedging starts.
+        :type min_samples: int, optional
+
+        :param workers: Threads available to primary and duplicate requests.
+        :type workers: int, optional
+        """
+        self.logger = logging.getLogger(__name__)
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.latencies = deque(maxlen=samples)
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.lock = threading.Lock()
+        self.hedged = 0
+
+    def threshold(self):
+        """
+        Current hedging delay.
+
+        :return: Seconds to wait before sending a duplicate, :samp:`None` while
+                 there are too few samples.
+        :rtype: float
+        """
+        with self.lock:
+            if len(self.latencies) < self.min_samples:
+                return None
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile / 100.0))]
+
+    def call(self, fetch, *args):
+        """
+        Run a request, sending a duplicate when it is slower than
+        :py:func:`threshold`. The first successful response wins; the slower
+        request is left to finish in the background.
+
+        :return: The result of :samp:`fetch`.
+        """
+        began = time.monotonic()
+        run = bind(fetch)
+        attempts = [self.executor.submit(run, *args)]
+        delay = self.threshold()
+        remaining = current().remaining() if current() is not None else None
+        if delay is not None and (remaining is None or delay < remaining):
+            done, _ = wait(attempts, timeout=delay)
+            if not done:
+                self.logger.debug("Hedging request after %.3fs.", delay)
+                self.hedged += 1
+                attempts.append(self.executor.submit(run, *args))
+        error = None
+        while attempts:
+            done, _ = wait(attempts, return_when=FIRST_COMPLETED)
+            for attempt in done:
+                attempts.remove(attempt)
+                try:
+                    result = attempt.result()
+                except Exception as failure:  # pylint: disable=W0703
+                    error = failure
+                    continue
+                with self.lock:
+                    self.latencies.append(time.monotonic() - began)
+                return result
+        raise error
@@ -0,0 +1,181 @@
+"""
+Coin Metrics API Parallel Decoding
+
+Decoding large responses is CPU bound and serialized by the GIL, while the
+downloads are not. :samp:`DecodePool` downloads with a pool of I/O threads
+and hands the raw response bodies to a pool of processes. Each process
+decodes its body into the columnar form of :py:func:`coinmetrics.utils.cm_to_numpy`
+and returns the arrays through a shared memory block, so only the block name
+and the metric IDs are pickled back.
+
+The processes are started once per :samp:`DecodePool`, before any download
+thread, with the :samp:`spawn` start method by default: forking a process
+while other threads run can deadlock the child. Close the pool when done,
+or use it as a context manager.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import json
+import logging
+import multiprocessing
+import os
+from .deadline import bind
+
+
+def decode_to_shared_memory(body):
+    """
+    Decode a raw :samp:`assets/<id>/metricdata` response body into a shared
+    memory block holding the int64 epoch column followed by the float64
+    value matrix. Runs in a worker process.
+
+    :param body: Raw response body.
+    :type body: bytes
+
+    :return: Shared memory block name, row count and metric IDs.
+    :rtype: tuple
+    """
+    import numpy as np
+    from multiprocessing import resource_tracker, shared_memory
+    data = json.loads(body.decode("utf-8"))["metricData"]
+    metrics, series = data["metrics"], data["series"]
+    rows = len(series)
+    block = shared_memory.SharedMemory(create=True, size=max(8 * rows * (1 + len(metrics)), 1))
+    # The parent owns the block from here on and unlinks it once copied.
+    resource_tracker.unregister(block._name, "shared_memory")  # pylint: disable=W0212
+    times = np.ndarray((rows,), dtype=np.int64, buffer=block.buf)
+    values = np.ndarray((rows, len(metrics)), dtype=np.float64, buffer=block.buf,
+                        offset=8 * rows)
+    times[:] = np.array([row["time"][:19] for row in series],
+                        dtype="datetime64[s]").astype(np.int64)
+    values[:] = np.array([row["values"] for row in series],
+                         dtype=np.float64).reshape(rows, len(metrics))
+    del times, values
+    block.close()
+    return block.name, rows, metrics
+
+
+def read_shared_memory(name, rows, metrics):
+    """
+    Copy a block written by :py:func:`decode_to_shared_memory` into arrays
+    owned by this process and release it.
+
+    :return: Columnar data.
+    :rtype: dict
+    """
+    import numpy as np
+    from multiprocessing import shared_memory
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        times = np.ndarray((rows,), dtype=np.int64, buffer=block.buf).copy()
+        values = np.ndarray((rows, len(metrics)), dtype=np.float64, buffer=block.buf,
+                            offset=8 * rows).copy()
+    finally:
+        block.close()
+        block.unlink()
+    return {"metrics": metrics, "time": times, "values": values}
+
+
+class DecodePool:
+    """
+    Coin Metrics API Parallel Decoding Object
+    """
+    def __init__(self, community, processes=None, threads=8, start_method="spawn"):
+        """
+        :param community: API object used for the downloads.
+        :type community: coinmetrics.community.Community
+
+        :param processes: Number of decoding processes, defaults to the CPU count.
+        :type processes: int, optional
+
+        :param threads: Number of concurrent downloads.
+        :type threads: int, optional
+
+        :param start_method: :samp:`multiprocessing` start method of the decoding
+                             processes: spawn or forkserver.
+        :type start_method: str, optional
+        """
+        self.logger = logging.getLogger(__name__)
+        self.community = community
+        self.processes = processes or os.cpu_count() or 1
+        self.threads = threads
+        self.start_method = start_method
+        self.decoders = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def start(self):
+        """
+        Start the decoding processes. Called by :py:func:`fetch` when needed.
+        """
+        if self.decoders is not None:
+            return
+        context = multiprocessing.get_context(self.start_method)
+        self.decoders = ProcessPoolExecutor(max_workers=self.processes, mp_context=context)
+        # Bring every process up now rather than from inside a download thread.
+        for future in [self.decoders.submit(os.getpid) for _ in range(self.processes)]:
+            future.result()
+
+    def close(self):
+        """
+        Stop the decoding processes.
+        """
+        if self.decoders is not None:
+            self.decoders.shutdown(wait=True)
+            self.decoders = None
+
+    def _download(self, request):
+        """
+        Validate a request the same way as
+        :py:func:`coinmetrics.community.Community.get_asset_metric_data` and
+        download its raw body.
+        """
+        asset, metrics, start, end, time_agg = (tuple(request) + ("day",))[:5]
+        api = self.community
+        api.asset_checker(asset)
+        api.metric_checker(metrics)
+        api.timestamp_checker(start, end)
+        options = {"metrics": metrics, "start": start, "end": end, "time_agg": time_agg}
+        # pylint: disable=W0212
+        _, body = api._get(api._request_url("assets/%s/metricdata" % asset, options))
+        return body
+
+    def fetch(self, requests):
+        """
+        Download and decode a batch of asset metric data requests.
+
+        :param requests: (asset, metrics, start, end[, time_agg]) tuples, using the parameters
+                         of :py:func:`coinmetrics.community.Community.get_asset_metric_data`.
+        :type requests: list of tuple
+
+        :return: Columnar data for each request, in order.
+        :rtype: list of dict
+        """
+        requests = list(requests)
+        blocks, error = [], None
+        self.start()
+        with ThreadPoolExecutor(max_workers=self.threads) as downloads:
+            # Each body is handed to the decoders as soon as its download completes.
+            decode = bind(self._decode)
+            pending = [downloads.submit(decode, self.decoders, request) for request in requests]
+            for future in pending:
+                try:
+                    blocks.append(future.result().result())
+                except Exception as failure:  # pylint: disable=W0703
+                    error = error or failure
+        # Release every block before reporting a failure so none are leaked.
+        results = [read_shared_memory(*block) for block in blocks]
+        if error is not None:
+            raise error
+        self.logger.debug("Decoded %s responses.", len(results))
+        return results
+
+    def _decode(self, decoders, request):
+        """
+        Download a request and submit its body to the decoding processes.
+        """
+        return decoders.submit(decode_to_shared_memory, self._download(request))
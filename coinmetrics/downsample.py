@@ -0,0 +1,135 @@
+"""
+Coin Metrics API Downsampling
+
+Reduce long series to a fixed number of points for plotting.
+:py:func:`lttb` keeps the visual shape of the series with the
+largest-triangle-three-buckets algorithm, and :py:func:`envelope` keeps the
+minimum and maximum of each bucket so spikes dropped by LTTB can still be
+drawn as a band. Both work on plain arrays, so they apply equally to a data
+object, its columnar form or a memory mapped :py:class:`coinmetrics.binary.SeriesFile`:
+
+.. code-block:: python
+
+  from coinmetrics.downsample import lttb, envelope
+
+  times, values = series.range(start, end)
+  view = lttb(times, values, 2000)
+  band = envelope(times, values, 500)
+"""
+
+
+def _present(times, values):
+    """
+    Drop the points without a value.
+    """
+    import numpy as np
+    times = np.asarray(times, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    keep = ~np.isnan(values)
+    return (times, values) if keep.all() else (times[keep], values[keep])
+
+
+def lttb(times, values, points):
+    """
+    Downsample a series with the largest-triangle-three-buckets algorithm.
+    Points without a value are ignored.
+
+    :param times: Epoch seconds, sorted.
+    :type times: numpy.ndarray
+
+    :param values: Values, NaN for missing.
+    :type values: numpy.ndarray
+
+    :param points: Number of points to keep, at least 3.
+    :type points: int
+
+    :return: Epoch and value arrays of the kept points, including the first and last.
+    :rtype: tuple
+    """
+    # pylint: disable=R0914
+    import numpy as np
+    times, values = _present(times, values)
+    count = len(times)
+    if points >= count or points < 3:
+        return times, values
+    # Bucket k (1 .. points - 2) spans [edges[k], edges[k + 1]); the first and
+    # last points are buckets of their own.
+    edges = np.concatenate(([0], np.arange(points - 1) * (count - 2) // (points - 2) + 1,
+                            [count]))
+    x, y = times.astype(np.float64), values
+    sums_x = np.concatenate(([0.0], np.cumsum(x)))
+    sums_y = np.concatenate(([0.0], np.cumsum(y)))
+    sizes = edges[2:] - edges[1:-1]
+    mean_x = (sums_x[edges[2:]] - sums_x[edges[1:-1]]) / sizes
+    mean_y = (sums_y[edges[2:]] - sums_y[edges[1:-1]]) / sizes
+    selected = np.empty(points, dtype=np.int64)
+    selected[0], selected[-1] = 0, count - 1
+    anchor = 0
+    for bucket in range(1, points - 1):
+        low, high = edges[bucket], edges[bucket + 1]
+        # Mean of the next bucket, with the last point as the final bucket.
+        next_x, next_y = mean_x[bucket], mean_y[bucket]
+        ax, ay = x[anchor], y[anchor]
+        area = np.abs((ax - next_x) * (y[low:high] - ay) - (ax - x[low:high]) * (next_y - ay))
+        anchor = low + int(np.argmax(area))
+        selected[bucket] = anchor
+    return times[selected], values[selected]
+
+
+def envelope(times, values, buckets):
+    """
+    Minimum and maximum of equally sized buckets of points.
+
+    :param times: Epoch seconds, sorted.
+    :type times: numpy.ndarray
+
+    :param values: Values, NaN for missing (ignored).
+    :type values: numpy.ndarray
+
+    :param buckets: Number of buckets.
+    :type buckets: int
+
+    :return: First epoch of each bucket, and the bucket minima and maxima (NaN for
+             buckets without values).
+    :rtype: tuple
+    """
+    import numpy as np
+    times = np.asarray(times, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    if not len(times):
+        return times, values, values
+    edges = np.unique(np.linspace(0, len(times), buckets + 1).astype(np.int64)[:-1])
+    return (times[edges], np.fmin.reduceat(values, edges), np.fmax.reduceat(values, edges))
+
+
+def downsample(data, points, buckets=None):
+    """
+    Downsample every metric of a data object.
+
+    :param data: Object returned by
+                 :py:func:`coinmetrics.community.Community.get_asset_metric_data`
+                 or its columnar form from :py:func:`coinmetrics.utils.cm_to_numpy`.
+    :type data: dict
+
+    :param points: Number of LTTB points per metric.
+    :type points: int
+
+    :param buckets: Number of envelope buckets per metric, defaults to :samp:`points`.
+    :type buckets: int, optional
+
+    :return: For each metric ID, the LTTB :samp:`time` and :samp:`values` and the
+             envelope :samp:`bucket`, :samp:`min` and :samp:`max` arrays.
+    :rtype: dict
+    """
+    from .utils import cm_to_numpy
+    if "series" in data:
+        data = cm_to_numpy(data)
+    result = {}
+    for index, metric in enumerate(data["metrics"]):
+        column = data["values"][:, index]
+        times, values = lttb(data["time"], column, points)
+        starts, minimum, maximum = envelope(data["time"], column,
+                                            points if buckets is None else buckets)
+        result[metric] = {"time": times, "values": values, "bucket": starts,
+                          "min": minimum, "max": maximum}
+    return result
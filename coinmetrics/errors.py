@@ -39,3 +39,23 @@ class InvalidDataTypeError(Error):
     """
     Raise and error when the given data_type doesn't exist for the specified asset.
     """
+
+class DeadlineExceededError(Error):
+    """
+    Raise an error when a request is started or still running after its deadline.
+    """
+
+class RequestCancelledError(Error):
+    """
+    Raise an error when a request is started after its deadline was cancelled.
+    """
+
+class CircuitOpenError(Error):
+    """
+    Raise an error when a request is refused because the upstream API is failing.
+    """
+
+class ManifestMismatchError(Error):
+    """
+    Raise an error when a backfill manifest was written for a job with different parameters.
+    """
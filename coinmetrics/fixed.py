@@ -0,0 +1,243 @@
+"""
+Coin Metrics API Exact Columnar Values
+
+Values are parsed as :samp:`Decimal` to stay exact, which costs one object
+per cell. :py:func:`cm_to_fixed` stores each metric instead as a
+:samp:`FixedColumn`: an int64 array of values scaled by :samp:`10 ** scale`,
+with the scale inferred from the most precise value in the response. When
+a metric mixes magnitudes too far apart for int64, the scale is reduced until
+the largest value fits and the extra digits are rounded half to even. Sums,
+differences and products stay exact and run on whole arrays; results that
+would not fit in int64 raise :samp:`OverflowError` rather than wrap.
+
+.. code-block:: python
+
+  data = coinmetrics.cm_to_fixed(cm.get_asset_metric_data("btc", "PriceUSD,CapMrktCurUSD",
+                                                          "2019-01-01", "2019-12-31"))
+  price = data["columns"]["PriceUSD"]
+  total = price.sum()          # Decimal
+  floats = price.to_float()    # float64 with NaN for missing values
+"""
+
+from decimal import Decimal
+
+#: Largest number of significant digits that always fits in int64.
+MAX_DIGITS = 18
+
+
+def _half_even(quotient, above, tie):
+    """
+    Round truncated values up where the dropped part is above one half, or
+    exactly one half and the value is odd.
+    """
+    return quotient + (above | (tie & (quotient % 2 == 1)))
+
+
+class FixedColumn:
+    """
+    Coin Metrics API Fixed-Point Column Object
+    """
+    def __init__(self, values, scale, mask=None):
+        """
+        :param values: int64 array of values multiplied by :samp:`10 ** scale`.
+        :type values: numpy.ndarray
+
+        :param scale: Number of decimal places.
+        :type scale: int
+
+        :param mask: Boolean array, true where the value is missing.
+        :type mask: numpy.ndarray, optional
+        """
+        import numpy as np
+        self.values = np.asarray(values, dtype=np.int64)
+        self.scale = scale
+        self.mask = np.zeros(len(self.values), dtype=bool) if mask is None \
+            else np.asarray(mask, dtype=bool)
+
+    @classmethod
+    def parse(cls, cells, scale=None):
+        """
+        Build a column from API values, inferring the scale.
+
+        :param cells: Values as :samp:`Decimal`, strings or :samp:`None`.
+        :type cells: list
+
+        :param scale: Number of decimal places, values with more are rounded half to even.
+                      Defaults to the most precise value's, reduced as far as needed for
+                      the largest value to fit in :samp:`MAX_DIGITS` digits.
+        :type scale: int, optional
+
+        :return: Column holding the values.
+        :rtype: FixedColumn
+
+        :raises: OverflowError when a value has more than :samp:`MAX_DIGITS` digits
+                 at the column's scale.
+        """
+        # pylint: disable=R0914
+        import numpy as np
+        if not cells:
+            return cls(np.zeros(0, dtype=np.int64), scale or 0)
+        mask = np.array([cell is None for cell in cells], dtype=bool)
+        text = np.array(["0" if cell is None else str(cell) for cell in cells], dtype=str)
+        if np.char.count(np.char.lower(text), "e").any():
+            text = np.array([format(Decimal(cell), "f") for cell in text], dtype=str)
+        negative = np.char.startswith(text, "-")
+        text = np.char.lstrip(text, "-+")
+        parts = np.char.partition(text, ".").reshape(len(text), 3)
+        whole, fraction = parts[:, 0], parts[:, 2]
+        places = np.char.str_len(fraction)
+        integer_digits = int(np.char.str_len(np.char.lstrip(whole, "0")).max())
+        if scale is None:
+            scale = max(min(int(places.max()), MAX_DIGITS - integer_digits), 0)
+        if integer_digits + scale > MAX_DIGITS:
+            raise OverflowError("Values need {} digits, int64 holds {}."
+                                .format(integer_digits + scale, MAX_DIGITS))
+        dropped = None
+        if (places > scale).any():
+            dropped = np.array([cell[scale:] for cell in fraction.tolist()], dtype=str)
+            fraction = np.array([cell[:scale] for cell in fraction.tolist()], dtype=str)
+        fraction = np.char.ljust(fraction, scale, "0")
+        values = np.char.add(whole, fraction)
+        values = np.where(np.char.str_len(values) == 0, "0", values).astype(np.int64)
+        if dropped is not None:
+            half = np.char.ljust(dropped, 1, "0").astype("U1")
+            beyond = np.char.str_len(np.char.rstrip(dropped, "0")) > 1
+            values = _half_even(values, (half > "5") | ((half == "5") & beyond),
+                                (half == "5") & ~beyond)
+        return cls(np.where(negative, -values, values), scale, mask)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        """
+        Exact value at a row.
+
+        :rtype: Decimal
+        """
+        if self.mask[index]:
+            return None
+        return Decimal(int(self.values[index])).scaleb(-self.scale)
+
+    def __repr__(self):
+        return "FixedColumn(rows={}, scale={})".format(len(self), self.scale)
+
+    def rescale(self, scale):
+        """
+        Convert to another number of decimal places. Reducing the scale rounds
+        half to even, like :samp:`Decimal.quantize`.
+
+        :param scale: Number of decimal places.
+        :type scale: int
+
+        :rtype: FixedColumn
+        """
+        import numpy as np
+        if scale >= self.scale:
+            factor = 10 ** (scale - self.scale)
+            self._check(int(np.abs(self.values).max(initial=0)) * factor)
+            return FixedColumn(self.values * factor, scale, self.mask)
+        factor = 10 ** (self.scale - scale)
+        quotient, remainder = np.divmod(self.values, factor)
+        return FixedColumn(_half_even(quotient, 2 * remainder > factor, 2 * remainder == factor),
+                           scale, self.mask)
+
+    @staticmethod
+    def _check(bound):
+        """
+        Raise when a result bound does not fit in int64.
+        """
+        if bound >= 2 ** 63:
+            raise OverflowError("Result does not fit in int64.")
+
+    def _align(self, other):
+        """
+        Bring two columns to the same scale.
+        """
+        if not isinstance(other, FixedColumn):
+            other = FixedColumn.parse([other] * len(self))
+        scale = max(self.scale, other.scale)
+        return self.rescale(scale), other.rescale(scale)
+
+    def __add__(self, other):
+        left, right = self._align(other)
+        self._check(int(abs(left.values).max(initial=0)) + int(abs(right.values).max(initial=0)))
+        return FixedColumn(left.values + right.values, left.scale, left.mask | right.mask)
+
+    def __sub__(self, other):
+        left, right = self._align(other)
+        self._check(int(abs(left.values).max(initial=0)) + int(abs(right.values).max(initial=0)))
+        return FixedColumn(left.values - right.values, left.scale, left.mask | right.mask)
+
+    def __neg__(self):
+        return FixedColumn(-self.values, self.scale, self.mask)
+
+    def __mul__(self, other):
+        if isinstance(other, int):
+            self._check(int(abs(self.values).max(initial=0)) * abs(other))
+            return FixedColumn(self.values * other, self.scale, self.mask)
+        if not isinstance(other, FixedColumn):
+            other = FixedColumn.parse([other] * len(self))
+        self._check(int(abs(self.values).max(initial=0)) * int(abs(other.values).max(initial=0)))
+        return FixedColumn(self.values * other.values, self.scale + other.scale,
+                           self.mask | other.mask)
+
+    __radd__ = __add__
+    __rmul__ = __mul__
+
+    def sum(self):
+        """
+        Exact sum of the values present.
+
+        :rtype: Decimal
+        """
+        import numpy as np
+        present = self.values[~self.mask]
+        if int(np.abs(present).max(initial=0)) * len(present) < 2 ** 63:
+            total = int(present.sum())
+        else:
+            total = sum(int(value) for value in present)
+        return Decimal(total).scaleb(-self.scale)
+
+    def to_float(self):
+        """
+        Convert to float64, with NaN for missing values.
+
+        :rtype: numpy.ndarray
+        """
+        import numpy as np
+        values = self.values / float(10 ** self.scale)
+        values[self.mask] = np.nan
+        return values
+
+    def to_decimal(self):
+        """
+        Convert to :samp:`Decimal` values, with :samp:`None` for missing values.
+
+        :rtype: list
+        """
+        return [None if missing else Decimal(int(value)).scaleb(-self.scale)
+                for value, missing in zip(self.values.tolist(), self.mask.tolist())]
+
+
+def cm_to_fixed(data, scale=None):
+    """
+    Convert an object output from :py:func:`coinmetrics.community.Community.get_asset_metric_data`
+    to exact fixed-point columns.
+
+    :param data: Raw data object to convert.
+    :type data: dict
+
+    :param scale: Number of decimal places of every column, see :py:func:`FixedColumn.parse`.
+    :type scale: int, optional
+
+    :return: The metric IDs under :samp:`metrics`, UTC epoch seconds as an int64 array
+             under :samp:`time` and a :samp:`FixedColumn` per metric ID under :samp:`columns`.
+    :rtype: dict
+    """
+    import numpy as np
+    times = np.array([row['time'][:19] for row in data['series']], dtype='datetime64[s]')
+    metrics = list(data['metrics'])
+    columns = {metric: FixedColumn.parse([row['values'][index] for row in data['series']], scale)
+               for index, metric in enumerate(metrics)}
+    return {'metrics': metrics, 'time': times.astype(np.int64), 'columns': columns}
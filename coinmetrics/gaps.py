@@ -0,0 +1,121 @@
+"""
+Coin Metrics API Gap Detection
+
+Find missing timestamps and runs of null values in asset metric data, and
+re-fetch only the affected windows.
+"""
+
+import logging
+from .intervals import merge, step, to_epoch, to_timestamp
+from .utils import cm_to_numpy
+
+LOGGER = logging.getLogger(__name__)
+
+
+def _runs(mask):
+    """
+    Start and end indexes (inclusive) of the runs of :samp:`True` in a
+    boolean array.
+    """
+    import numpy as np
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.flatnonzero(edges == 1), np.flatnonzero(edges == -1) - 1
+
+
+def find_gaps(data, time_agg="day", start=None, end=None):
+    """
+    Find the gaps in a Coin Metrics API data object, either a :samp:`metricData`
+    object or the columnar output of :py:func:`coinmetrics.utils.cm_to_numpy`.
+
+    :param data: Data to inspect.
+    :type data: dict
+
+    :param time_agg: Interval the time is descritized into: day, hour.
+    :type time_agg: str, optional
+
+    :param start: Expected first timestamp, defaults to the first timestamp in the data.
+    :type start: str, datetime or int, optional
+
+    :param end: Expected last timestamp, defaults to the last timestamp in the data.
+    :type end: str, datetime or int, optional
+
+    :return: Inclusive (start, end) epoch ranges of missing timestamps under
+             :samp:`missing`, and of null values for each metric under :samp:`nulls`.
+    :rtype: dict
+    """
+    # pylint: disable=R0914
+    import numpy as np
+    if "series" in data:
+        data = cm_to_numpy(data)
+    size = step(time_agg)
+    times, values = data["time"], data["values"]
+    if start is None and end is None and len(times) == 0:
+        return {"missing": [], "nulls": {metric: [] for metric in data["metrics"]}}
+    first = to_epoch(start) if start is not None else int(times[0])
+    last = to_epoch(end) if end is not None else int(times[-1])
+    inside = (times >= first) & (times <= last)
+    times, values = times[inside], values[inside]
+
+    # Consecutive timestamps further apart than one step, plus the edges.
+    bounds = np.concatenate(([first - size], times, [last + size]))
+    jumps = np.flatnonzero(np.diff(bounds) > size)
+    missing = [(int(bounds[i] + size), int(bounds[i + 1] - size)) for i in jumps]
+
+    nulls = {}
+    for column, metric in enumerate(data["metrics"]):
+        begins, ends = _runs(np.isnan(values[:, column]))
+        nulls[metric] = [(int(times[i]), int(times[j])) for i, j in zip(begins, ends)]
+    return {"missing": missing, "nulls": nulls}
+
+
+def repair(community, asset, data, time_agg="day", start=None, end=None):
+    """
+    Re-fetch the gaps found by :py:func:`find_gaps` through
+    :py:func:`coinmetrics.community.Community.get_asset_metric_data` and patch
+    them into the :samp:`metricData` object in place. Missing timestamps are
+    fetched for every metric, null runs only for the affected metric.
+
+    :param community: API object used for the requests.
+    :type community: coinmetrics.community.Community
+
+    :param asset: Unique ID corresponding to the asset's ticker.
+    :type asset: str
+
+    :param data: Coin Metrics API data object to repair.
+    :type data: dict
+
+    :return: Number of windows that were re-fetched.
+    :rtype: int
+
+    :Parameters: See :py:func:`find_gaps` for the remaining parameters.
+    """
+    # pylint: disable=R0913,R0914
+    gaps = find_gaps(data, time_agg, start, end)
+    requests = {}
+    for window in gaps["missing"]:
+        requests.setdefault(window, set()).update(data["metrics"])
+    for metric, windows in gaps["nulls"].items():
+        for window in windows:
+            requests.setdefault(window, set()).add(metric)
+    # Windows asking for every metric are merged where they touch.
+    full = merge([window for window, metrics in requests.items()
+                  if len(metrics) == len(data["metrics"])], time_agg)
+    partial = [(window, metrics) for window, metrics in requests.items()
+               if len(metrics) < len(data["metrics"])]
+    windows = [(window, set(data["metrics"])) for window in full] + partial
+
+    rows = {to_epoch(row["time"]): row for row in data["series"]}
+    columns = {metric: i for i, metric in enumerate(data["metrics"])}
+    for (low, high), metrics in windows:
+        metrics = [metric for metric in data["metrics"] if metric in metrics]
+        LOGGER.debug("Re-fetching %s %s from %s to %s.", asset, metrics, low, high)
+        fetched = community.get_asset_metric_data(asset, ",".join(metrics), to_timestamp(low),
+                                                  to_timestamp(high), time_agg)
+        for row in fetched["series"]:
+            epoch = to_epoch(row["time"])
+            if epoch not in rows:
+                rows[epoch] = {"time": row["time"], "values": [None] * len(columns)}
+            for metric, value in zip(fetched["metrics"], row["values"]):
+                rows[epoch]["values"][columns[metric]] = value
+    data["series"][:] = [rows[epoch] for epoch in sorted(rows)]
+    return len(windows)
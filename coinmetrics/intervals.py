@@ -0,0 +1,155 @@
+"""
+Coin Metrics API Time Interval Helpers
+
+Helpers for translating the timestamps accepted and returned by the API to
+epoch seconds and for splitting a time range into request windows.
+"""
+
+import calendar
+import numbers
+from datetime import datetime, timezone
+from dateutil import parser
+
+#: Number of seconds between two consecutive points for each :samp:`time_agg`.
+STEPS = {"day": 86400, "hour": 3600}
+
+
+def step(time_agg):
+    """
+    Number of seconds between two consecutive data points.
+
+    :param time_agg: Interval the time is descritized into: day, hour.
+    :type time_agg: str
+
+    :return: Step size in seconds.
+    :rtype: int
+    """
+    try:
+        return STEPS[time_agg]
+    except KeyError as error:
+        raise ValueError("Unsupported time_agg: '{}'".format(time_agg)) from error
+
+
+def to_epoch(timestamp):
+    """
+    Convert a timestamp to UTC epoch seconds. Naive timestamps are treated
+    as UTC, which is how the API interprets them.
+
+    :param timestamp: Timestamp to convert.
+    :type timestamp: str, datetime or int
+
+    :return: Epoch seconds.
+    :rtype: int
+    """
+    if isinstance(timestamp, numbers.Integral):
+        return int(timestamp)
+    if isinstance(timestamp, str) and len(timestamp) == 24 and timestamp[-1] == "Z":
+        # Fast path for the format returned by the API.
+        return calendar.timegm((int(timestamp[0:4]), int(timestamp[5:7]), int(timestamp[8:10]),
+                                int(timestamp[11:13]), int(timestamp[14:16]),
+                                int(timestamp[17:19]), 0, 0, 0))
+    if not isinstance(timestamp, datetime):
+        timestamp = parser.parse(str(timestamp))
+    return calendar.timegm(timestamp.utctimetuple())
+
+
+def to_timestamp(epoch):
+    """
+    Convert UTC epoch seconds to the timestamp format used by the API.
+
+    :param epoch: Epoch seconds.
+    :type epoch: int
+
+    :return: ISO 8601 timestamp, e.g. :samp:`2019-01-01T00:00:00.000Z`.
+    :rtype: str
+    """
+    return datetime.fromtimestamp(int(epoch), timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def split_range(start, end, window, time_agg="day"):
+    """
+    Split an inclusive time range into consecutive inclusive windows of at
+    most :samp:`window` points each.
+
+    :param start: Start of time inverval.
+    :type start: str, datetime or int
+
+    :param end: End of time inverval.
+    :type end: str, datetime or int
+
+    :param window: Maximum number of points per window.
+    :type window: int
+
+    :param time_agg: Interval the time is descritized into: day, hour.
+    :type time_agg: str
+
+    :return: Inclusive (start, end) pairs in epoch seconds.
+    :rtype: list of tuple
+    """
+    size = step(time_agg)
+    start, end = to_epoch(start), to_epoch(end)
+    windows = []
+    while start <= end:
+        stop = min(start + (window - 1) * size, end)
+        windows.append((start, stop))
+        start = stop + size
+    return windows
+
+
+def subtract(start, end, covered, time_agg="day"):
+    """
+    Compute the parts of an inclusive time range not included in any of
+    the :samp:`covered` ranges.
+
+    :param start: Start of time inverval in epoch seconds.
+    :type start: int
+
+    :param end: End of time inverval in epoch seconds.
+    :type end: int
+
+    :param covered: Inclusive (start, end) pairs in epoch seconds.
+    :type covered: list of tuple
+
+    :param time_agg: Interval the time is descritized into: day, hour.
+    :type time_agg: str
+
+    :return: Inclusive (start, end) pairs in epoch seconds that are missing.
+    :rtype: list of tuple
+    """
+    size = step(time_agg)
+    gaps = []
+    cursor = start
+    for low, high in sorted(covered):
+        if high < cursor:
+            continue
+        if low > end:
+            break
+        if low > cursor:
+            gaps.append((cursor, low - size))
+        cursor = max(cursor, high + size)
+    if cursor <= end:
+        gaps.append((cursor, end))
+    return gaps
+
+
+def merge(ranges, time_agg="day"):
+    """
+    Merge overlapping or adjacent inclusive ranges.
+
+    :param ranges: Inclusive (start, end) pairs in epoch seconds.
+    :type ranges: list of tuple
+
+    :param time_agg: Interval the time is descritized into: day, hour.
+    :type time_agg: str
+
+    :return: Sorted, non-overlapping inclusive (start, end) pairs.
+    :rtype: list of tuple
+    """
+    size = step(time_agg)
+    merged = []
+    for low, high in sorted(ranges):
+        if merged and low <= merged[-1][1] + size:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], high))
+        else:
+            merged.append((low, high))
+    return merged
@@ -0,0 +1,222 @@
+"""
+Coin Metrics API Adaptive Concurrency Limiter
+
+Bounds the number of upstream requests in flight and tunes that bound
+AIMD-style: it grows additively while responses are fast and successful, and
+is cut multiplicatively on throttling (HTTP 429), server errors, exceptions
+or latency well above a low percentile of the recent latencies of the same
+endpoint. Batch pulls sharing one API object therefore settle near the
+highest throughput the API tolerates.
+
+Enable it on any API object with:
+
+.. code-block:: python
+
+  cm = coinmetrics.Community()
+  cm.limiter = coinmetrics.AdaptiveLimiter(initial=4, maximum=32)
+"""
+
+from collections import deque
+import logging
+import threading
+import time
+import urllib.parse
+from .deadline import current
+
+#: Longest wait for a free slot between checks for a cancelled deadline.
+CANCEL_POLL = 0.05
+
+
+def endpoint_kind(request_url):
+    """
+    Endpoint of a request URL without its asset ID, e.g. :samp:`metricdata`
+    for :samp:`.../assets/btc/metricdata?...`.
+
+    :param request_url: Complete request URL.
+    :type request_url: str
+
+    :return: Last path segment of the URL.
+    :rtype: str
+    """
+    return urllib.parse.urlsplit(request_url).path.rstrip("/").rsplit("/", 1)[-1]
+
+
+class AdaptiveLimiter:
+    """
+    Coin Metrics API Adaptive Concurrency Limiter Object
+    """
+    # pylint: disable=R0902,R0913
+
+    def __init__(self, initial=4, minimum=1, maximum=64, backoff=0.5, tolerance=2.0,
+                 history=256, percentile=10, samples=100, min_samples=10):
+        """
+        :param initial: Starting concurrency limit.
+        :type initial: int, optional
+
+        :param minimum: Lowest concurrency limit.
+        :type minimum: int, optional
+
+        :param maximum: Highest concurrency limit.
+        :type maximum: int, optional
+
+        :param backoff: Factor the limit is multiplied by on congestion.
+        :type backoff: float, optional
+
+        :param tolerance: A response slower than this multiple of the baseline
+                          latency of its endpoint counts as congestion.
+        :type tolerance: float, optional
+
+        :param history: Number of limit changes kept in :samp:`history`.
+        :type history: int, optional
+
+        :param percentile: Percentile of the recent latencies of an endpoint used
+                           as its baseline.
+        :type percentile: float, optional
+
+        :param samples: Number of recent latencies kept per endpoint.
+        :type samples: int, optional
+
+        :param min_samples: Latencies of an endpoint needed before its responses
+                            can count as slow.
+        :type min_samples: int, optional
+        """
+        self.logger = logging.getLogger(__name__)
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.backoff = backoff
+        self.tolerance = tolerance
+        self.percentile = percentile
+        self.samples = samples
+        self.min_samples = min_samples
+        self.latencies = {}
+        self.inflight = 0
+        self.last_decrease = 0.0
+        self.counts = {"requests": 0, "throttled": 0, "errors": 0, "slow": 0}
+        #: Recent limit changes as (time, limit, reason) tuples.
+        self.history = deque(maxlen=history)
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """
+        Block until a request may be sent, or until the current deadline
+        (see :py:mod:`coinmetrics.deadline`) expires or is cancelled.
+
+        :raises: RequestCancelledError, DeadlineExceededError
+        """
+        deadline = current()
+        with self.condition:
+            while self.inflight >= max(int(self.limit), self.minimum):
+                if deadline is None:
+                    self.condition.wait()
+                    continue
+                deadline.check()
+                remaining = deadline.remaining()
+                self.condition.wait(CANCEL_POLL if remaining is None
+                                    else max(min(remaining, CANCEL_POLL), 0))
+            self.inflight += 1
+
+    def baseline(self, kind=None):
+        """
+        Baseline latency of an endpoint.
+
+        :param kind: Endpoint, see :py:func:`endpoint_kind`.
+        :type kind: str, optional
+
+        :return: Seconds, :samp:`None` while there are too few samples.
+        :rtype: float
+        """
+        with self.condition:
+            latencies = self.latencies.get(kind, ())
+            if len(latencies) < self.min_samples:
+                return None
+            ordered = sorted(latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile / 100.0))]
+
+    def release(self, began, latency, status=None, error=False, kind=None):
+        """
+        Record the outcome of a request and free its slot.
+
+        :param began: Time the request was sent, from :samp:`time.monotonic()`.
+        :type began: float
+
+        :param latency: Seconds the request took.
+        :type latency: float
+
+        :param status: HTTP status code, when a response was received.
+        :type status: int, optional
+
+        :param error: Whether the request raised.
+        :type error: bool, optional
+
+        :param kind: Endpoint of the request, latencies are compared per endpoint.
+        :type kind: str, optional
+        """
+        with self.condition:
+            self.inflight -= 1
+            self.counts["requests"] += 1
+            if error or status == 429 or (status is not None and status >= 500):
+                reason = "throttled" if status == 429 else "errors"
+                self.counts[reason] += 1
+                self._decrease(began, reason)
+            else:
+                baseline = self.baseline(kind)
+                self.latencies.setdefault(kind, deque(maxlen=self.samples)).append(latency)
+                if baseline is not None and latency > self.tolerance * baseline:
+                    self.counts["slow"] += 1
+                    self._decrease(began, "slow")
+                elif self.limit < self.maximum:
+                    previous = int(self.limit)
+                    self.limit = min(float(self.maximum), self.limit + 1.0 / self.limit)
+                    if int(self.limit) != previous:
+                        self._changed("increase")
+            self.condition.notify_all()
+
+    def _decrease(self, began, reason):
+        """
+        Cut the limit, at most once for all requests sent before the last cut.
+        """
+        if began < self.last_decrease:
+            return
+        self.last_decrease = time.monotonic()
+        self.limit = max(float(self.minimum), self.limit * self.backoff)
+        self._changed(reason)
+
+    def _changed(self, reason):
+        """
+        Record a limit change.
+        """
+        self.history.append((time.time(), int(self.limit), reason))
+        self.logger.debug("Concurrency limit %s (%s).", int(self.limit), reason)
+
+    def call(self, fetch, *args):
+        """
+        Run a request within the limit. :samp:`fetch` must return
+        (status, body) like :py:func:`coinmetrics.base.Base._fetch`.
+
+        :return: The result of :samp:`fetch`.
+        :rtype: tuple
+        """
+        kind = endpoint_kind(args[0]) if args and isinstance(args[0], str) else None
+        self.acquire()
+        began = time.monotonic()
+        try:
+            result = fetch(*args)
+        except Exception:
+            self.release(began, time.monotonic() - began, error=True, kind=kind)
+            raise
+        self.release(began, time.monotonic() - began, status=result[0], kind=kind)
+        return result
+
+    def snapshot(self):
+        """
+        Current state of the limiter.
+
+        :return: Current limit, requests in flight, baseline latency in seconds per
+                 endpoint, outcome counters and the recent limit changes.
+        :rtype: dict
+        """
+        with self.condition:
+            return {"limit": int(self.limit), "inflight": self.inflight,
+                    "baseline": {kind: self.baseline(kind) for kind in self.latencies},
+                    "counts": dict(self.counts), "history": list(self.history)}
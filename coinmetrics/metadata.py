@@ -0,0 +1,230 @@
+"""
+Coin Metrics API Metadata Index
+
+Builds an in-memory index of the asset, exchange, market and metric catalogs
+from one fetch of each :samp:`*_info` endpoint. Lookups by ID are hash
+lookups, the relations between the catalogs are available as inverted maps
+and coverage ranges can be queried without scanning the catalogs.
+
+Setting the index on an API object makes the checker functions validate
+against it instead of downloading the catalogs again for every request:
+
+.. code-block:: python
+
+  cm = coinmetrics.Community()
+  cm.metadata = coinmetrics.MetadataIndex(cm).load()
+  cm.metadata.markets_by_quote("usd")
+  cm.metadata.covering("assets", "2015-01-01", "2019-01-01")
+"""
+
+from bisect import bisect_right
+from collections import defaultdict
+import logging
+from .intervals import to_epoch
+
+#: Catalogs held by the index, by name, with the :samp:`Community` method fetching each.
+CATALOGS = {"assets": "get_asset_info", "exchanges": "get_exchange_info",
+            "markets": "get_market_info", "metrics": "get_metric_info"}
+
+
+def parse_market(market):
+    """
+    Split a market ID such as :samp:`coinbase-btc-usd-spot` into its parts.
+
+    :param market: Unique ID corresponding to the market.
+    :type market: str
+
+    :return: Exchange, base asset, quote asset and market type, :samp:`None` for
+             parts the ID does not carry.
+    :rtype: tuple
+    """
+    parts = market.split("-")
+    if len(parts) < 4:
+        return (parts + [None] * 4)[:4]
+    # Exchange IDs may themselves contain dashes.
+    return "-".join(parts[:-3]), parts[-3], parts[-2], parts[-1]
+
+
+class MetadataIndex:
+    """
+    Coin Metrics API Metadata Index Object
+    """
+    def __init__(self, community):
+        """
+        :param community: API object used to fetch the catalogs.
+        :type community: coinmetrics.community.Community
+        """
+        self.logger = logging.getLogger(__name__)
+        self.community = community
+        #: Information objects by ID, for each catalog in :samp:`CATALOGS`.
+        self.catalogs = {name: {} for name in CATALOGS}
+        self.relations = {}
+        self.ranges = {}
+
+    def load(self):
+        """
+        Fetch every catalog and rebuild the index.
+
+        :return: The index itself.
+        :rtype: MetadataIndex
+        """
+        catalogs = {name: {info["id"]: info for info in getattr(self.community, method)()}
+                    for name, method in CATALOGS.items()}
+        self.catalogs = catalogs
+        self._build()
+        self.logger.debug("Indexed %s.", {name: len(infos) for name, infos in catalogs.items()})
+        return self
+
+    def _build(self):
+        """
+        Build the inverted maps and the coverage ranges.
+        """
+        relations = defaultdict(lambda: defaultdict(set))
+        for asset, info in self.catalogs["assets"].items():
+            for metric in info.get("metrics", []):
+                relations["asset_metrics"][asset].add(metric)
+                relations["metric_assets"][metric].add(asset)
+            for exchange in info.get("exchanges", []):
+                relations["asset_exchanges"][asset].add(exchange)
+            for market in info.get("markets", []):
+                relations["asset_markets"][asset].add(market)
+        for market, info in self.catalogs["markets"].items():
+            exchange, base, quote, kind = parse_market(market)
+            exchange, base = info.get("exchange", exchange), info.get("base", base)
+            quote, kind = info.get("quote", quote), info.get("type", kind)
+            relations["quote_markets"][quote].add(market)
+            relations["base_markets"][base].add(market)
+            relations["exchange_markets"][exchange].add(market)
+            relations["asset_exchanges"][base].add(exchange)
+            relations["asset_markets"][base].add(market)
+            relations["type_markets"][kind].add(market)
+        for exchange, info in self.catalogs["exchanges"].items():
+            for market in info.get("marketsInfo", []):
+                relations["exchange_markets"][exchange].add(market["id"])
+        for metric, info in self.catalogs["metrics"].items():
+            relations["category_metrics"][info.get("category")].add(metric)
+        self.relations = {name: {key: frozenset(values) for key, values in mapping.items()}
+                          for name, mapping in relations.items()}
+        self.ranges = {}
+        for name, infos in self.catalogs.items():
+            spans = sorted((to_epoch(info["minTime"]), to_epoch(info["maxTime"]), key)
+                           for key, info in infos.items()
+                           if info.get("minTime") and info.get("maxTime"))
+            self.ranges[name] = ([span[0] for span in spans], spans)
+
+    def _related(self, relation, key):
+        """
+        Look up an inverted map.
+        """
+        return self.relations.get(relation, {}).get(key, frozenset())
+
+    def get(self, catalog, key):
+        """
+        Information object of a catalog entry.
+
+        :param catalog: One of :samp:`assets`, :samp:`exchanges`, :samp:`markets`, :samp:`metrics`.
+        :type catalog: str
+
+        :param key: Unique ID of the entry.
+        :type key: str
+
+        :return: Information object, or :samp:`None` when the ID is unknown.
+        :rtype: dict
+        """
+        return self.catalogs[catalog].get(key)
+
+    def __contains__(self, item):
+        """
+        Whether a (catalog, ID) pair is indexed.
+        """
+        catalog, key = item
+        return key in self.catalogs[catalog]
+
+    def asset_metrics(self, asset):
+        """
+        :return: Metric IDs carried by an asset.
+        :rtype: frozenset
+        """
+        return self._related("asset_metrics", asset)
+
+    def assets_with_metric(self, metric):
+        """
+        :return: Asset IDs carrying a metric.
+        :rtype: frozenset
+        """
+        return self._related("metric_assets", metric)
+
+    def exchanges_for_asset(self, asset):
+        """
+        :return: Exchange IDs listing an asset.
+        :rtype: frozenset
+        """
+        return self._related("asset_exchanges", asset)
+
+    def markets_for_asset(self, asset):
+        """
+        :return: Market IDs with an asset as their base.
+        :rtype: frozenset
+        """
+        return self._related("asset_markets", asset)
+
+    def markets_by_quote(self, quote):
+        """
+        :return: Market IDs quoted in an asset, e.g. :samp:`usd`.
+        :rtype: frozenset
+        """
+        return self._related("quote_markets", quote)
+
+    def markets_by_exchange(self, exchange):
+        """
+        :return: Market IDs of an exchange.
+        :rtype: frozenset
+        """
+        return self._related("exchange_markets", exchange)
+
+    def markets_by_type(self, kind):
+        """
+        :return: Market IDs of a type, e.g. :samp:`spot`.
+        :rtype: frozenset
+        """
+        return self._related("type_markets", kind)
+
+    def metrics_by_category(self, category):
+        """
+        :return: Metric IDs of a category.
+        :rtype: frozenset
+        """
+        return self._related("category_metrics", category)
+
+    def coverage(self, catalog, key):
+        """
+        Time range an entry has data for.
+
+        :return: Inclusive (start, end) in epoch seconds, or :samp:`None`.
+        :rtype: tuple
+        """
+        info = self.get(catalog, key)
+        if info is None or not info.get("minTime") or not info.get("maxTime"):
+            return None
+        return to_epoch(info["minTime"]), to_epoch(info["maxTime"])
+
+    def covering(self, catalog, start, end):
+        """
+        Entries with data over a whole time range.
+
+        :param catalog: One of :samp:`assets`, :samp:`exchanges`, :samp:`markets`.
+        :type catalog: str
+
+        :param start: Start of time inverval.
+        :type start: str, datetime or int
+
+        :param end: End of time inverval.
+        :type end: str, datetime or int
+
+        :return: Unique IDs, ordered by first timestamp.
+        :rtype: list
+        """
+        starts, spans = self.ranges.get(catalog, ([], []))
+        end = to_epoch(end)
+        return [key for _, last, key in spans[:bisect_right(starts, to_epoch(start))]
+                if last >= end]
@@ -0,0 +1,232 @@
+"""
+Coin Metrics API Streaming Pipeline
+
+Fetches asset metric data in chunks and pushes each chunk through optional
+transforms into one or more sinks, without holding the full result in memory.
+Every stage is connected by a bounded queue: when a sink falls behind its
+queue fills up, the stage feeding it blocks, and the fetch workers stop
+taking new chunks. A slow sink therefore throttles fetching instead of
+letting buffered results grow.
+
+Sinks are any object with a :samp:`write(asset, data)` method, such as the
+sinks of :py:mod:`coinmetrics.sinks`. :samp:`CallbackSink` hands chunks to a
+function, for instance the :samp:`put` method of an in-process queue.
+
+.. code-block:: python
+
+  from coinmetrics.pipeline import Pipeline, drop_nulls
+  from coinmetrics.sinks import CSVSink, SQLSink
+
+  csv, sql = CSVSink("prices.csv"), SQLSink("prices.sqlite")
+  pipeline = Pipeline(cm, [csv, sql], transforms=[drop_nulls], workers=8, buffer=4)
+  summary = pipeline.run(pipeline.plan(["btc", "eth"], "PriceUSD,TxCnt",
+                                       "2015-01-01", "2019-12-31"))
+  csv.close()
+  sql.close()
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import queue
+import threading
+from .deadline import bind
+from .intervals import split_range, to_timestamp
+
+_DONE = object()
+
+
+class CallbackSink:
+    """
+    Hand every chunk to a function.
+    """
+    def __init__(self, function):
+        """
+        :param function: Called as :samp:`function(asset, data)` for every chunk.
+        :type function: callable
+        """
+        self.function = function
+
+    def write(self, asset, data):
+        """
+        Pass one chunk to the function.
+
+        :return: Number of rows in the chunk.
+        :rtype: int
+        """
+        self.function(asset, data)
+        return len(data["series"])
+
+    def close(self):
+        """
+        Nothing to close.
+        """
+
+
+class Pipeline:
+    """
+    Coin Metrics API Streaming Pipeline Object
+    """
+    # pylint: disable=R0913
+
+    def __init__(self, community, sinks, transforms=(), workers=4, buffer=8, window=365):
+        """
+        :param community: API object used for all requests.
+        :type community: coinmetrics.community.Community
+
+        :param sinks: Objects every chunk is written to.
+        :type sinks: list
+
+        :param transforms: Functions applied in order as :samp:`transform(asset, data)`,
+                           each returning the new data object, or :samp:`None` to drop
+                           the chunk.
+        :type transforms: list of callable, optional
+
+        :param workers: Number of concurrent requests.
+        :type workers: int, optional
+
+        :param buffer: Chunks held between two stages before the earlier stage blocks.
+        :type buffer: int, optional
+
+        :param window: Points per metric per chunk used by :py:func:`plan`.
+        :type window: int, optional
+        """
+        self.logger = logging.getLogger(__name__)
+        self.community = community
+        self.sinks = list(sinks)
+        self.transforms = list(transforms)
+        self.workers = workers
+        self.buffer = buffer
+        self.window = window
+
+    def plan(self, assets, metrics, start, end, time_agg="day"):
+        """
+        Split a pull into chunks of at most :samp:`window` points.
+
+        :param assets: Asset IDs.
+        :type assets: list
+
+        :param metrics: Unique ID corresponding to the metrics.
+        :type metrics: str
+
+        :return: (asset, metrics, start, end, time_agg) requests.
+        :rtype: list of tuple
+
+        :Parameters: See :py:func:`coinmetrics.community.Community.get_asset_metric_data`
+                     for :samp:`start`, :samp:`end` and :samp:`time_agg`.
+        """
+        return [(asset, metrics, to_timestamp(low), to_timestamp(high), time_agg)
+                for low, high in split_range(start, end, self.window, time_agg)
+                for asset in assets]
+
+    def run(self, requests):
+        """
+        Fetch every request and stream the chunks into the sinks. Chunks reach
+        the sinks in completion order. A failed request is reported and the
+        others continue; a failing transform or sink stops the pipeline and its
+        error is raised once every stage has stopped.
+
+        :param requests: (asset, metrics, start, end[, time_agg]) tuples, for instance
+                         from :py:func:`plan`.
+        :type requests: list of tuple
+
+        :return: Number of :samp:`chunks` fetched, :samp:`rows` written to each sink
+                 and the :samp:`failed` requests.
+        :rtype: dict
+        """
+        requests = list(requests)
+        fetched = queue.Queue(maxsize=self.buffer)
+        outputs = [queue.Queue(maxsize=self.buffer) for _ in self.sinks]
+        stopped = threading.Event()
+        state = {"rows": [0] * len(self.sinks), "error": None, "failed": [], "chunks": 0}
+        writers = [threading.Thread(target=self._write, args=(index, output, stopped, state),
+                                    daemon=True)
+                   for index, output in enumerate(outputs)]
+        for writer in writers:
+            writer.start()
+        fetch = bind(self._fetch)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for request in requests:
+                executor.submit(fetch, request, fetched, stopped)
+            for _ in requests:
+                request, data, error = fetched.get()
+                if error is not None:
+                    self.logger.warning("Pipeline request failed %s: %s", request, error)
+                    state["failed"].append(request)
+                    continue
+                if data is None or stopped.is_set():
+                    continue
+                state["chunks"] += 1
+                try:
+                    data = self._transform(request[0], data)
+                except Exception as failure:  # pylint: disable=W0703
+                    state["error"] = state["error"] or failure
+                    stopped.set()
+                    continue
+                if data is not None:
+                    for output in outputs:
+                        output.put((request[0], data))
+        for output in outputs:
+            output.put(_DONE)
+        for writer in writers:
+            writer.join()
+        error = state["error"]
+        if isinstance(error, BaseException):
+            raise error
+        return {"chunks": state["chunks"], "rows": state["rows"], "failed": state["failed"]}
+
+    def _fetch(self, request, fetched, stopped):
+        """
+        Fetch one request and queue its result, blocking while the queue is full.
+        """
+        if stopped.is_set():
+            fetched.put((request, None, None))
+            return
+        asset, metrics, start, end, time_agg = (tuple(request) + ("day",))[:5]
+        try:
+            data = self.community.get_asset_metric_data(asset, metrics, start, end, time_agg)
+        except Exception as error:  # pylint: disable=W0703
+            fetched.put((request, None, error))
+            return
+        fetched.put((request, data, None))
+
+    def _transform(self, asset, data):
+        """
+        Apply the transforms to a chunk.
+        """
+        for transform in self.transforms:
+            data = transform(asset, data)
+            if data is None:
+                return None
+        return data
+
+    def _write(self, index, output, stopped, state):
+        """
+        Write the chunks of one sink until the pipeline is finished. After a
+        failure the remaining chunks are discarded so no stage stays blocked.
+        """
+        sink = self.sinks[index]
+        while True:
+            item = output.get()
+            if item is _DONE:
+                return
+            if stopped.is_set():
+                continue
+            try:
+                state["rows"][index] += sink.write(*item)
+            except Exception as error:  # pylint: disable=W0703
+                self.logger.warning("Pipeline sink %s failed: %s", type(sink).__name__, error)
+                state["error"] = state["error"] or error
+                stopped.set()
+
+
+def drop_nulls(asset, data):
+    """
+    Transform removing the rows without any value.
+
+    :return: Data object holding the remaining rows.
+    :rtype: dict
+    """
+    # pylint: disable=W0613
+    return {"metrics": data["metrics"],
+            "series": [row for row in data["series"]
+                       if any(value is not None for value in row["values"])]}
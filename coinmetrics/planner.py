@@ -0,0 +1,107 @@
+"""
+Coin Metrics API Query Planner
+
+A drop-in front end for :py:func:`coinmetrics.community.Community.get_asset_metric_data`
+that only requests the (asset, metric, time_agg, time range) cells that are
+not already held in a :py:class:`coinmetrics.store.SeriesStore`.
+"""
+
+import logging
+from .intervals import step, to_epoch, to_timestamp
+from .store import SeriesStore
+
+
+class QueryPlanner:
+    """
+    Coin Metrics API Query Planner Object
+    """
+    def __init__(self, community, store=None):
+        """
+        :param community: API object used for all requests.
+        :type community: coinmetrics.community.Community
+
+        :param store: Store holding previously fetched data.
+        :type store: coinmetrics.store.SeriesStore, optional
+        """
+        self.logger = logging.getLogger(__name__)
+        self.community = community
+        self.store = store if store is not None else SeriesStore()
+
+    def plan(self, asset, metrics, start, end, time_agg="day"):
+        """
+        Compute the sub-requests needed to fill the gaps of a query. Metrics
+        missing exactly the same time ranges share their requests.
+
+        :param asset: Unique ID corresponding to the asset's ticker.
+        :type asset: str
+
+        :param metrics: Unique ID corresponding to the metrics.
+        :type metrics: str
+
+        :param start: Start of time inverval.
+        :type start: str or datetime
+
+        :param end: End of time inverval.
+        :type end: str or datetime
+
+        :param time_agg: Interval the time is descritized into: day, hour.
+        :type time_agg: str
+
+        :return: (metrics, start, end) sub-requests, times in epoch seconds.
+        :rtype: list of tuple
+        """
+        start, end = self._align(start, end, time_agg)
+        groups = {}
+        for metric in metrics.split(","):
+            gaps = tuple(self.store.missing(asset, metric, start, end, time_agg))
+            if gaps:
+                groups.setdefault(gaps, []).append(metric)
+        return [(",".join(group), low, high)
+                for gaps, group in groups.items() for low, high in gaps]
+
+    def get_asset_metric_data(self, asset, metrics, start, end, time_agg="day"):
+        """
+        Fetch metric(s) data the same way as
+        :py:func:`coinmetrics.community.Community.get_asset_metric_data`,
+        sending only the sub-requests returned by :py:func:`plan`.
+
+        :return: Coin Metrics API data object.
+        :rtype: dict
+        """
+        # pylint: disable=R0913
+        if metrics == "all":
+            metrics = ",".join(self.community.get_asset_metrics(asset))
+        requests = self.plan(asset, metrics, start, end, time_agg)
+        self.logger.debug("Planned %s sub-requests for '%s'.", len(requests), asset)
+        for group, low, high in requests:
+            data = self.community.get_asset_metric_data(asset, group, to_timestamp(low),
+                                                        to_timestamp(high), time_agg)
+            self.store.put(asset, data, low, high, time_agg)
+        return self.assemble(asset, metrics, start, end, time_agg)
+
+    def assemble(self, asset, metrics, start, end, time_agg="day"):
+        """
+        Build a Coin Metrics API data object from the store.
+
+        :return: Coin Metrics API data object.
+        :rtype: dict
+        """
+        # pylint: disable=R0913
+        start, end = self._align(start, end, time_agg)
+        metrics = metrics.split(",")
+        columns = [dict(self.store.get(asset, metric, start, end, time_agg))
+                   for metric in metrics]
+        times = sorted(set().union(*columns))
+        return {"metrics": metrics,
+                "series": [{"time": to_timestamp(epoch),
+                            "values": [column.get(epoch) for column in columns]}
+                           for epoch in times]}
+
+    @staticmethod
+    def _align(start, end, time_agg):
+        """
+        Round a time range inwards to the :samp:`time_agg` grid.
+        """
+        size = step(time_agg)
+        start, end = to_epoch(start), to_epoch(end)
+        return -(-start // size) * size, end // size * size
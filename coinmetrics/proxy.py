@@ -0,0 +1,120 @@
+"""
+Coin Metrics API Caching Proxy
+
+A small HTTP server answering the same v2 routes as the upstream API
+(:samp:`assets`, :samp:`metrics`, :samp:`asset_info`,
+:samp:`assets/<id>/metricdata`, ...) from a shared
+:py:class:`coinmetrics.cache.ResponseCache`. Concurrent identical queries are
+coalesced, so a whole team sends one upstream request per unique query.
+
+Start it with :samp:`coinmetrics proxy --port 8080` and point clients at it:
+
+.. code-block:: python
+
+  cm = coinmetrics.Community()
+  cm.host_url = "http://localhost:8080/v2/"
+"""
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import logging
+import threading
+from .cache import ResponseCache
+from .community import Community
+
+PREFIX = "/v2/"
+
+
+class ProxyHandler(BaseHTTPRequestHandler):
+    """
+    Forward :samp:`GET /v2/...` requests to the upstream API object of the server.
+    """
+    def do_GET(self):  # pylint: disable=C0103
+        """
+        Answer a request from the cache or upstream.
+        """
+        api = self.server.community
+        if not self.path.startswith(PREFIX):
+            self._reply(404, json.dumps({"error": "Unknown route"}).encode("utf-8"))
+            return
+        endpoint, _, query = self.path[len(PREFIX):].partition("?")
+        try:
+            status, body = api._get(api.host_url + endpoint + "?" + query)  # pylint: disable=W0212
+        except Exception as error:  # pylint: disable=W0703
+            self.server.logger.warning("Upstream request failed: %s", error)
+            self._reply(502, json.dumps({"error": str(error)}).encode("utf-8"))
+            return
+        self._reply(status, body)
+
+    def _reply(self, status, body):
+        """
+        Send a JSON response.
+        """
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # pylint: disable=W0622
+        """
+        Route access logs through the module logger.
+        """
+        self.server.logger.debug(format, *args)
+
+
+class ProxyServer(ThreadingHTTPServer):
+    """
+    Coin Metrics API Caching Proxy Object
+    """
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=8080, community=None, cache=None):
+        """
+        :param host: Interface to listen on.
+        :type host: str, optional
+
+        :param port: Port to listen on, 0 picks a free port.
+        :type port: int, optional
+
+        :param community: API object used for upstream requests.
+        :type community: coinmetrics.community.Community, optional
+
+        :param cache: Response cache, defaults to a 5 minute cache.
+        :type cache: coinmetrics.cache.ResponseCache, optional
+        """
+        super().__init__((host, port), ProxyHandler)
+        self.logger = logging.getLogger(__name__)
+        self.community = community if community is not None else Community()
+        if cache is not None or self.community.cache is None:
+            self.community.cache = cache if cache is not None else ResponseCache()
+        self.thread = None
+
+    @property
+    def url(self):
+        """
+        Value to use as :samp:`host_url` on clients.
+        """
+        host, port = self.server_address[:2]
+        return "http://{}:{}{}".format(host, port, PREFIX)
+
+    def start(self):
+        """
+        Serve requests from a background thread.
+
+        :return: The server.
+        :rtype: ProxyServer
+        """
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        self.logger.info("Proxy listening on %s", self.url)
+        return self
+
+    def stop(self):
+        """
+        Stop serving and release the socket.
+        """
+        self.shutdown()
+        self.server_close()
+        if self.thread is not None:
+            self.thread.join()
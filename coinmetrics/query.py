@@ -0,0 +1,111 @@
+"""
+Coin Metrics API Lazy Query Module Definitions
+
+Records calls to the single metric :ref:`conveniance_methods` and sends them
+as one multi-metric :py:func:`coinmetrics.community.Community.get_asset_metric_data`
+request when the query is executed.
+"""
+
+
+class _Recorder:
+    """
+    Stand-in for :samp:`self` while replaying a conveniance method: the
+    metric the method asks for is recorded instead of fetched.
+    """
+    # pylint: disable=R0903,R0913
+
+    def __init__(self):
+        self.metrics = []
+
+    def get_asset_metric_data(self, asset, metrics, start, end, time_agg="day"):
+        """
+        Record the requested metrics.
+        """
+        # pylint: disable=W0613
+        self.metrics.append(metrics)
+
+
+class LazyQuery:
+    """
+    Coin Metrics API Lazy Query Object
+    """
+    def __init__(self, community, asset, start, end, time_agg="day"):
+        """
+        Usually created through :py:func:`coinmetrics.community.Community.query`.
+
+        :param community: API object used for the request.
+        :type community: coinmetrics.community.Community
+
+        :param asset: Unique ID corresponding to the asset's ticker.
+        :type asset: str
+
+        :param start: Start of time inverval.
+        :type start: str or datetime
+
+        :param end: End of time inverval.
+        :type end: str or datetime
+
+        :param time_agg: Interval the time is descritized into: day, hour.
+        :type time_agg: str, optional
+        """
+        # pylint: disable=R0913
+        self.community = community
+        self.asset = asset
+        self.start = start
+        self.end = end
+        self.time_agg = time_agg
+        self.metrics = []
+
+    def metric(self, metrics):
+        """
+        Add metric(s) to the query.
+
+        :param metrics: Unique ID corresponding to the metrics.
+        :type metrics: str
+
+        :return: The query, for chaining.
+        :rtype: LazyQuery
+        """
+        for metric in metrics.split(","):
+            if metric not in self.metrics:
+                self.metrics.append(metric)
+        return self
+
+    def __getattr__(self, name):
+        """
+        Expose every conveniance method of the API object (and its aliases)
+        as a method taking no arguments that adds its metric to the query.
+        Methods whose replay does not request asset metric data are rejected.
+        """
+        method = getattr(type(self.community), name, None)
+        if name.startswith("_") or not callable(method):
+            raise AttributeError("'LazyQuery' object has no attribute '{}'".format(name))
+
+        def record():
+            recorder = _Recorder()
+            try:
+                method(recorder, self.asset, self.start, self.end)
+            except (AttributeError, TypeError) as error:
+                raise AttributeError("'{}' is not a single metric method".format(name)) \
+                    from error
+            if not recorder.metrics:
+                raise AttributeError("'{}' is not a single metric method".format(name))
+            for metrics in recorder.metrics:
+                self.metric(metrics)
+            return self
+        return record
+
+    def execute(self):
+        """
+        Fetch all recorded metrics in one request and split the result back
+        out per metric.
+
+        :return: Coin Metrics API data object for each metric, keyed by metric ID.
+        :rtype: dict
+        """
+        data = self.community.get_asset_metric_data(self.asset, ",".join(self.metrics),
+                                                    self.start, self.end, self.time_agg)
+        return {metric: {"metrics": [metric],
+                         "series": [{"time": row["time"], "values": [row["values"][i]]}
+                                    for row in data["series"]]}
+                for i, metric in enumerate(data["metrics"])}
@@ -0,0 +1,181 @@
+"""
+Coin Metrics API Background Refresher
+
+Keeps the latest points of a watchlist of series in memory. A background
+thread polls just after each daily or hourly publication, fetches only the
+timestamps newer than what it already holds and appends them to a fixed size
+ring buffer per (asset, metric). "Last N points" reads are then answered
+from memory without a request.
+
+.. code-block:: python
+
+  cm = coinmetrics.Community()
+  refresher = cm.refresher({"btc": ["PriceUSD", "TxCnt"], "eth": ["PriceUSD"]}, capacity=90)
+  refresher.start()
+  prices = refresher.latest("btc", "PriceUSD", 30)
+"""
+
+from collections import deque
+import itertools
+import logging
+import threading
+import time
+from .intervals import step, to_epoch, to_timestamp
+
+
+class Refresher:
+    """
+    Coin Metrics API Background Refresher Object
+    """
+    # pylint: disable=R0902,R0913
+
+    def __init__(self, community, watchlist, time_agg="day", capacity=365, delay=600,
+                 retry=60, clock=time.time):
+        """
+        :param community: API object used for all requests.
+        :type community: coinmetrics.community.Community
+
+        :param watchlist: Metric IDs to keep, by asset ID, as lists or comma separated strings.
+        :type watchlist: dict
+
+        :param time_agg: Interval the time is descritized into: day, hour.
+        :type time_agg: str, optional
+
+        :param capacity: Number of points kept per series.
+        :type capacity: int, optional
+
+        :param delay: Seconds after each interval boundary before polling, to let
+                      the new point be published.
+        :type delay: float, optional
+
+        :param retry: Seconds before polling again after a failed refresh.
+        :type retry: float, optional
+
+        :param clock: Returns the current epoch time.
+        :type clock: callable, optional
+        """
+        self.logger = logging.getLogger(__name__)
+        self.community = community
+        self.watchlist = {asset: metrics.split(",") if isinstance(metrics, str) else list(metrics)
+                          for asset, metrics in watchlist.items()}
+        self.time_agg = time_agg
+        self.step = step(time_agg)
+        self.capacity = capacity
+        self.delay = delay
+        self.retry = retry
+        self.clock = clock
+        self.buffers = {(asset, metric): deque(maxlen=capacity)
+                        for asset, metrics in self.watchlist.items() for metric in metrics}
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def next_run(self, now=None):
+        """
+        Time of the next poll: :samp:`delay` seconds after the next interval boundary.
+
+        :param now: Epoch time, defaults to the clock.
+        :type now: float, optional
+
+        :return: Epoch time of the next poll.
+        :rtype: float
+        """
+        now = self.clock() if now is None else now
+        boundary = now // self.step * self.step + self.delay
+        return boundary if boundary > now else boundary + self.step
+
+    def refresh(self):
+        """
+        Fetch the points newer than the last one held for each asset. The
+        last point held is fetched again so that a late revision replaces it.
+
+        :return: Number of new points per asset.
+        :rtype: dict
+        """
+        end = int(self.clock()) // self.step * self.step
+        added = {}
+        for asset, metrics in self.watchlist.items():
+            with self.lock:
+                last = [self.buffers[asset, metric][-1][0] for metric in metrics
+                        if self.buffers[asset, metric]]
+            start = min(last) if len(last) == len(metrics) else \
+                end - (self.capacity - 1) * self.step
+            data = self.community.get_asset_metric_data(asset, ",".join(metrics),
+                                                        to_timestamp(start), to_timestamp(end),
+                                                        self.time_agg)
+            added[asset] = self._append(asset, data)
+        self.logger.debug("Refreshed: %s", added)
+        return added
+
+    def _append(self, asset, data):
+        """
+        Append the rows of a :samp:`metricData` object to the ring buffers.
+        """
+        added = 0
+        with self.lock:
+            for row in data["series"]:
+                epoch = to_epoch(row["time"])
+                for metric, value in zip(data["metrics"], row["values"]):
+                    buffer = self.buffers[asset, metric]
+                    if buffer and buffer[-1][0] >= epoch:
+                        if buffer[-1][0] == epoch:
+                            buffer[-1] = (epoch, value)
+                        continue
+                    buffer.append((epoch, value))
+                    added += 1
+        return added
+
+    def latest(self, asset, metric, count=None):
+        """
+        Read the newest points of a series from memory.
+
+        :param asset: Unique ID corresponding to the asset's ticker.
+        :type asset: str
+
+        :param metric: Unique ID corresponding to the metric.
+        :type metric: str
+
+        :param count: Number of points, defaults to every point held.
+        :type count: int, optional
+
+        :return: (epoch, value) pairs, oldest first.
+        :rtype: list of tuple
+
+        :raises: KeyError when the series is not on the watchlist.
+        """
+        with self.lock:
+            buffer = self.buffers[asset, metric]
+            if count is None or count >= len(buffer):
+                return list(buffer)
+            return list(itertools.islice(reversed(buffer), count))[::-1]
+
+    def start(self):
+        """
+        Refresh now, then keep refreshing in a daemon thread until :py:func:`stop`.
+        """
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self._run, name="coinmetrics-refresher",
+                                       daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stop the background thread.
+        """
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def _run(self):
+        """
+        Poll on the publication schedule until stopped.
+        """
+        while not self.stopped.is_set():
+            try:
+                self.refresh()
+                wait = self.next_run() - self.clock()
+            except Exception as error:  # pylint: disable=W0703
+                self.logger.warning("Refresh failed, retrying in %ss: %s", self.retry, error)
+                wait = self.retry
+            self.stopped.wait(max(wait, 0))
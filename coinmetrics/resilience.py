@@ -0,0 +1,200 @@
+"""
+Coin Metrics API Resilience
+
+Keeps reads working while the upstream API is slow or down:
+
+- :samp:`ResilientCache` extends :py:class:`coinmetrics.cache.ResponseCache`
+  with stale-while-revalidate. Once a response is past its TTL it is still
+  served immediately, flagged as stale, while a background request refreshes
+  it. Stale responses are also served when a refresh fails.
+- :samp:`CircuitBreaker` stops sending requests after repeated failures and
+  lets a single probe through once the reset timeout has passed.
+
+.. code-block:: python
+
+  cm = coinmetrics.Community()
+  cm.cache = coinmetrics.ResilientCache(ttl=300, max_stale=86400)
+  cm.breaker = coinmetrics.CircuitBreaker()
+  assets = cm.get_asset_info()
+  if coinmetrics.resilience.was_stale():
+      LOG.info("Served from cache while the API is unavailable.")
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import threading
+import time
+from .cache import ResponseCache
+from .errors import CircuitOpenError
+
+_LOCAL = threading.local()
+
+
+def was_stale():
+    """
+    Whether the last response read through a :samp:`ResilientCache` on this
+    thread was served stale.
+
+    :rtype: bool
+    """
+    return getattr(_LOCAL, "stale", False)
+
+
+def _failed(status):
+    """
+    Whether a status code means the upstream is failing.
+    """
+    return status == 429 or status >= 500
+
+
+class ResilientCache(ResponseCache):
+    """
+    Coin Metrics API Stale-While-Revalidate Cache Object
+    """
+    def __init__(self, ttl=300, max_stale=86400, max_entries=1024, workers=4):
+        """
+        :param ttl: Seconds a response is served as fresh.
+        :type ttl: int, optional
+
+        :param max_stale: Seconds past the TTL a response may still be served
+                          while it is refreshed in the background.
+        :type max_stale: int, optional
+
+        :param max_entries: Number of responses kept.
+        :type max_entries: int, optional
+
+        :param workers: Threads used for background refreshes.
+        :type workers: int, optional
+        """
+        super().__init__(ttl=ttl, max_entries=max_entries)
+        self.logger = logging.getLogger(__name__)
+        self.max_stale = max_stale
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.refreshing = set()
+        self.stale_served = 0
+
+    def get_or_fetch(self, key, fetch):
+        """
+        Return a fresh response, or a stale one while it is refreshed in the
+        background, or fetch it. A stale response is also returned when the
+        fetch fails. See :py:func:`was_stale` for the stale flag.
+
+        :return: (status, body)
+        :rtype: tuple
+        """
+        _LOCAL.stale = False
+        cached = self.lookup(key)
+        if cached is not None and self.ttl is not None and cached[2] >= self.ttl:
+            if cached[2] < self.ttl + self.max_stale:
+                self._refresh(key, fetch)
+                return self._stale(key, cached)
+            try:
+                result = super().get_or_fetch(key, fetch)
+            except Exception as error:  # pylint: disable=W0703
+                self.logger.warning("Refresh failed for '%s': %s", key, error)
+                return self._stale(key, cached)
+            return self._stale(key, cached) if _failed(result[0]) else result
+        return super().get_or_fetch(key, fetch)
+
+    def _stale(self, key, cached):
+        """
+        Serve a cached response flagged as stale.
+        """
+        self.logger.debug("Serving stale response for '%s' (%.0fs old).", key, cached[2])
+        self.stale_served += 1
+        _LOCAL.stale = True
+        return cached[0], cached[1]
+
+    def _refresh(self, key, fetch):
+        """
+        Refresh an entry in the background, once at a time per key.
+        """
+        with self.lock:
+            if key in self.refreshing:
+                return
+            self.refreshing.add(key)
+
+        def refresh():
+            try:
+                self.store(key, *fetch())
+            except Exception as error:  # pylint: disable=W0703
+                self.logger.warning("Background refresh failed for '%s': %s", key, error)
+            finally:
+                with self.lock:
+                    self.refreshing.discard(key)
+        self.executor.submit(refresh)
+
+
+class CircuitBreaker:
+    """
+    Coin Metrics API Circuit Breaker Object
+    """
+    # pylint: disable=R0903
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, failures=5, reset_timeout=30):
+        """
+        :param failures: Consecutive failures (exceptions, HTTP 429 or 5xx) that open the circuit.
+        :type failures: int, optional
+
+        :param reset_timeout: Seconds the circuit stays open before a probe is let through.
+        :type reset_timeout: float, optional
+        """
+        self.logger = logging.getLogger(__name__)
+        self.failures = failures
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.consecutive = 0
+        self.opened = 0.0
+        self.lock = threading.Lock()
+
+    def _admit(self):
+        """
+        Decide whether a request may be sent.
+
+        :raises: CircuitOpenError
+        """
+        with self.lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN and time.monotonic() - self.opened >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self.logger.info("Circuit half-open, sending a probe.")
+                return
+            raise CircuitOpenError("Upstream API unavailable, circuit is {}.".format(self.state))
+
+    def _record(self, failed):
+        """
+        Update the state with the outcome of a request.
+        """
+        with self.lock:
+            if not failed:
+                if self.state != self.CLOSED:
+                    self.logger.info("Circuit closed.")
+                self.state, self.consecutive = self.CLOSED, 0
+                return
+            self.consecutive += 1
+            if self.state == self.HALF_OPEN or self.consecutive >= self.failures:
+                if self.state != self.OPEN:
+                    self.logger.warning("Circuit open after %s failures.", self.consecutive)
+                self.state, self.opened = self.OPEN, time.monotonic()
+
+    def call(self, fetch, *args):
+        """
+        Run a request through the breaker. :samp:`fetch` must return
+        (status, body) like :py:func:`coinmetrics.base.Base._fetch`.
+
+        :return: The result of :samp:`fetch`.
+        :rtype: tuple
+
+        :raises: CircuitOpenError
+        """
+        self._admit()
+        try:
+            result = fetch(*args)
+        except Exception:
+            self._record(True)
+            raise
+        self._record(_failed(result[0]))
+        return result
@@ -0,0 +1,141 @@
+"""
+Coin Metrics API Request Shaping
+
+Uses the coverage returned by :py:func:`coinmetrics.community.Community.get_asset_info`
+to shape asset metric data requests: time ranges are clamped to the range
+the asset actually has data for, and ranges are split into windows whose
+estimated response size (rows x metrics) stays near a target payload size.
+"""
+
+import logging
+import threading
+from .intervals import step, to_epoch
+
+
+class RequestShaper:
+    """
+    Coin Metrics API Request Shaper Object
+    """
+    # pylint: disable=R0913
+
+    def __init__(self, community, target_bytes=2 ** 20, row_bytes=40, value_bytes=20):
+        """
+        :param community: API object used to fetch asset information.
+        :type community: coinmetrics.community.Community
+
+        :param target_bytes: Response size to aim for per request.
+        :type target_bytes: int, optional
+
+        :param row_bytes: Estimated size of a row without its values (time and framing).
+        :type row_bytes: int, optional
+
+        :param value_bytes: Estimated size of a single value.
+        :type value_bytes: int, optional
+        """
+        self.logger = logging.getLogger(__name__)
+        self.community = community
+        self.target_bytes = target_bytes
+        self.row_bytes = row_bytes
+        self.value_bytes = value_bytes
+        self.infos = {}
+        self.lock = threading.Lock()
+
+    def info(self, asset):
+        """
+        Asset information, fetched once per asset.
+
+        :param asset: Unique ID corresponding to the asset's ticker.
+        :type asset: str
+
+        :return: Asset information.
+        :rtype: dict
+        """
+        with self.lock:
+            if asset not in self.infos:
+                self.infos[asset] = self.community.get_asset_info(asset)[0]
+            return self.infos[asset]
+
+    def clamp(self, asset, start=None, end=None):
+        """
+        Clamp a time range to the asset's coverage.
+
+        :param start: Start of time inverval, defaults to the first timestamp with data.
+        :type start: str, datetime or int, optional
+
+        :param end: End of time inverval, defaults to the last timestamp with data.
+        :type end: str, datetime or int, optional
+
+        :return: Inclusive (start, end) in epoch seconds, or :samp:`None` when the
+                 range holds no data.
+        :rtype: tuple
+        """
+        info = self.info(asset)
+        if not info.get("minTime") or not info.get("maxTime"):
+            return None
+        low, high = to_epoch(info["minTime"]), to_epoch(info["maxTime"])
+        start = low if start is None else max(low, to_epoch(start))
+        end = high if end is None else min(high, to_epoch(end))
+        return (start, end) if start <= end else None
+
+    def estimate(self, rows, metrics):
+        """
+        Estimate the size of a response.
+
+        :param rows: Number of timestamps.
+        :type rows: int
+
+        :param metrics: Number of metrics.
+        :type metrics: int
+
+        :return: Estimated size in bytes.
+        :rtype: int
+        """
+        return rows * (self.row_bytes + metrics * self.value_bytes)
+
+    def window(self, metrics):
+        """
+        Number of timestamps per request that keeps the estimated response
+        size within the target.
+
+        :param metrics: Number of metrics per request.
+        :type metrics: int
+
+        :return: Timestamps per request.
+        :rtype: int
+        """
+        return max(1, self.target_bytes // self.estimate(1, metrics))
+
+    def shape(self, asset, metrics, start=None, end=None, time_agg="day"):
+        """
+        Shape a request into clamped, size bounded windows. Metrics the asset
+        does not carry are dropped.
+
+        :param asset: Unique ID corresponding to the asset's ticker.
+        :type asset: str
+
+        :param metrics: Unique ID corresponding to the metrics.
+        :type metrics: str
+
+        :return: (metrics, start, end) requests, times in epoch seconds.
+        :rtype: list of tuple
+
+        :Parameters: See :py:func:`clamp` for :samp:`start` and :samp:`end`.
+        """
+        available = self.info(asset)["metrics"]
+        requested = metrics.split(",")
+        metrics = [metric for metric in requested if metric in available]
+        if len(metrics) < len(requested):
+            self.logger.debug("Dropping metrics not carried by '%s': %s", asset,
+                              sorted(set(requested) - set(metrics)))
+        bounds = self.clamp(asset, start, end)
+        if not metrics or bounds is None:
+            return []
+        size = step(time_agg)
+        low, high = -(-bounds[0] // size) * size, bounds[1]
+        span = self.window(len(metrics)) * size
+        requests = []
+        while low <= high:
+            stop = min(low + span - size, high)
+            requests.append((",".join(metrics), low, stop))
+            low = stop + size
+        return requests
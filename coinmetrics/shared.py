@@ -0,0 +1,238 @@
+"""
+Coin Metrics API Shared Cache
+
+A cache shared by every process on a host, kept in a directory on a memory
+backed file system (:samp:`/dev/shm` where available). Catalogs are stored as
+JSON and series as memory-mapped NumPy files, so N worker processes map the
+same pages instead of each holding a copy.
+
+Entries are written to a temporary file and renamed into place, so reads
+never take a lock and never see a partial entry. When an entry is missing,
+the first process to take the entry's file lock fetches it while the others
+wait for it and then read the result, so every entry is fetched once.
+"""
+
+from decimal import Decimal
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+#: Methods replaced by :py:func:`SharedCache.attach`.
+CATALOG_METHODS = ["get_assets", "get_metrics", "get_exchanges", "get_markets",
+                   "get_asset_info", "get_exchange_info", "get_metric_info", "get_market_info"]
+
+
+def default_directory():
+    """
+    Memory backed directory used when none is given.
+
+    :return: Directory path.
+    :rtype: str
+    """
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "coinmetrics")
+
+
+def _dumps(value):
+    """
+    Encode a value as JSON, writing :samp:`Decimal` numbers as exact number literals.
+    """
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, dict):
+        return "{" + ", ".join(json.dumps(str(key)) + ": " + _dumps(item)
+                               for key, item in value.items()) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(_dumps(item) for item in value) + "]"
+    return json.dumps(value, default=str)
+
+
+class SharedCache:
+    """
+    Coin Metrics API Shared Cache Object
+    """
+    def __init__(self, directory=None, ttl=3600):
+        """
+        :param directory: Directory holding the entries.
+        :type directory: str, optional
+
+        :param ttl: Seconds after which catalog entries are fetched again.
+        :type ttl: int, optional
+        """
+        self.logger = logging.getLogger(__name__)
+        self.directory = directory if directory is not None else default_directory()
+        self.ttl = ttl
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key, suffix):
+        """
+        File path of an entry.
+        """
+        return os.path.join(self.directory,
+                            hashlib.sha1(key.encode("utf-8")).hexdigest() + suffix)
+
+    def _fresh(self, path, ttl):
+        """
+        Whether an entry exists and has not expired.
+        """
+        try:
+            age = time.time() - os.stat(path).st_mtime
+        except OSError:
+            return False
+        return ttl is None or age < ttl
+
+    def _once(self, path, ttl, read, fetch):
+        """
+        Read an entry, or fetch it while holding its file lock.
+        """
+        if self._fresh(path, ttl):
+            return read(path)
+        with open(path + ".lock", "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if self._fresh(path, ttl):
+                    return read(path)
+                self.logger.debug("Shared cache miss: '%s'", path)
+                return fetch(path)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _replace(path, write):
+        """
+        Write an entry through a temporary file renamed into place.
+        """
+        handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(handle, "wb") as output:
+                write(output)
+            os.replace(temporary, path)
+        except BaseException:
+            os.remove(temporary)
+            raise
+
+    def catalog(self, key, fetch, ttl=None):
+        """
+        Read a JSON serializable entry, fetching it on a miss.
+
+        :param key: Entry name.
+        :type key: str
+
+        :param fetch: Called without arguments to produce the entry.
+        :type fetch: callable
+
+        :param ttl: Seconds before the entry is fetched again, defaults to the cache TTL.
+        :type ttl: int, optional
+
+        :return: The entry. Numbers are returned as :samp:`Decimal`.
+        """
+        def read(path):
+            with open(path, "rb") as source:
+                return json.loads(source.read().decode("utf-8"),
+                                  parse_float=Decimal, parse_int=Decimal)
+
+        def store(path):
+            value = fetch()
+            encoded = _dumps(value).encode("utf-8")
+            self._replace(path, lambda output: output.write(encoded))
+            return read(path)
+        return self._once(self._path(key, ".json"), ttl if ttl is not None else self.ttl,
+                          read, store)
+
+    def series(self, community, asset, metrics, start, end=None, time_agg="day", ttl=None):
+        """
+        Read asset metric data in the columnar form of
+        :py:func:`coinmetrics.utils.cm_to_numpy`, fetching it through
+        :py:func:`coinmetrics.community.Community.get_asset_metric_data` on a
+        miss. The arrays are read-only views into a memory mapping shared
+        with every other process.
+
+        :param end: End of time inverval, defaults to now.
+        :type end: str or datetime, optional
+
+        :param ttl: Seconds before the entry is fetched again. Ranges that end in the past
+                    never expire by default, open-ended ones expire after the cache TTL.
+        :type ttl: int, optional
+
+        :return: Columnar data.
+        :rtype: dict
+
+        :Parameters: See :py:func:`coinmetrics.community.Community.get_asset_metric_data`
+                     for the remaining parameters.
+        """
+        # pylint: disable=R0913,R0914
+        import numpy as np
+        from numpy.lib import recfunctions
+        from .intervals import step, to_epoch, to_timestamp
+        from .utils import cm_to_numpy
+        key = "series|{}|{}|{}|{}|{}".format(asset, metrics, start, end, time_agg)
+        if ttl is None and (end is None or to_epoch(end) + step(time_agg) > time.time()):
+            ttl = self.ttl
+
+        def read(path):
+            table = np.load(path, mmap_mode="r")
+            names = list(table.dtype.names[1:])
+            values = recfunctions.structured_to_unstructured(table[names]) if names \
+                else np.empty((len(table), 0))
+            return {"metrics": names, "time": table["time"], "values": values}
+
+        def store(path):
+            low, high = (start, end) if end is not None else \
+                (to_timestamp(to_epoch(start)), to_timestamp(time.time()))
+            data = cm_to_numpy(community.get_asset_metric_data(asset, metrics, low, high,
+                                                               time_agg))
+            columns = [("time", "<i8")] + [(metric, "<f8") for metric in data["metrics"]]
+            table = np.empty(len(data["time"]), dtype=columns)
+            table["time"] = data["time"]
+            for i, metric in enumerate(data["metrics"]):
+                table[metric] = data["values"][:, i]
+            self._replace(path, lambda output: np.save(output, table))
+            return read(path)
+        return self._once(self._path(key, ".npy"), ttl, read, store)
+
+    def attach(self, community):
+        """
+        Route the catalog methods of an API object, including the ones used
+        by the :samp:`*_checker` functions, through the cache.
+
+        :param community: API object.
+        :type community: coinmetrics.community.Community
+
+        :return: The same API object.
+        :rtype: coinmetrics.community.Community
+        """
+        for name in CATALOG_METHODS:
+            method = getattr(community, name, None)
+            if method is not None:
+                setattr(community, name, self._cached(name, method))
+        return community
+
+    def _cached(self, name, method):
+        """
+        Wrap a catalog method.
+        """
+        def cached(*args, **kwargs):
+            parts = [str(arg) for arg in args]
+            parts += ["{}={}".format(key, kwargs[key]) for key in sorted(kwargs)]
+            return self.catalog("{}|{}".format(name, ",".join(parts)),
+                                lambda: method(*args, **kwargs))
+        cached.__name__ = name
+        cached.__doc__ = method.__doc__
+        return cached
+
+    def clear(self):
+        """
+        Remove every entry and its lock file.
+        """
+        for name in os.listdir(self.directory):
+            if name.endswith((".json", ".npy", ".lock")):
+                os.remove(os.path.join(self.directory, name))
@@ -0,0 +1,276 @@
+"""
+Coin Metrics API Sink Module Definitions
+
+Sinks write :py:func:`coinmetrics.community.Community.get_asset_metric_data`
+results to disk as they arrive instead of holding them in memory. Every sink
+stores rows in long form, one (asset, time, metric, value) record per cell, so
+results covering different metric groups can be appended to the same output.
+"""
+
+import csv as _csv
+import io
+import itertools
+import json
+import os
+import sqlite3
+import sys
+import uuid
+
+#: Column names shared by every sink.
+FIELDS = ["asset", "time", "metric", "value"]
+
+
+def rows(asset, data):
+    """
+    Flatten a Coin Metrics API data object to long form rows.
+
+    :param asset: Unique ID corresponding to the asset's ticker.
+    :type asset: str
+
+    :param data: Coin Metrics API data object.
+    :type data: dict
+
+    :return: Iterator of (asset, time, metric, value) tuples.
+    :rtype: iterator
+    """
+    for row in data["series"]:
+        for metric, value in zip(data["metrics"], row["values"]):
+            yield asset, row["time"], metric, value
+
+
+class CSVSink:
+    """
+    Append long form rows to a CSV file.
+    """
+    def __init__(self, path, append=False):
+        """
+        :param path: Location of the CSV file.
+        :type path: str
+
+        :param append: Keep the existing content of the file.
+        :type append: bool, optional
+        """
+        exists = append and os.path.exists(path) and os.path.getsize(path) > 0
+        self.file = open(path, "a" if append else "w", newline="")  # pylint: disable=R1732
+        self.writer = _csv.writer(self.file)
+        if not exists:
+            self.writer.writerow(FIELDS)
+
+    def write(self, asset, data):
+        """
+        Write one Coin Metrics API data object.
+
+        :return: Number of rows written.
+        :rtype: int
+        """
+        count = 0
+        for asset_id, time, metric, value in rows(asset, data):
+            self.writer.writerow([asset_id, time, metric, "" if value is None else value])
+            count += 1
+        self.file.flush()
+        return count
+
+    def close(self):
+        """
+        Close the underlying file.
+        """
+        self.file.close()
+
+
+class NDJSONSink:
+    """
+    Append long form rows to a newline delimited JSON file. Values are
+    written with the exact precision they were received with.
+    """
+    def __init__(self, path, append=False):
+        """
+        :param path: Location of the NDJSON file.
+        :type path: str
+
+        :param append: Keep the existing content of the file.
+        :type append: bool, optional
+        """
+        self.file = open(path, "a" if append else "w")  # pylint: disable=R1732
+
+    def write(self, asset, data):
+        """
+        Write one Coin Metrics API data object.
+
+        :return: Number of rows written.
+        :rtype: int
+        """
+        template = '{{"asset": {}, "time": {}, "metric": {}, "value": {}}}\n'
+        lines = [template.format(json.dumps(asset_id), json.dumps(time), json.dumps(metric),
+                                 "null" if value is None else str(value))
+                 for asset_id, time, metric, value in rows(asset, data)]
+        self.file.writelines(lines)
+        self.file.flush()
+        return len(lines)
+
+    def close(self):
+        """
+        Close the underlying file.
+        """
+        self.file.close()
+
+
+class ParquetSink:
+    """
+    Write long form rows to a directory of Parquet files, one file per
+    :py:func:`write` call. Requires :samp:`pyarrow`.
+    """
+    def __init__(self, path, append=False):
+        """
+        :param path: Directory the Parquet files are written to.
+        :type path: str
+
+        :param append: Keep the files already in the directory.
+        :type append: bool, optional
+        """
+        import pyarrow  # pylint: disable=W0611
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        if not append:
+            for name in os.listdir(path):
+                if name.endswith(".parquet"):
+                    os.remove(os.path.join(path, name))
+
+    def write(self, asset, data):
+        """
+        Write one Coin Metrics API data object.
+
+        :return: Number of rows written.
+        :rtype: int
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        columns = list(zip(*rows(asset, data))) or [(), (), (), ()]
+        table = pa.table({"asset": pa.array(columns[0], pa.string()),
+                          "time": pa.array(columns[1], pa.string()),
+                          "metric": pa.array(columns[2], pa.string()),
+                          "value": pa.array([None if value is None else float(value)
+                                             for value in columns[3]], pa.float64())})
+        name = "part-{}.parquet".format(uuid.uuid4().hex)
+        pq.write_table(table, os.path.join(self.path, name))
+        return table.num_rows
+
+    def close(self):
+        """
+        Nothing to close, every part is written on :py:func:`write`.
+        """
+
+
+class SQLSink:
+    """
+    Bulk load long form rows into a SQL table with upsert on (asset, metric,
+    time), so re-written cells are replaced instead of duplicated. Rows are
+    sent in batches with :samp:`executemany`, or with :samp:`COPY` through a
+    staging table on PostgreSQL connections that support it. Values are bound
+    as strings to keep their precision, into a :samp:`NUMERIC` column on
+    PostgreSQL and a :samp:`TEXT` column on SQLite, whose :samp:`NUMERIC`
+    affinity would store them as floating point.
+    """
+    # pylint: disable=R0913
+
+    def __init__(self, path, append=True, table="metric_data", batch_size=5000):
+        """
+        :param path: Location of a SQLite database, or an open DB-API connection
+                     (SQLite or PostgreSQL).
+        :type path: str or connection
+
+        :param append: Keep the rows already in the table. Pass :samp:`False` to empty
+                       the table first.
+        :type append: bool, optional
+
+        :param table: Table name, created when missing.
+        :type table: str, optional
+
+        :param batch_size: Number of rows sent per batch.
+        :type batch_size: int, optional
+        """
+        self.owned = isinstance(path, str)
+        self.connection = sqlite3.connect(path) if self.owned else path
+        self.table = table
+        self.staging = "{}_staging".format(table)
+        self.batch_size = batch_size
+        module = sys.modules[type(self.connection).__module__.split(".")[0]]
+        marker = "?" if getattr(module, "paramstyle", "qmark") == "qmark" else "%s"
+        self.upsert = ("INSERT INTO {0} (asset, time, metric, value) VALUES ({1}, {1}, {1}, {1}) "
+                       "ON CONFLICT (asset, metric, time) DO UPDATE SET value = excluded.value"
+                       .format(table, marker))
+        cursor = self.connection.cursor()
+        self.copy = hasattr(cursor, "copy_expert")
+        kind = "TEXT" if isinstance(self.connection, sqlite3.Connection) else "NUMERIC"
+        cursor.execute("CREATE TABLE IF NOT EXISTS {} (asset TEXT NOT NULL, time TEXT NOT NULL, "
+                       "metric TEXT NOT NULL, value {}, "
+                       "PRIMARY KEY (asset, metric, time))".format(table, kind))
+        if not append:
+            cursor.execute("DELETE FROM {}".format(table))
+        self.connection.commit()
+
+    def write(self, asset, data):
+        """
+        Write one Coin Metrics API data object.
+
+        :return: Number of rows written.
+        :rtype: int
+        """
+        return self.write_rows(rows(asset, data))
+
+    def write_rows(self, records):
+        """
+        Write long form rows, for instance streamed from another source.
+
+        :param records: (asset, time, metric, value) tuples.
+        :type records: iterable
+
+        :return: Number of rows written.
+        :rtype: int
+        """
+        records = ((asset, time, metric, None if value is None else str(value))
+                   for asset, time, metric, value in records)
+        count = 0
+        cursor = self.connection.cursor()
+        while True:
+            batch = list(itertools.islice(records, self.batch_size))
+            if not batch:
+                break
+            if self.copy:
+                self._copy(cursor, batch)
+            else:
+                cursor.executemany(self.upsert, batch)
+            count += len(batch)
+        self.connection.commit()
+        return count
+
+    def _copy(self, cursor, batch):
+        """
+        Load a batch with COPY into a staging table and upsert it from there.
+        The staging table lives until :py:func:`close`, so this also works on
+        connections in autocommit mode.
+        """
+        buffer = io.StringIO()
+        writer = _csv.writer(buffer)
+        writer.writerows(batch)
+        buffer.seek(0)
+        cursor.execute("CREATE TEMPORARY TABLE IF NOT EXISTS {} (LIKE {})"
+                       .format(self.staging, self.table))
+        cursor.execute("TRUNCATE {}".format(self.staging))
+        cursor.copy_expert("COPY {} (asset, time, metric, value) FROM STDIN WITH CSV"
+                           .format(self.staging), buffer)
+        cursor.execute("INSERT INTO {0} SELECT * FROM {1} ON CONFLICT (asset, metric, time) "
+                       "DO UPDATE SET value = excluded.value".format(self.table, self.staging))
+
+    def close(self):
+        """
+        Drop the staging table, commit, and close the connection when the sink opened it.
+        """
+        if self.copy:
+            self.connection.cursor().execute("DROP TABLE IF EXISTS {}".format(self.staging))
+        self.connection.commit()
+        if self.owned:
+            self.connection.close()
+
+
+#: Sink class for each supported output format.
+SINKS = {"csv": CSVSink, "ndjson": NDJSONSink, "parquet": ParquetSink, "sqlite": SQLSink}
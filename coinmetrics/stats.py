@@ -0,0 +1,256 @@
+"""
+Coin Metrics API Streaming Statistics
+
+Summaries of metric values that are updated batch by batch, so long ranges
+can be summarized without keeping the data. Each batch is reduced with NumPy
+and folded in with the parallel update of Chan et al., which keeps the
+variance numerically stable. Summaries computed over separate chunks, for
+instance by :py:class:`coinmetrics.backfill.Backfill` workers, merge into the
+summary of the whole range. Quantiles come from a log-bucket sketch with a
+bounded relative error, which merges the same way.
+
+.. code-block:: python
+
+  stats = coinmetrics.StreamingStats()
+  job.run(lambda unit, data: stats.update(data))
+  stats.result()["PriceUSD"]["p99"]
+"""
+
+import math
+from .utils import cm_to_numpy
+
+
+class QuantileSketch:
+    """
+    Coin Metrics API Quantile Sketch Object
+
+    Values are counted in logarithmic buckets, so any quantile estimate is
+    within :samp:`accuracy` of the true value, relative to it.
+    """
+    def __init__(self, accuracy=0.01):
+        """
+        :param accuracy: Relative error of quantile estimates.
+        :type accuracy: float, optional
+        """
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.positive = {}
+        self.negative = {}
+        self.zeros = 0
+        self.count = 0
+
+    def update(self, values):
+        """
+        Add a batch of values.
+
+        :param values: Values without NaN.
+        :type values: numpy.ndarray
+        """
+        import numpy as np
+        self.count += len(values)
+        self.zeros += int(np.count_nonzero(values == 0))
+        for buckets, side in ((self.positive, values[values > 0]),
+                              (self.negative, -values[values < 0])):
+            if not len(side):
+                continue
+            keys, counts = np.unique(np.ceil(np.log(side) / math.log(self.gamma)),
+                                     return_counts=True)
+            for key, count in zip(keys.astype(np.int64).tolist(), counts.tolist()):
+                buckets[key] = buckets.get(key, 0) + count
+
+    def merge(self, other):
+        """
+        Add the values counted by another sketch of the same accuracy.
+
+        :param other: Sketch to merge in.
+        :type other: QuantileSketch
+        """
+        if other.accuracy != self.accuracy:
+            raise ValueError("Cannot merge sketches of different accuracy.")
+        for buckets, others in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in others.items():
+                buckets[key] = buckets.get(key, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def quantile(self, fraction):
+        """
+        Estimate a quantile.
+
+        :param fraction: Quantile between 0 and 1.
+        :type fraction: float
+
+        :return: Estimate, or :samp:`None` without values.
+        :rtype: float
+        """
+        if not self.count:
+            return None
+        rank = fraction * (self.count - 1)
+        seen = 0
+        for key in sorted(self.negative, reverse=True):
+            seen += self.negative[key]
+            if seen > rank:
+                return -self._value(key)
+        seen += self.zeros
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.positive):
+            seen += self.positive[key]
+            if seen > rank:
+                return self._value(key)
+        return self._value(max(self.positive))
+
+    def _value(self, key):
+        """
+        Representative value of a bucket.
+        """
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+
+class Summary:
+    """
+    Coin Metrics API Streaming Summary Object
+    """
+    def __init__(self, accuracy=0.01):
+        """
+        :param accuracy: Relative error of the quantile estimates.
+        :type accuracy: float, optional
+        """
+        self.count = 0
+        self.nulls = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self.sketch = QuantileSketch(accuracy)
+
+    def update(self, values):
+        """
+        Add a batch of values. NaN values are counted as nulls.
+
+        :param values: Values to add.
+        :type values: numpy.ndarray
+        """
+        import numpy as np
+        values = np.asarray(values, dtype=np.float64)
+        present = values[~np.isnan(values)]
+        self.nulls += len(values) - len(present)
+        if not len(present):
+            return
+        batch = Summary(self.sketch.accuracy)
+        batch.count = len(present)
+        batch.mean = float(present.mean())
+        batch.m2 = float(((present - batch.mean) ** 2).sum())
+        batch.minimum, batch.maximum = float(present.min()), float(present.max())
+        self._combine(batch)
+        self.sketch.update(present)
+
+    def merge(self, other):
+        """
+        Add the values summarized by another summary.
+
+        :param other: Summary to merge in.
+        :type other: Summary
+        """
+        self.nulls += other.nulls
+        self._combine(other)
+        self.sketch.merge(other.sketch)
+
+    def _combine(self, other):
+        """
+        Fold the moments of another summary into this one.
+        """
+        if not other.count:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    def variance(self, ddof=1):
+        """
+        Variance of the values.
+
+        :param ddof: Delta degrees of freedom, 1 for the sample variance.
+        :type ddof: int, optional
+
+        :rtype: float
+        """
+        return self.m2 / (self.count - ddof) if self.count > ddof else None
+
+    def result(self, quantiles=(0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)):
+        """
+        The summary as a dict with :samp:`count`, :samp:`nulls`, :samp:`mean`,
+        :samp:`variance`, :samp:`std`, :samp:`min`, :samp:`max` and one
+        :samp:`p<percent>` entry per quantile.
+
+        :rtype: dict
+        """
+        variance = self.variance()
+        result = {"count": self.count, "nulls": self.nulls,
+                  "mean": self.mean if self.count else None, "variance": variance,
+                  "std": math.sqrt(variance) if variance is not None else None,
+                  "min": self.minimum if self.count else None,
+                  "max": self.maximum if self.count else None}
+        for fraction in quantiles:
+            result["p{:g}".format(fraction * 100)] = self.sketch.quantile(fraction)
+        return result
+
+
+class StreamingStats:
+    """
+    Coin Metrics API Streaming Statistics Object
+    """
+    def __init__(self, accuracy=0.01):
+        """
+        :param accuracy: Relative error of the quantile estimates.
+        :type accuracy: float, optional
+        """
+        self.accuracy = accuracy
+        #: :samp:`Summary` by metric ID.
+        self.summaries = {}
+
+    def summary(self, metric):
+        """
+        Summary of a metric, created on first use.
+
+        :rtype: Summary
+        """
+        if metric not in self.summaries:
+            self.summaries[metric] = Summary(self.accuracy)
+        return self.summaries[metric]
+
+    def update(self, data):
+        """
+        Add a batch of rows.
+
+        :param data: Object returned by
+                     :py:func:`coinmetrics.community.Community.get_asset_metric_data`,
+                     or any part of one with :samp:`metrics` and a slice of :samp:`series`.
+        :type data: dict
+        """
+        columns = cm_to_numpy(data)
+        for index, metric in enumerate(columns["metrics"]):
+            self.summary(metric).update(columns["values"][:, index])
+
+    def merge(self, other):
+        """
+        Add the statistics of another, for instance computed over another chunk.
+
+        :param other: Statistics to merge in.
+        :type other: StreamingStats
+        """
+        for metric, summary in other.summaries.items():
+            self.summary(metric).merge(summary)
+
+    def result(self, quantiles=(0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)):
+        """
+        Summaries of every metric seen.
+
+        :return: :py:func:`Summary.result` by metric ID.
+        :rtype: dict
+        """
+        return {metric: summary.result(quantiles) for metric, summary in self.summaries.items()}
@@ -0,0 +1,174 @@
+"""
+Coin Metrics API Local Series Store
+
+An in-memory store of fetched asset metric data, optionally persisted to a
+JSON file. Values are kept per (asset, metric, time_agg) cell together with
+the time ranges that have already been fetched for it, including empty ranges
+inside the series, so callers can tell which parts of a request are missing.
+Ranges past the latest published point are never marked as fetched.
+"""
+
+from decimal import Decimal
+import json
+import os
+import threading
+from .intervals import merge, subtract, to_epoch, to_timestamp
+
+
+class SeriesStore:
+    """
+    Coin Metrics API Series Store Object
+    """
+    def __init__(self, path=None):
+        """
+        :param path: JSON file the store is loaded from and saved to.
+        :type path: str, optional
+        """
+        self.path = path
+        self.values = {}
+        self.ranges = {}
+        self.lock = threading.RLock()
+        if path is not None and os.path.exists(path):
+            self.load()
+
+    def coverage(self, asset, metric, time_agg="day"):
+        """
+        Time ranges already fetched for a cell.
+
+        :return: Sorted inclusive (start, end) pairs in epoch seconds.
+        :rtype: list of tuple
+        """
+        with self.lock:
+            return list(self.ranges.get((asset, metric, time_agg), []))
+
+    def missing(self, asset, metric, start, end, time_agg="day"):
+        """
+        Time ranges of a cell that have not been fetched yet.
+
+        :param start: Start of time inverval in epoch seconds.
+        :type start: int
+
+        :param end: End of time inverval in epoch seconds.
+        :type end: int
+
+        :return: Inclusive (start, end) pairs in epoch seconds.
+        :rtype: list of tuple
+        """
+        return subtract(start, end, self.coverage(asset, metric, time_agg), time_agg)
+
+    def put(self, asset, data, start, end, time_agg="day"):
+        """
+        Store a Coin Metrics API data object and mark the time range it was
+        requested for as fetched for each of its metrics. Coverage stops at
+        the metric's last returned value, so the tail of a range past the
+        latest published point stays missing and is requested again. A
+        range without any value is only covered when later points are
+        already stored, i.e. when it is a gap inside the series.
+
+        :param data: Coin Metrics API data object.
+        :type data: dict
+
+        :param start: Start of the requested interval in epoch seconds.
+        :type start: int
+
+        :param end: End of the requested interval in epoch seconds.
+        :type end: int
+        """
+        times = [to_epoch(row["time"]) for row in data["series"]]
+        with self.lock:
+            for i, metric in enumerate(data["metrics"]):
+                key = (asset, metric, time_agg)
+                cell = self.values.setdefault(key, {})
+                present = [epoch for epoch, row in zip(times, data["series"])
+                           if row["values"][i] is not None]
+                for epoch, row in zip(times, data["series"]):
+                    cell[epoch] = row["values"][i]
+                if any(epoch > end and value is not None for epoch, value in cell.items()):
+                    covered = end
+                elif present:
+                    covered = min(end, present[-1])
+                else:
+                    continue
+                self.ranges[key] = merge(self.ranges.get(key, []) + [(start, covered)], time_agg)
+
+    def get(self, asset, metric, start, end, time_agg="day"):
+        """
+        Stored points of a cell within a time range.
+
+        :return: Sorted (epoch, value) pairs.
+        :rtype: list of tuple
+        """
+        with self.lock:
+            cell = self.values.get((asset, metric, time_agg), {})
+            return sorted((epoch, value) for epoch, value in cell.items()
+                          if start <= epoch <= end)
+
+    def replace(self, asset, metric, points, start, end, time_agg="day"):
+        """
+        Replace every stored point of a cell within a time range.
+
+        :param points: New (epoch, value) pairs for the range.
+        :type points: list of tuple
+
+        :param start: Start of the range in epoch seconds.
+        :type start: int
+
+        :param end: End of the range in epoch seconds.
+        :type end: int
+        """
+        # pylint: disable=R0913
+        key = (asset, metric, time_agg)
+        with self.lock:
+            cell = self.values.setdefault(key, {})
+            for epoch in [epoch for epoch in cell if start <= epoch <= end]:
+                del cell[epoch]
+            cell.update(points)
+            self.ranges[key] = merge(self.ranges.get(key, []) + [(start, end)], time_agg)
+
+    def cells(self):
+        """
+        List the stored cells.
+
+        :return: (asset, metric, time_agg) keys.
+        :rtype: list of tuple
+        """
+        with self.lock:
+            return sorted(self.ranges)
+
+    def save(self, path=None):
+        """
+        Write the store to a JSON file. Values are written as strings to
+        keep their exact precision.
+
+        :param path: Destination, defaults to the path the store was created with.
+        :type path: str, optional
+        """
+        path = path if path is not None else self.path
+        with self.lock:
+            cells = [{"asset": asset, "metric": metric, "time_agg": time_agg,
+                      "ranges": self.ranges[(asset, metric, time_agg)],
+                      "series": [[to_timestamp(epoch), None if value is None else str(value)]
+                                 for epoch, value in sorted(
+                                     self.values.get((asset, metric, time_agg), {}).items())]}
+                     for asset, metric, time_agg in sorted(self.ranges)]
+        temporary = path + ".tmp"
+        with open(temporary, "w") as output:
+            json.dump({"cells": cells}, output)
+        os.replace(temporary, path)
+
+    def load(self, path=None):
+        """
+        Read a store previously written by :py:func:`save`.
+
+        :param path: Source, defaults to the path the store was created with.
+        :type path: str, optional
+        """
+        path = path if path is not None else self.path
+        with open(path) as source:
+            cells = json.load(source)["cells"]
+        with self.lock:
+            for cell in cells:
+                key = (cell["asset"], cell["metric"], cell["time_agg"])
+                self.ranges[key] = [tuple(pair) for pair in cell["ranges"]]
+                self.values[key] = {to_epoch(time): None if value is None else Decimal(value)
+                                    for time, value in cell["series"]}
@@ -30,6 +30,26 @@ def cm_to_pandas(data):
         return pandas_dataframe
     return data
 
+def cm_to_numpy(data):
+    """
+    Convert an object output from :py:func:`coinmetrics.community.Community.get_asset_metric_data`
+    to columnar NumPy arrays for further processing.
+
+    :param object: Raw data object to convert to arrays.
+    :type object: dict
+
+    :return: The metric IDs under :samp:`metrics`, UTC epoch seconds as an int64 array
+             under :samp:`time` and a float64 array of shape (rows, metrics) under
+             :samp:`values`. Missing values are NaN.
+    :rtype: dict
+    """
+    import numpy as np
+    times = np.array([row['time'][:19] for row in data['series']], dtype='datetime64[s]')
+    values = np.array([row['values'] for row in data['series']], dtype=np.float64)
+    return {'metrics': list(data['metrics']),
+            'time': times.astype(np.int64),
+            'values': values.reshape(len(times), len(data['metrics']))}
+
 def normalize(data):
     """
     Convert an object output from :py:func:`coinmetrics.community.Community.get_asset_metric_data`
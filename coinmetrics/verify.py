@@ -0,0 +1,205 @@
+"""
+Coin Metrics API Revision Detection
+
+Coin Metrics revises historical values. The :samp:`Verifier` re-fetches the
+windows held in a :py:class:`coinmetrics.store.SeriesStore` in multi-metric
+batches, compares a content hash of each (metric, window) with the stored
+copy and only rewrites the windows that changed. Every rewrite is recorded in
+a revision log per (asset, metric).
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+import hashlib
+import json
+import logging
+import os
+import time
+from .deadline import bind
+from .intervals import step, to_epoch, to_timestamp
+
+
+def _canonical(value):
+    """
+    Text form of a value that does not depend on how it was parsed.
+    """
+    if value is None:
+        return "null"
+    if isinstance(value, Decimal):
+        return str(value.normalize())
+    return str(Decimal(str(value)).normalize())
+
+
+def digest(points):
+    """
+    Content hash of a window.
+
+    :param points: Sorted (epoch, value) pairs.
+    :type points: list of tuple
+
+    :return: Hex encoded SHA-256 digest.
+    :rtype: str
+    """
+    sha = hashlib.sha256()
+    for epoch, value in points:
+        sha.update("{}={};".format(epoch, _canonical(value)).encode("ascii"))
+    return sha.hexdigest()
+
+
+class Verifier:
+    """
+    Coin Metrics API Revision Verifier Object
+    """
+    # pylint: disable=R0913
+
+    def __init__(self, community, store, log_dir, window=90, group_size=10, workers=4):
+        """
+        :param community: API object used for all requests.
+        :type community: coinmetrics.community.Community
+
+        :param store: Store holding the local copies.
+        :type store: coinmetrics.store.SeriesStore
+
+        :param log_dir: Directory holding one revision log per (asset, metric).
+        :type log_dir: str
+
+        :param window: Number of points per compared window.
+        :type window: int, optional
+
+        :param group_size: Maximum number of metrics fetched per request.
+        :type group_size: int, optional
+
+        :param workers: Number of concurrent requests.
+        :type workers: int, optional
+        """
+        self.logger = logging.getLogger(__name__)
+        self.community = community
+        self.store = store
+        self.log_dir = log_dir
+        self.window = window
+        self.group_size = group_size
+        self.workers = workers
+        os.makedirs(log_dir, exist_ok=True)
+
+    def batches(self, assets=None):
+        """
+        Split the stored coverage into request batches. Windows are aligned
+        to a fixed grid so that metrics of the same asset share requests.
+
+        :param assets: Only verify these assets.
+        :type assets: list, optional
+
+        :return: (asset, metrics, start, end, time_agg) batches, times in epoch seconds.
+        :rtype: list of tuple
+        """
+        windows = {}
+        for asset, metric, time_agg in self.store.cells():
+            if assets is not None and asset not in assets:
+                continue
+            size = step(time_agg)
+            span = self.window * size
+            for low, high in self.store.coverage(asset, metric, time_agg):
+                cursor = low
+                while cursor <= high:
+                    stop = min((cursor // span + 1) * span - size, high)
+                    windows.setdefault((asset, cursor, stop, time_agg), []).append(metric)
+                    cursor = stop + size
+        return [(asset, tuple(metrics[i:i + self.group_size]), low, high, time_agg)
+                for (asset, low, high, time_agg), metrics in sorted(windows.items())
+                for i in range(0, len(metrics), self.group_size)]
+
+    def sweep(self, assets=None):
+        """
+        Re-fetch every stored window and rewrite those that changed. A
+        failed batch is reported and the sweep continues; the store is saved
+        whenever a window was revised.
+
+        :param assets: Only verify these assets.
+        :type assets: list, optional
+
+        :return: Number of windows compared, the (asset, metric, start, end)
+                 windows that were revised and the batches that failed.
+        :rtype: dict
+        """
+        batches = self.batches(assets)
+        revised = []
+        failed = []
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                futures = [executor.submit(bind(self._fetch), batch) for batch in batches]
+                for batch, future in zip(batches, futures):
+                    try:
+                        data = future.result()
+                    except Exception as error:  # pylint: disable=W0703
+                        self.logger.warning("Verification batch failed %s: %s", batch, error)
+                        failed.append(batch)
+                        continue
+                    revised.extend(self._compare(batch, data))
+        finally:
+            if revised and self.store.path is not None:
+                self.store.save()
+        compared = sum(len(batch[1]) for batch in batches if batch not in failed)
+        self.logger.info("Verified %s windows, %s revised.", compared, len(revised))
+        return {"compared": compared, "revised": revised, "failed": failed}
+
+    def revisions(self, asset, metric):
+        """
+        Read the revision log of an (asset, metric).
+
+        :return: Revision records, oldest first.
+        :rtype: list of dict
+        """
+        path = self._log_path(asset, metric)
+        if not os.path.exists(path):
+            return []
+        with open(path) as log:
+            return [json.loads(line) for line in log if line.strip()]
+
+    def _fetch(self, batch):
+        """
+        Fetch a batch of windows.
+        """
+        asset, metrics, low, high, time_agg = batch
+        return self.community.get_asset_metric_data(asset, ",".join(metrics), to_timestamp(low),
+                                                    to_timestamp(high), time_agg)
+
+    def _compare(self, batch, data):
+        """
+        Compare the fetched windows with the stored ones and rewrite the
+        windows whose values differ.
+        """
+        # pylint: disable=R0914
+        asset, _, low, high, time_agg = batch
+        times = [to_epoch(row["time"]) for row in data["series"]]
+        revised = []
+        for i, metric in enumerate(data["metrics"]):
+            fetched = [(epoch, row["values"][i]) for epoch, row in zip(times, data["series"])]
+            stored = self.store.get(asset, metric, low, high, time_agg)
+            if digest(fetched) == digest(stored):
+                continue
+            old, new = dict(stored), dict(fetched)
+            changes = [[to_timestamp(epoch), _canonical(old.get(epoch)),
+                        _canonical(new.get(epoch))]
+                       for epoch in sorted(set(old) | set(new))
+                       if _canonical(old.get(epoch)) != _canonical(new.get(epoch))]
+            if not changes:
+                continue
+            self.store.replace(asset, metric, fetched, low, high, time_agg)
+            self._log(asset, metric, {"checked": to_timestamp(time.time()), "time_agg": time_agg,
+                                      "start": to_timestamp(low), "end": to_timestamp(high),
+                                      "changes": changes})
+            revised.append((asset, metric, low, high))
+        return revised
+
+    def _log(self, asset, metric, record):
+        """
+        Append a record to the revision log of an (asset, metric).
+        """
+        with open(self._log_path(asset, metric), "a") as log:
+            log.write(json.dumps(record) + "\n")
+
+    def _log_path(self, asset, metric):
+        """
+        Location of the revision log of an (asset, metric).
+        """
+        return os.path.join(self.log_dir, "{}.{}.jsonl".format(asset, metric))
@@ -45,4 +45,7 @@ setup(
 	provides=['coinmetrics'],
 	license='GNU General Public License v3 (GPLv3)',
 	packages=['coinmetrics'],
+	entry_points={
+		'console_scripts': ['coinmetrics=coinmetrics.cli:main'],
+	},
 )
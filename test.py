@@ -4,6 +4,9 @@ Unit Tests for the Coin Metrics API
 """
 import unittest
 import logging
+import os
+import tempfile
+from decimal import Decimal
 import pandas as pd
 import coinmetrics
 from coinmetrics.utils import (csv, cm_to_pandas, normalize)
@@ -42,6 +45,91 @@ CSV_OUT = "test.csv"
 CM = coinmetrics.Community()
 
 
+class OfflineCommunity(coinmetrics.Community):
+    """
+    Community API object answering from a small synthetic catalog instead of
+    the network. Every endpoint requested is recorded in :samp:`calls`.
+    """
+    ASSETS = ["btc", "eth"]
+    METRICS = ["PriceUSD", "TxCnt", "FeeMeanUSD"]
+    MIN_TIME = "2019-01-01T00:00:00.000Z"
+    MAX_TIME = "2019-01-31T00:00:00.000Z"
+    MARKETS = ["coinbase-btc-usd-spot", "kraken-btc-usd-spot", "kraken-eth-btc-spot"]
+    CATEGORIES = {"PriceUSD": "Market", "TxCnt": "Transactions", "FeeMeanUSD": "Fees"}
+
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    @staticmethod
+    def value(asset, metric, epoch):
+        """
+        Deterministic synthetic value for a cell.
+        """
+        offset = OfflineCommunity.ASSETS.index(asset) * 100
+        offset += OfflineCommunity.METRICS.index(metric)
+        return Decimal(epoch // 3600 % 1000 + offset) / Decimal(4)
+
+    @staticmethod
+    def number(value):
+        """
+        JSON encodable form of a synthetic value, all of which are multiples of 0.25.
+        """
+        return float(value) if value % 1 else int(value)
+
+    def _fetch(self, request_url):
+        import json
+        import urllib.parse
+        from coinmetrics.intervals import step, to_epoch, to_timestamp
+        url = urllib.parse.urlsplit(request_url)
+        endpoint = url.path.split("/v2/", 1)[1]
+        options = dict(urllib.parse.parse_qsl(url.query))
+        self.calls.append((endpoint, options))
+        if endpoint == "assets":
+            response = {"assets": self.ASSETS}
+        elif endpoint == "metrics":
+            response = {"metrics": self.METRICS}
+        elif endpoint == "asset_info":
+            subset = options.get("subset", ",".join(self.ASSETS)).split(",")
+            response = {"assetsInfo": [{"id": asset, "metrics": self.METRICS,
+                                        "minTime": self.MIN_TIME, "maxTime": self.MAX_TIME}
+                                       for asset in subset]}
+        elif endpoint in ("exchanges", "markets"):
+            exchanges = sorted({market.split("-")[0] for market in self.MARKETS})
+            response = {endpoint: exchanges if endpoint == "exchanges" else self.MARKETS}
+        elif endpoint == "exchange_info":
+            exchanges = sorted({market.split("-")[0] for market in self.MARKETS})
+            response = {"exchangesInfo": [
+                {"id": exchange, "minTime": self.MIN_TIME, "maxTime": self.MAX_TIME,
+                 "marketsInfo": [{"id": market} for market in self.MARKETS
+                                 if market.startswith(exchange + "-")]}
+                for exchange in options.get("subset", ",".join(exchanges)).split(",")]}
+        elif endpoint == "market_info":
+            subset = options.get("subset", ",".join(self.MARKETS)).split(",")
+            response = {"marketsInfo": [{"id": market, "minTime": self.MIN_TIME,
+                                         "maxTime": "2019-01-%02dT00:00:00.000Z" % (10 * index + 1)}
+                                        for index, market in enumerate(self.MARKETS)
+                                        if market in subset]}
+        elif endpoint == "metric_info":
+            subset = options.get("subset", ",".join(self.METRICS)).split(",")
+            response = {"metricsInfo": [{"id": metric, "category": self.CATEGORIES[metric]}
+                                        for metric in subset]}
+        else:
+            asset = endpoint.split("/")[1]
+            metrics = options["metrics"].split(",")
+            size = step(options.get("time_agg", "day"))
+            epoch = max(to_epoch(options["start"]), to_epoch(self.MIN_TIME))
+            end = min(to_epoch(options["end"]), to_epoch(self.MAX_TIME) + 86400 - size)
+            series = []
+            while epoch <= end:
+                series.append({"time": to_timestamp(epoch),
+                               "values": [self.number(self.value(asset, metric, epoch))
+                                          for metric in metrics]})
+                epoch += size
+            response = {"metricData": {"metrics": metrics, "series": series}}
+        return 200, json.dumps(response).encode("utf-8")
+
+
 class BaseAPITests(unittest.TestCase):
     """
     Tests for the Coinmetrics Base API
@@ -650,5 +738,1479 @@ class UtilsTests(unittest.TestCase):
         LOG.debug("\tTest 1: PASS")
 
 
+class BackfillTests(unittest.TestCase):
+    """
+    Tests for the resumable backfill job runner.
+    """
+    def test_resume(self):
+        """
+        1. The plan splits the catalog into (asset, metric group, window) units.
+        2. Failed units are left pending and completed units are recorded.
+        3. A new job on the same manifest only fetches the pending units.
+        """
+        manifest = os.path.join(tempfile.mkdtemp(), "manifest.jsonl")
+        api = OfflineCommunity()
+        job = coinmetrics.Backfill(api, manifest, group_size=2, window=10)
+        units = job.plan()
+
+        LOG.debug("\tTest 1: 2 assets x 2 metric groups x 4 windows")
+        self.assertEqual(len(units), 16)
+        self.assertEqual(units[0].metrics, ("PriceUSD", "TxCnt"))
+        self.assertEqual([endpoint for endpoint, _ in api.calls], ["asset_info"])
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Failures remain pending")
+        fetched = []
+        failing = units[3]
+        original_fetch = job.fetch
+
+        def flaky_fetch(unit):
+            if unit == failing:
+                raise IOError("connection reset")
+            return original_fetch(unit)
+        job.fetch = flaky_fetch
+        summary = job.run(lambda unit, data: fetched.append((unit, len(data["series"]))))
+        self.assertEqual(summary["completed"], 15)
+        self.assertEqual(summary["failed"], [failing])
+        self.assertEqual(sum(rows for _, rows in fetched), 2 * 2 * 31 - 10)
+        LOG.debug("\tTest 2: PASS")
+
+        LOG.debug("\tTest 3: Resume from the manifest")
+        api = OfflineCommunity()
+        resumed = coinmetrics.Backfill(api, manifest, group_size=2, window=10)
+        self.assertEqual(resumed.pending(), [failing])
+        self.assertEqual(resumed.run(lambda unit, data: None)["completed"], 1)
+        self.assertEqual(resumed.pending(), [])
+        LOG.debug("\tTest 3: PASS")
+
+    def test_mismatch(self):
+        """
+        1. Resuming a manifest with different parameters raises.
+        """
+        from coinmetrics.errors import ManifestMismatchError
+        from coinmetrics.intervals import to_epoch
+        manifest = os.path.join(tempfile.mkdtemp(), "manifest.jsonl")
+        coinmetrics.Backfill(OfflineCommunity(), manifest, assets=["btc"],
+                             start="2019-01-01", end="2019-01-10").plan()
+
+        LOG.debug("\tTest 1: Different parameters")
+        same = coinmetrics.Backfill(OfflineCommunity(), manifest, assets=["btc"],
+                                    start=to_epoch("2019-01-01"), end="2019-01-10")
+        self.assertEqual(len(same.plan()), 1)
+        for changed in ({"assets": ["eth"]}, {"metrics": ["PriceUSD"]},
+                        {"end": "2019-01-20"}, {"time_agg": "hour"}):
+            options = {"assets": ["btc"], "start": "2019-01-01", "end": "2019-01-10"}
+            options.update(changed)
+            with self.assertRaises(ManifestMismatchError):
+                coinmetrics.Backfill(OfflineCommunity(), manifest, **options).plan()
+        LOG.debug("\tTest 1: PASS")
+
+    def test_handler_failure(self):
+        """
+        1. A failing handler cancels the units not yet fetched and raises.
+        """
+        import time
+        manifest = os.path.join(tempfile.mkdtemp(), "manifest.jsonl")
+        job = coinmetrics.Backfill(OfflineCommunity(), manifest, group_size=1, window=2,
+                                   workers=2)
+        fetched = []
+        original_fetch = job.fetch
+
+        def slow_fetch(unit):
+            time.sleep(0.01)
+            fetched.append(unit)
+            return original_fetch(unit)
+        job.fetch = slow_fetch
+
+        def broken(unit, data):
+            raise IOError("disk full")
+
+        LOG.debug("\tTest 1: Handler failure stops the run")
+        with self.assertRaises(IOError):
+            job.run(broken)
+        self.assertLessEqual(len(fetched), 2 * job.workers)
+        self.assertEqual(len(job.pending()), len(job.plan()))
+        LOG.debug("\tTest 1: PASS")
+
+
+class CLITests(unittest.TestCase):
+    """
+    Tests for the command line exporter.
+    """
+    def test_export(self):
+        """
+        1. CSV export writes one long form row per cell.
+        2. NDJSON export keeps the exact values.
+        3. A resumed export with nothing pending leaves the output untouched.
+        4. A resumed export with different parameters fails without fetching.
+        """
+        from coinmetrics.cli import parse_args, export
+        directory = tempfile.mkdtemp()
+
+        LOG.debug("\tTest 1: CSV export")
+        output = os.path.join(directory, "out.csv")
+        args = parse_args(["export", "--assets", "btc", "--metrics", "PriceUSD,TxCnt",
+                           "--start", "2019-01-01", "--end", "2019-01-10",
+                           "--window", "4", "--output", output])
+        self.assertEqual(export(args, OfflineCommunity()), 0)
+        with open(output) as result:
+            lines = result.read().splitlines()
+        self.assertEqual(lines[0], "asset,time,metric,value")
+        self.assertEqual(len(lines), 1 + 10 * 2)
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: NDJSON export")
+        output = os.path.join(directory, "out.ndjson")
+        args = parse_args(["export", "--assets", "eth", "--metrics", "PriceUSD",
+                           "--start", "2019-01-01", "--end", "2019-01-01",
+                           "--format", "ndjson", "--output", output])
+        self.assertEqual(export(args, OfflineCommunity()), 0)
+        with open(output) as result:
+            record = result.readline()
+        self.assertIn('"value": 157}', record)
+        LOG.debug("\tTest 2: PASS")
+
+        LOG.debug("\tTest 3: Resume")
+        args = parse_args(["export", "--assets", "eth", "--metrics", "PriceUSD",
+                           "--start", "2019-01-01", "--end", "2019-01-01",
+                           "--format", "ndjson", "--output", output, "--resume"])
+        api = OfflineCommunity()
+        self.assertEqual(export(args, api), 0)
+        self.assertEqual(api.calls, [])
+        with open(output) as result:
+            self.assertEqual(len(result.readlines()), 1)
+        LOG.debug("\tTest 3: PASS")
+
+        LOG.debug("\tTest 4: Resume with different parameters")
+        args = parse_args(["export", "--assets", "btc", "--metrics", "PriceUSD",
+                           "--start", "2019-01-01", "--end", "2019-01-01",
+                           "--format", "ndjson", "--output", output, "--resume"])
+        api = OfflineCommunity()
+        self.assertEqual(export(args, api), 2)
+        self.assertNotIn("metricdata", [endpoint for endpoint, _ in api.calls])
+        LOG.debug("\tTest 4: PASS")
+
+    def test_sink_failure(self):
+        """
+        1. A failing sink stops the export before the remaining units are fetched.
+        """
+        import time
+        from coinmetrics.cli import parse_args, export
+        from coinmetrics.sinks import SINKS
+
+        class BrokenSink:
+            """
+            Sink whose disk is full.
+            """
+            def __init__(self, path, append=False):
+                self.closed = False
+
+            def write(self, asset, data):
+                """
+                Fail every write.
+                """
+                raise IOError("disk full")
+
+            def close(self):
+                """
+                Nothing to close.
+                """
+                self.closed = True
+
+        class SlowCommunity(OfflineCommunity):
+            """
+            Offline API taking a little time per data request.
+            """
+            def get_asset_metric_data(self, *args, **kwargs):
+                time.sleep(0.01)
+                return super().get_asset_metric_data(*args, **kwargs)
+
+        LOG.debug("\tTest 1: Sink failure")
+        SINKS["broken"] = BrokenSink
+        try:
+            args = parse_args(["export", "--assets", "btc,eth", "--metrics", "PriceUSD",
+                               "--start", "2019-01-01", "--end", "2019-01-31", "--window", "1",
+                               "--workers", "2", "--format", "broken",
+                               "--output", os.path.join(tempfile.mkdtemp(), "out")])
+            api = SlowCommunity()
+            with self.assertRaises(IOError):
+                export(args, api)
+        finally:
+            del SINKS["broken"]
+        fetched = sum(call[0].endswith("/metricdata") for call in api.calls)
+        self.assertLessEqual(fetched, 2 * args.workers)
+        LOG.debug("\tTest 1: PASS")
+
+
+class PlannerTests(unittest.TestCase):
+    """
+    Tests for the coverage-aware query planner.
+    """
+    def test_overlapping_queries(self):
+        """
+        1. The first query is sent in full.
+        2. An overlapping query only requests the missing cells.
+        3. The merged result has the requested shape and values.
+        4. The store round trips through its JSON file.
+        """
+        api = OfflineCommunity()
+        path = os.path.join(tempfile.mkdtemp(), "store.json")
+        planner = coinmetrics.QueryPlanner(api, coinmetrics.SeriesStore(path))
+
+        LOG.debug("\tTest 1: Full first query")
+        planner.get_asset_metric_data("btc", "PriceUSD,TxCnt", "2019-01-01", "2019-01-20")
+        fetched = [options for endpoint, options in api.calls if endpoint.endswith("metricdata")]
+        self.assertEqual(len(fetched), 1)
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Only the gaps are requested")
+        self.assertEqual(planner.plan("btc", "PriceUSD,FeeMeanUSD", "2019-01-10", "2019-01-31"),
+                         [("PriceUSD", 1548028800, 1548892800),
+                          ("FeeMeanUSD", 1547078400, 1548892800)])
+        result = planner.get_asset_metric_data("btc", "PriceUSD,FeeMeanUSD",
+                                               "2019-01-10", "2019-01-31")
+        fetched = [options for endpoint, options in api.calls if endpoint.endswith("metricdata")]
+        self.assertEqual(len(fetched), 3)
+        LOG.debug("\tTest 2: PASS")
+
+        LOG.debug("\tTest 3: Merged result")
+        self.assertEqual(result["metrics"], ["PriceUSD", "FeeMeanUSD"])
+        self.assertEqual(len(result["series"]), 22)
+        row = result["series"][0]
+        epoch = 1547078400
+        self.assertEqual(row["time"], "2019-01-10T00:00:00.000Z")
+        self.assertEqual(row["values"], [OfflineCommunity.value("btc", "PriceUSD", epoch),
+                                         OfflineCommunity.value("btc", "FeeMeanUSD", epoch)])
+        LOG.debug("\tTest 3: PASS")
+
+        LOG.debug("\tTest 4: Persistence")
+        planner.store.save()
+        reloaded = coinmetrics.SeriesStore(path)
+        self.assertEqual(reloaded.coverage("btc", "PriceUSD"), [(1546300800, 1548892800)])
+        self.assertEqual(reloaded.get("btc", "TxCnt", 0, 2 ** 40),
+                         planner.store.get("btc", "TxCnt", 0, 2 ** 40))
+        LOG.debug("\tTest 4: PASS")
+
+    def test_open_tail(self):
+        """
+        1. The part of a query past the latest published point is requested again.
+        2. Empty ranges inside the series stay covered.
+        """
+        api = OfflineCommunity()
+        planner = coinmetrics.QueryPlanner(api)
+
+        LOG.debug("\tTest 1: Open tail")
+        result = planner.get_asset_metric_data("btc", "PriceUSD", "2019-01-20", "2019-02-10")
+        self.assertEqual(len(result["series"]), 12)
+        api.MAX_TIME = "2019-02-10T00:00:00.000Z"
+        self.assertEqual(planner.plan("btc", "PriceUSD", "2019-01-20", "2019-02-10"),
+                         [("PriceUSD", 1548979200, 1549756800)])
+        result = planner.get_asset_metric_data("btc", "PriceUSD", "2019-01-20", "2019-02-10")
+        self.assertEqual(len(result["series"]), 22)
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Empty ranges inside the series")
+        planner.get_asset_metric_data("btc", "PriceUSD", "2018-12-01", "2018-12-31")
+        self.assertEqual(planner.plan("btc", "PriceUSD", "2018-12-01", "2018-12-31"), [])
+        LOG.debug("\tTest 2: PASS")
+
+
+class QueryTests(unittest.TestCase):
+    """
+    Tests for the lazy query builder.
+    """
+    def test_fused_request(self):
+        """
+        1. Conveniance methods and aliases are recorded, not fetched.
+        2. Execution sends a single data request.
+        3. The result is split back out per metric.
+        4. Methods that are not single metric methods are rejected.
+        """
+        api = OfflineCommunity()
+        query = api.query("eth", "2019-01-01", "2019-01-05")
+
+        LOG.debug("\tTest 1: Calls are recorded")
+        query.get_price_usd().get_tx_count().price_usd().get_fee_mean()
+        self.assertEqual(query.metrics, ["PriceUSD", "TxCnt", "FeeMeanUSD"])
+        self.assertEqual(api.calls, [])
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: One data request")
+        result = query.execute()
+        fetched = [options for endpoint, options in api.calls if endpoint.endswith("metricdata")]
+        self.assertEqual(fetched[0]["metrics"], "PriceUSD,TxCnt,FeeMeanUSD")
+        self.assertEqual(len(fetched), 1)
+        LOG.debug("\tTest 2: PASS")
+
+        LOG.debug("\tTest 3: Split per metric")
+        self.assertEqual(sorted(result), ["FeeMeanUSD", "PriceUSD", "TxCnt"])
+        self.assertEqual(result["TxCnt"]["metrics"], ["TxCnt"])
+        self.assertEqual(len(result["TxCnt"]["series"]), 5)
+        self.assertEqual(result["TxCnt"]["series"][0]["values"],
+                         [OfflineCommunity.value("eth", "TxCnt", 1546300800)])
+        LOG.debug("\tTest 3: PASS")
+
+        LOG.debug("\tTest 4: Invalid methods")
+        recorded = list(query.metrics)
+        with self.assertRaises(AttributeError):
+            query.get_assets()
+        with self.assertRaises(AttributeError):
+            query.query()
+        self.assertEqual(query.metrics, recorded)
+        LOG.debug("\tTest 4: PASS")
+
+
+class GapTests(unittest.TestCase):
+    """
+    Tests for gap detection and repair.
+    """
+    def test_find_and_repair(self):
+        """
+        1. Missing timestamps are found, including at the edges.
+        2. Null runs are found per metric.
+        3. Repair re-fetches only the gaps and restores the full series.
+        """
+        from coinmetrics.gaps import find_gaps, repair
+        api = OfflineCommunity()
+        complete = api.get_asset_metric_data("btc", "PriceUSD,TxCnt", "2019-01-01", "2019-01-10")
+        data = api.get_asset_metric_data("btc", "PriceUSD,TxCnt", "2019-01-01", "2019-01-10")
+        del data["series"][3:5]
+        del data["series"][0]
+        data["series"][5]["values"][1] = None
+        data["series"][6]["values"][1] = None
+        day = 86400
+
+        LOG.debug("\tTest 1: Missing timestamps")
+        gaps = find_gaps(data, start="2019-01-01")
+        self.assertEqual(gaps["missing"], [(1546300800, 1546300800),
+                                           (1546300800 + 3 * day, 1546300800 + 4 * day)])
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Null runs")
+        self.assertEqual(gaps["nulls"]["PriceUSD"], [])
+        self.assertEqual(gaps["nulls"]["TxCnt"], [(1546300800 + 8 * day, 1546300800 + 9 * day)])
+        LOG.debug("\tTest 2: PASS")
+
+        LOG.debug("\tTest 3: Repair")
+        api.calls = []
+        self.assertEqual(repair(api, "btc", data, start="2019-01-01"), 3)
+        fetched = [options["metrics"] for endpoint, options in api.calls
+                   if endpoint.endswith("metricdata")]
+        self.assertEqual(sorted(fetched), ["PriceUSD,TxCnt", "PriceUSD,TxCnt", "TxCnt"])
+        self.assertEqual(data, complete)
+        LOG.debug("\tTest 3: PASS")
+
+
+class VerifierTests(unittest.TestCase):
+    """
+    Tests for revision detection.
+    """
+    def test_sweep(self):
+        """
+        1. Stored windows are batched across metrics on an aligned grid.
+        2. Only the window holding a revised value is rewritten.
+        3. The revision is recorded in the (asset, metric) log.
+        """
+        api = OfflineCommunity()
+        planner = coinmetrics.QueryPlanner(api)
+        planner.get_asset_metric_data("btc", "PriceUSD,TxCnt", "2019-01-01", "2019-01-31")
+        epoch = 1546300800 + 5 * 86400
+        stored = planner.store.values[("btc", "TxCnt", "day")]
+        original = stored[epoch]
+        stored[epoch] = Decimal("1.25")
+        verifier = coinmetrics.Verifier(api, planner.store, tempfile.mkdtemp(), window=10)
+
+        LOG.debug("\tTest 1: Batches")
+        batches = verifier.batches()
+        self.assertEqual(len(batches), 4)
+        self.assertEqual(batches[0][1], ("PriceUSD", "TxCnt"))
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Revised window")
+        summary = verifier.sweep()
+        self.assertEqual(summary["compared"], 8)
+        self.assertEqual(summary["revised"], [("btc", "TxCnt", 1546560000, 1547337600)])
+        self.assertEqual(stored[epoch], original)
+        LOG.debug("\tTest 2: PASS")
+
+        LOG.debug("\tTest 3: Revision log")
+        log = verifier.revisions("btc", "TxCnt")
+        self.assertEqual(log[0]["changes"], [["2019-01-06T00:00:00.000Z", "1.25",
+                                              str(original.normalize())]])
+        self.assertEqual(verifier.revisions("btc", "PriceUSD"), [])
+        self.assertEqual(verifier.sweep()["revised"], [])
+        LOG.debug("\tTest 3: PASS")
+
+    def test_failed_batch(self):
+        """
+        1. A failed batch is reported and the other batches are still verified.
+        2. Revisions found before the failure are saved and logged once.
+        """
+        api = OfflineCommunity()
+        path = os.path.join(tempfile.mkdtemp(), "store.json")
+        planner = coinmetrics.QueryPlanner(api, coinmetrics.SeriesStore(path))
+        for asset in ("btc", "eth"):
+            planner.get_asset_metric_data(asset, "TxCnt", "2019-01-01", "2019-01-10")
+        epoch = 1546300800 + 5 * 86400
+        original = planner.store.values[("btc", "TxCnt", "day")][epoch]
+        planner.store.values[("btc", "TxCnt", "day")][epoch] = Decimal("1.25")
+        verifier = coinmetrics.Verifier(api, planner.store, tempfile.mkdtemp(), window=10)
+        fetch = verifier._fetch
+
+        def flaky_fetch(batch):
+            if batch[0] == "eth":
+                raise OSError("connection reset")
+            return fetch(batch)
+        verifier._fetch = flaky_fetch
+
+        LOG.debug("\tTest 1: Failed batch")
+        summary = verifier.sweep()
+        self.assertEqual({batch[0] for batch in summary["failed"]}, {"eth"})
+        self.assertEqual(summary["compared"], len(verifier.batches()) - len(summary["failed"]))
+        self.assertEqual(len(summary["revised"]), 1)
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Saved and logged once")
+        reloaded = coinmetrics.SeriesStore(path)
+        self.assertEqual(dict(reloaded.get("btc", "TxCnt", epoch, epoch))[epoch], original)
+        self.assertEqual(verifier.sweep()["revised"], [])
+        self.assertEqual(len(verifier.revisions("btc", "TxCnt")), 1)
+        LOG.debug("\tTest 2: PASS")
+
+
+class BinarySeriesTests(unittest.TestCase):
+    """
+    Tests for the memory-mapped binary series files.
+    """
+    def test_append_and_range(self):
+        """
+        1. Data objects are written to one series per metric with a schema header.
+        2. Further appends skip points that are already stored.
+        3. Range reads return views holding the requested points.
+        4. Out of order appends are rejected.
+        """
+        import numpy as np
+        from coinmetrics.binary import SeriesFile, write_metric_data
+        api = OfflineCommunity()
+        directory = tempfile.mkdtemp()
+
+        LOG.debug("\tTest 1: Write")
+        first = api.get_asset_metric_data("btc", "PriceUSD,TxCnt", "2019-01-01", "2019-01-02",
+                                          time_agg="hour")
+        series = write_metric_data(directory, "btc", first, time_agg="hour")
+        self.assertEqual(len(series["TxCnt"]), 25)
+        reopened = SeriesFile(os.path.join(directory, "btc.TxCnt.hour"))
+        self.assertEqual(reopened.schema["metric"], "TxCnt")
+        self.assertEqual(reopened.schema["time_agg"], "hour")
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Append")
+        second = api.get_asset_metric_data("btc", "PriceUSD,TxCnt", "2019-01-02", "2019-01-05",
+                                           time_agg="hour")
+        series = write_metric_data(directory, "btc", second, time_agg="hour")
+        self.assertEqual(len(series["TxCnt"]), 4 * 24 + 1)
+        LOG.debug("\tTest 2: PASS")
+
+        LOG.debug("\tTest 3: Range read")
+        times, values = series["PriceUSD"].range(1546387200, 1546387200 + 3 * 3600)
+        self.assertTrue(isinstance(times, np.memmap))
+        self.assertEqual(list(times), [1546387200 + i * 3600 for i in range(4)])
+        self.assertEqual(float(values[1]),
+                         float(OfflineCommunity.value("btc", "PriceUSD", 1546387200 + 3600)))
+        LOG.debug("\tTest 3: PASS")
+
+        LOG.debug("\tTest 4: Out of order append")
+        with self.assertRaises(ValueError):
+            series["PriceUSD"].append([1546387200], [1.0])
+        LOG.debug("\tTest 4: PASS")
+
+
+class SharedCacheTests(unittest.TestCase):
+    """
+    Tests for the cross-process shared cache.
+    """
+    def test_shared_entries(self):
+        """
+        1. Attached catalog methods are fetched once across cache instances.
+        2. Series are fetched once and read back as memory-mapped arrays.
+        3. Series without an end expire after the cache TTL.
+        4. Catalog numbers are read back exactly.
+        5. Clearing removes every entry and lock file.
+        """
+        import numpy as np
+        directory = tempfile.mkdtemp()
+
+        LOG.debug("\tTest 1: Catalogs")
+        first, second = OfflineCommunity(), OfflineCommunity()
+        coinmetrics.SharedCache(directory).attach(first)
+        coinmetrics.SharedCache(directory).attach(second)
+        self.assertEqual(first.get_assets(), OfflineCommunity.ASSETS)
+        first.asset_checker("btc")
+        second.asset_checker("eth")
+        self.assertEqual(second.get_asset_info("btc")[0]["minTime"], OfflineCommunity.MIN_TIME)
+        self.assertEqual([endpoint for endpoint, _ in first.calls], ["assets"])
+        self.assertEqual([endpoint for endpoint, _ in second.calls], ["asset_info"])
+        self.assertEqual(second.get_asset_info(assets="eth")[0]["id"], "eth")
+        second.get_asset_info(assets="eth")
+        self.assertEqual([endpoint for endpoint, _ in second.calls], ["asset_info"] * 2)
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Series")
+        api = OfflineCommunity()
+        cache = coinmetrics.SharedCache(directory)
+        data = cache.series(api, "btc", "PriceUSD,TxCnt", "2019-01-01", "2019-01-10")
+        again = coinmetrics.SharedCache(directory).series(OfflineCommunity(), "btc",
+                                                          "PriceUSD,TxCnt", "2019-01-01",
+                                                          "2019-01-10")
+        self.assertEqual(again["metrics"], ["PriceUSD", "TxCnt"])
+        self.assertTrue(isinstance(again["time"], np.memmap))
+        self.assertTrue(np.array_equal(data["values"], again["values"]))
+        self.assertEqual(again["values"].shape, (10, 2))
+        self.assertEqual(len([call for call in api.calls if call[0].endswith("metricdata")]), 1)
+        LOG.debug("\tTest 2: PASS")
+
+        LOG.debug("\tTest 3: Open-ended series expire")
+        api = OfflineCommunity()
+        cache = coinmetrics.SharedCache(directory, ttl=0)
+        cache.series(api, "btc", "PriceUSD", "2019-01-01", "2019-01-10")
+        cache.series(api, "btc", "PriceUSD", "2019-01-01", "2019-01-10")
+        self.assertEqual(len([call for call in api.calls if call[0].endswith("metricdata")]), 1)
+        cache.series(api, "btc", "PriceUSD", "2019-01-01")
+        data = cache.series(api, "btc", "PriceUSD", "2019-01-01")
+        self.assertEqual(len([call for call in api.calls if call[0].endswith("metricdata")]), 3)
+        self.assertEqual(data["values"].shape, (31, 1))
+        LOG.debug("\tTest 3: PASS")
+
+        LOG.debug("\tTest 4: Exact numbers")
+        value = Decimal("0.000103420718316463")
+        cache = coinmetrics.SharedCache(directory)
+        cache.catalog("precise", lambda: {"values": [value, Decimal(12)]})
+        self.assertEqual(coinmetrics.SharedCache(directory).catalog("precise", None),
+                         {"values": [value, Decimal(12)]})
+        LOG.debug("\tTest 4: PASS")
+
+        LOG.debug("\tTest 5: Clear")
+        cache.clear()
+        self.assertEqual(os.listdir(directory), [])
+        LOG.debug("\tTest 5: PASS")
+
+
+class ProxyTests(unittest.TestCase):
+    """
+    Tests for the response cache and the caching proxy.
+    """
+    def test_coalescing(self):
+        """
+        1. Concurrent identical requests are sent upstream once.
+        2. Error responses are not cached.
+        """
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        cache = coinmetrics.ResponseCache()
+        release = threading.Event()
+        fetches = []
+
+        def fetch():
+            fetches.append(1)
+            release.wait()
+            return 200, b"{}"
+
+        LOG.debug("\tTest 1: Coalescing")
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            futures = [executor.submit(cache.get_or_fetch, "url", fetch) for _ in range(8)]
+            while not cache.flights:
+                pass
+            release.set()
+            self.assertEqual({future.result() for future in futures}, {(200, b"{}")})
+        self.assertEqual(len(fetches), 1)
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Errors are not cached")
+        cache.get_or_fetch("error", lambda: (500, b"{}"))
+        self.assertIsNone(cache.lookup("error"))
+        LOG.debug("\tTest 2: PASS")
+
+    def test_proxy(self):
+        """
+        1. Clients pointed at the proxy receive upstream responses.
+        2. Repeated queries from different clients are sent upstream once.
+        """
+        from coinmetrics.proxy import ProxyServer
+        upstream = OfflineCommunity()
+        server = ProxyServer(port=0, community=upstream).start()
+        try:
+            first, second = coinmetrics.Community(), coinmetrics.Community()
+            first.host_url = second.host_url = server.url
+
+            LOG.debug("\tTest 1: Proxied responses")
+            data = first.get_asset_metric_data("btc", "PriceUSD", "2019-01-01", "2019-01-03")
+            self.assertEqual(len(data["series"]), 3)
+            LOG.debug("\tTest 1: PASS")
+
+            LOG.debug("\tTest 2: One upstream request per unique query")
+            upstream.calls = []
+            self.assertEqual(second.get_asset_metric_data("btc", "PriceUSD", "2019-01-01",
+                                                          "2019-01-03"), data)
+            self.assertEqual(upstream.calls, [])
+            LOG.debug("\tTest 2: PASS")
+        finally:
+            server.stop()
+
+
+class DecodePoolTests(unittest.TestCase):
+    """
+    Tests for the process pool decoding pipeline.
+    """
+    def test_fetch(self):
+        """
+        1. Results come back in request order and match cm_to_numpy.
+        2. Failed requests are raised after the other blocks are released.
+        """
+        import numpy as np
+        api = OfflineCommunity()
+        pool = coinmetrics.DecodePool(api, processes=2, threads=4)
+        self.addCleanup(pool.close)
+        requests = [("btc", "PriceUSD,TxCnt", "2019-01-01", "2019-01-10"),
+                    ("eth", "FeeMeanUSD", "2019-01-05", "2019-01-31", "hour")]
+
+        LOG.debug("\tTest 1: Decoded results")
+        results = pool.fetch(requests)
+        for request, result in zip(requests, results):
+            expected = coinmetrics.cm_to_numpy(OfflineCommunity().get_asset_metric_data(*request))
+            self.assertEqual(result["metrics"], expected["metrics"])
+            self.assertTrue(np.array_equal(result["time"], expected["time"]))
+            self.assertTrue(np.array_equal(result["values"], expected["values"]))
+        self.assertEqual(results[1]["values"].shape, (26 * 24 + 1, 1))
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Failures")
+        with self.assertRaises(coinmetrics.errors.InvalidAssetError):
+            pool.fetch(requests + [(INVALID_ASSET, "PriceUSD", "2019-01-01", "2019-01-02")])
+        LOG.debug("\tTest 2: PASS")
+
+    def test_lifecycle(self):
+        """
+        1. The decoding processes are started once and reused across fetches.
+        2. Closing the pool stops them.
+        """
+        request = ("btc", "PriceUSD", "2019-01-01", "2019-01-03")
+
+        LOG.debug("\tTest 1: Processes are reused")
+        with coinmetrics.DecodePool(OfflineCommunity(), processes=1, threads=2) as pool:
+            decoders = pool.decoders
+            self.assertIsNotNone(decoders)
+            pool.fetch([request])
+            pool.fetch([request])
+            self.assertIs(pool.decoders, decoders)
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Close")
+        self.assertIsNone(pool.decoders)
+        LOG.debug("\tTest 2: PASS")
+
+
+class LimiterTests(unittest.TestCase):
+    """
+    Tests for the adaptive concurrency limiter.
+    """
+    def test_aimd(self):
+        """
+        1. Fast successful responses raise the limit additively.
+        2. Throttling cuts the limit once per congestion event.
+        3. Queries through an API object are counted by the limiter.
+        """
+        import time
+        limiter = coinmetrics.AdaptiveLimiter(initial=2, maximum=8)
+
+        LOG.debug("\tTest 1: Additive increase")
+        for _ in range(20):
+            limiter.acquire()
+            limiter.release(time.monotonic(), 0.1, status=200)
+        self.assertGreater(limiter.snapshot()["limit"], 2)
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Multiplicative decrease")
+        before = limiter.limit
+        began = time.monotonic()
+        limiter.acquire()
+        limiter.acquire()
+        limiter.release(began, 0.0, status=429)
+        limiter.release(began, 0.0, status=429)
+        snapshot = limiter.snapshot()
+        self.assertEqual(snapshot["limit"], int(before * 0.5))
+        self.assertEqual(snapshot["counts"]["throttled"], 2)
+        self.assertEqual(snapshot["history"][-1][2], "throttled")
+        LOG.debug("\tTest 2: PASS")
+
+        LOG.debug("\tTest 3: API integration")
+        api = OfflineCommunity()
+        api.limiter = limiter
+        api.get_assets()
+        self.assertEqual(limiter.snapshot()["counts"]["requests"], 23)
+        self.assertEqual(api.calls[0][0], "assets")
+        self.assertEqual(limiter.snapshot()["inflight"], 0)
+        LOG.debug("\tTest 3: PASS")
+
+    def test_endpoint_baselines(self):
+        """
+        1. Fast catalog calls do not make slower data calls count as slow.
+        2. A data call slow for its own endpoint still cuts the limit.
+        """
+        import time
+        from coinmetrics.limiter import endpoint_kind
+        limiter = coinmetrics.AdaptiveLimiter(initial=8, maximum=16)
+        url = OfflineCommunity().host_url
+
+        LOG.debug("\tTest 1: Mixed endpoints")
+        for _ in range(50):
+            for endpoint, latency in (("assets", 0.05), ("metrics", 0.05),
+                                      ("assets/btc/metricdata", 0.5)):
+                limiter.acquire()
+                limiter.release(time.monotonic(), latency, status=200,
+                                kind=endpoint_kind(url + endpoint + "?metrics=PriceUSD"))
+        snapshot = limiter.snapshot()
+        self.assertEqual(snapshot["counts"]["slow"], 0)
+        self.assertEqual(snapshot["limit"], 16)
+        self.assertEqual(snapshot["baseline"]["metricdata"], 0.5)
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Slow data call")
+        limiter.acquire()
+        limiter.release(time.monotonic(), 2.0, status=200, kind="metricdata")
+        self.assertEqual(limiter.snapshot()["counts"]["slow"], 1)
+        self.assertEqual(limiter.snapshot()["limit"], 8)
+        LOG.debug("\tTest 2: PASS")
+
+    def test_deadline(self):
+        """
+        1. Waiting for a slot stops when the deadline expires.
+        2. Waiting for a slot stops when the deadline is cancelled.
+        """
+        import threading
+        from coinmetrics.deadline import Deadline, within
+        from coinmetrics.errors import DeadlineExceededError, RequestCancelledError
+        limiter = coinmetrics.AdaptiveLimiter(initial=1, maximum=1)
+        limiter.acquire()
+
+        LOG.debug("\tTest 1: Expired deadline")
+        with within(0.05), self.assertRaises(DeadlineExceededError):
+            limiter.acquire()
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Cancelled deadline")
+        deadline = Deadline()
+        threading.Timer(0.05, deadline.cancel).start()
+        with within(deadline), self.assertRaises(RequestCancelledError):
+            limiter.acquire()
+        self.assertEqual(limiter.snapshot()["inflight"], 1)
+        LOG.debug("\tTest 2: PASS")
+
+
+class ShapingTests(unittest.TestCase):
+    """
+    Tests for coverage-aware request shaping.
+    """
+    def test_shape(self):
+        """
+        1. Time ranges are clamped to the asset's coverage.
+        2. Windows are sized from the estimated payload.
+        3. Backfill plans with the shaper and fetches asset info once per asset.
+        """
+        api = OfflineCommunity()
+        shaper = coinmetrics.RequestShaper(api, target_bytes=600, row_bytes=20, value_bytes=20)
+
+        LOG.debug("\tTest 1: Clamping")
+        self.assertEqual(shaper.clamp("btc", "2018-06-01", "2019-01-05"), (1546300800, 1546646400))
+        self.assertIsNone(shaper.clamp("btc", "2018-06-01", "2018-07-01"))
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Window sizing")
+        self.assertEqual(shaper.window(2), 10)
+        requests = shaper.shape("btc", "PriceUSD,TxCnt,Unknown", "2018-01-01", "2020-01-01")
+        self.assertEqual([(metrics, (end - start) // 86400 + 1)
+                          for metrics, start, end in requests],
+                         [("PriceUSD,TxCnt", 10), ("PriceUSD,TxCnt", 10),
+                          ("PriceUSD,TxCnt", 10), ("PriceUSD,TxCnt", 1)])
+        LOG.debug("\tTest 2: PASS")
+
+        LOG.debug("\tTest 3: Backfill integration")
+        job = coinmetrics.Backfill(api, os.path.join(tempfile.mkdtemp(), "manifest"),
+                                   metrics=["PriceUSD", "TxCnt"], start="2015-01-01",
+                                   shaper=shaper)
+        self.assertEqual(len(job.plan()), 8)
+        self.assertEqual(len([call for call in api.calls if call[0] == "asset_info"]), 2)
+        LOG.debug("\tTest 3: PASS")
+
+
+class DeadlineTests(unittest.TestCase):
+    """
+    Tests for deadlines, cancellation and hedged requests.
+    """
+    def test_deadline(self):
+        """
+        1. Timeouts are shortened to the time remaining.
+        2. Expired and cancelled deadlines stop requests from starting.
+        3. Backfill runs propagate their deadline to the worker threads.
+        """
+        from coinmetrics import deadline
+
+        LOG.debug("\tTest 1: Timeouts")
+        self.assertEqual(deadline.timeout((3, 60)), (3, 60))
+        with deadline.within(10):
+            connect, read = deadline.timeout((3, 60))
+            self.assertEqual(connect, 3)
+            self.assertTrue(9 < read <= 10)
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Expired and cancelled deadlines")
+        api = OfflineCommunity()
+        with deadline.within(0):
+            with self.assertRaises(coinmetrics.errors.DeadlineExceededError):
+                api.get_assets()
+        with deadline.within(None) as cancelled:
+            cancelled.cancel()
+            with self.assertRaises(coinmetrics.errors.RequestCancelledError):
+                api.get_assets()
+        self.assertEqual(api.calls, [])
+        LOG.debug("\tTest 2: PASS")
+
+        LOG.debug("\tTest 3: Backfill deadline")
+        job = coinmetrics.Backfill(api, os.path.join(tempfile.mkdtemp(), "manifest"),
+                                   assets=["btc"], window=10)
+        units = job.plan()
+        summary = job.run(lambda unit, data: None, deadline=0)
+        self.assertEqual(summary["completed"], 0)
+        self.assertEqual(job.pending(), units)
+        LOG.debug("\tTest 3: PASS")
+
+    def test_hedging(self):
+        """
+        1. No duplicate is sent until enough latencies were observed.
+        2. A request slower than the threshold is duplicated and the fastest response wins.
+        """
+        import threading
+        hedger = coinmetrics.Hedger(percentile=50, min_samples=5)
+
+        LOG.debug("\tTest 1: Warm up")
+        for _ in range(5):
+            self.assertEqual(hedger.call(lambda: (200, b"fast")), (200, b"fast"))
+        self.assertEqual(hedger.hedged, 0)
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Hedged request")
+        stuck = threading.Event()
+        attempts = []
+
+        def fetch():
+            attempts.append(1)
+            if len(attempts) == 1:
+                stuck.wait(5)
+                return 200, b"slow"
+            return 200, b"fast"
+        self.assertEqual(hedger.call(fetch), (200, b"fast"))
+        self.assertEqual(hedger.hedged, 1)
+        stuck.set()
+        LOG.debug("\tTest 2: PASS")
+
+
+class ResilienceTests(unittest.TestCase):
+    """
+    Tests for stale-while-revalidate serving and the circuit breaker.
+    """
+    def test_stale_while_revalidate(self):
+        """
+        1. Expired responses are served stale and refreshed in the background.
+        2. A stale response is served when the API is down.
+        """
+        from coinmetrics import resilience
+        api = OfflineCommunity()
+        api.cache = coinmetrics.ResilientCache(ttl=0, max_stale=3600)
+
+        LOG.debug("\tTest 1: Background refresh")
+        assets = api.get_assets()
+        self.assertFalse(resilience.was_stale())
+        self.assertEqual(api.get_assets(), assets)
+        self.assertTrue(resilience.was_stale())
+        api.cache.executor.shutdown(wait=True)
+        self.assertEqual(len(api.calls), 2)
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Outage")
+        api.cache.max_stale = 0
+
+        def down(request_url):
+            raise coinmetrics.errors.CircuitOpenError(request_url)
+        api._fetch = down  # pylint: disable=W0212
+        self.assertEqual(api.get_assets(), assets)
+        self.assertTrue(resilience.was_stale())
+        self.assertEqual(api.cache.stale_served, 2)
+        LOG.debug("\tTest 2: PASS")
+
+    def test_circuit_breaker(self):
+        """
+        1. Consecutive failures open the circuit and requests fail fast.
+        2. After the reset timeout a successful probe closes the circuit.
+        """
+        import time
+        breaker = coinmetrics.CircuitBreaker(failures=2, reset_timeout=0.05)
+        calls = []
+
+        def fetch(status):
+            calls.append(status)
+            return status, b""
+
+        LOG.debug("\tTest 1: Open")
+        breaker.call(fetch, 503)
+        self.assertEqual(breaker.state, breaker.CLOSED)
+        breaker.call(fetch, 429)
+        self.assertEqual(breaker.state, breaker.OPEN)
+        with self.assertRaises(coinmetrics.errors.CircuitOpenError):
+            breaker.call(fetch, 200)
+        self.assertEqual(calls, [503, 429])
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Half-open probe")
+        time.sleep(0.06)
+        breaker.call(fetch, 503)
+        self.assertEqual(breaker.state, breaker.OPEN)
+        time.sleep(0.06)
+        self.assertEqual(breaker.call(fetch, 200), (200, b""))
+        self.assertEqual(breaker.state, breaker.CLOSED)
+        LOG.debug("\tTest 2: PASS")
+
+
+class RefresherTests(unittest.TestCase):
+    """
+    Tests for the background refresher.
+    """
+    def test_refresher(self):
+        """
+        1. The first refresh fills the ring buffers up to the current interval.
+        2. Later refreshes only fetch from the last point held.
+        3. Polls are scheduled after each interval boundary.
+        """
+        from coinmetrics.intervals import to_epoch
+        now = to_epoch("2019-01-31T00:30:00.000Z")
+        api = OfflineCommunity()
+        refresher = coinmetrics.Refresher(api, {"btc": "PriceUSD,TxCnt"}, capacity=5,
+                                          delay=600, clock=lambda: now)
+
+        LOG.debug("\tTest 1: Initial fill")
+        self.assertEqual(refresher.refresh(), {"btc": 10})
+        latest = refresher.latest("btc", "PriceUSD")
+        self.assertEqual([epoch for epoch, _ in latest],
+                         [to_epoch("2019-01-%02d" % day) for day in range(27, 32)])
+        self.assertEqual(latest[-1][1], OfflineCommunity.value("btc", "PriceUSD", latest[-1][0]))
+        self.assertEqual(refresher.latest("btc", "TxCnt", 2),
+                         refresher.latest("btc", "TxCnt")[-2:])
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Incremental refresh")
+        self.assertEqual(refresher.refresh(), {"btc": 0})
+        self.assertEqual(api.calls[-1][1]["start"], "2019-01-31T00:00:00.000Z")
+        self.assertEqual(len(refresher.latest("btc", "PriceUSD")), 5)
+        LOG.debug("\tTest 2: PASS")
+
+        LOG.debug("\tTest 3: Schedule")
+        self.assertEqual(refresher.next_run(), to_epoch("2019-02-01T00:10:00.000Z"))
+        self.assertEqual(refresher.next_run(now - 1500), to_epoch("2019-01-31T00:10:00.000Z"))
+        LOG.debug("\tTest 3: PASS")
+
+
+class FixedPointTests(unittest.TestCase):
+    """
+    Tests for exact fixed-point columns.
+    """
+    def test_fixed(self):
+        """
+        1. Columns round trip the API values exactly.
+        2. Arithmetic is exact and scales are aligned.
+        3. Results that do not fit in int64 raise.
+        4. Values too precise for the column's scale are rounded half to even.
+        """
+        import numpy as np
+        api = OfflineCommunity()
+        data = api.get_asset_metric_data("btc", "PriceUSD,TxCnt", "2019-01-01", "2019-01-02",
+                                         "hour")
+
+        LOG.debug("\tTest 1: Round trip")
+        fixed = coinmetrics.cm_to_fixed(data)
+        price = fixed["columns"]["PriceUSD"]
+        self.assertEqual(price.scale, 2)
+        self.assertEqual(price.to_decimal(), [row["values"][0] for row in data["series"]])
+        self.assertEqual(list(fixed["time"]), list(coinmetrics.cm_to_numpy(data)["time"]))
+        column = coinmetrics.FixedColumn.parse([Decimal("0.1"), None, "-2.005"])
+        self.assertEqual(column.to_decimal(), [Decimal("0.1"), None, Decimal("-2.005")])
+        self.assertTrue(np.isnan(column.to_float()[1]))
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Arithmetic")
+        self.assertEqual((column + column).sum(), Decimal("-3.810"))
+        self.assertEqual((column - Decimal("0.0001"))[0], Decimal("0.0999"))
+        self.assertEqual((column * column)[2], Decimal("4.020025"))
+        self.assertEqual(column.rescale(2).to_decimal(), [Decimal("0.10"), None, Decimal("-2.00")])
+        self.assertEqual(price.sum(), sum(row["values"][0] for row in data["series"]))
+        LOG.debug("\tTest 2: PASS")
+
+        LOG.debug("\tTest 3: Overflow")
+        with self.assertRaises(OverflowError):
+            coinmetrics.FixedColumn.parse(["1234567890123456.789"], scale=3)
+        with self.assertRaises(OverflowError):
+            coinmetrics.FixedColumn.parse(["1234567890123456789012"])
+        large = coinmetrics.FixedColumn.parse(["123456789012.345"])
+        with self.assertRaises(OverflowError):
+            large * large
+        LOG.debug("\tTest 3: PASS")
+
+        LOG.debug("\tTest 4: Mixed magnitudes are rounded half to even")
+        column = coinmetrics.FixedColumn.parse(["0.000103420718316463", "12.5",
+                                                "1234567890123456.789", None])
+        self.assertEqual(column.scale, 2)
+        self.assertEqual(column.to_decimal(), [Decimal("0.00"), Decimal("12.50"),
+                                               Decimal("1234567890123456.79"), None])
+        column = coinmetrics.FixedColumn.parse(["0.000103420718316463", "12.5"])
+        self.assertEqual(column.scale, 16)
+        self.assertEqual(column[0], Decimal("0.0001034207183165"))
+        column = coinmetrics.FixedColumn.parse(["0.125", "0.135", "-0.125", "0.1251"], scale=2)
+        self.assertEqual(column.to_decimal(), [Decimal("0.12"), Decimal("0.14"),
+                                               Decimal("-0.12"), Decimal("0.13")])
+        data = {"metrics": ["PriceUSD"], "series": [
+            {"time": "2019-01-01T00:00:00.000Z", "values": ["3843.520426"]},
+            {"time": "2019-01-02T00:00:00.000Z", "values": ["0.000103420718316463"]}]}
+        price = coinmetrics.cm_to_fixed(data, scale=4)["columns"]["PriceUSD"]
+        self.assertEqual(price.to_decimal(), [Decimal("3843.5204"), Decimal("0.0001")])
+        LOG.debug("\tTest 4: PASS")
+
+
+class MetadataIndexTests(unittest.TestCase):
+    """
+    Tests for the metadata index.
+    """
+    def test_metadata_index(self):
+        """
+        1. Entries are looked up by ID and related through the inverted maps.
+        2. Coverage queries return the entries covering a whole range.
+        3. The checkers validate against the index without requests.
+        """
+        api = OfflineCommunity()
+        index = coinmetrics.MetadataIndex(api).load()
+
+        LOG.debug("\tTest 1: Lookups")
+        self.assertEqual(index.get("assets", "btc")["id"], "btc")
+        self.assertIsNone(index.get("markets", "nope"))
+        self.assertIn(("metrics", "TxCnt"), index)
+        self.assertEqual(index.exchanges_for_asset("btc"), {"coinbase", "kraken"})
+        self.assertEqual(index.markets_by_quote("usd"),
+                         {"coinbase-btc-usd-spot", "kraken-btc-usd-spot"})
+        self.assertEqual(index.markets_by_exchange("kraken"),
+                         {"kraken-btc-usd-spot", "kraken-eth-btc-spot"})
+        self.assertEqual(index.assets_with_metric("PriceUSD"), {"btc", "eth"})
+        self.assertEqual(index.metrics_by_category("Fees"), {"FeeMeanUSD"})
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Coverage")
+        self.assertEqual(index.coverage("markets", "kraken-btc-usd-spot"),
+                         (1546300800, 1546300800 + 10 * 86400))
+        self.assertEqual(index.covering("markets", "2019-01-05", "2019-01-11"),
+                         ["kraken-btc-usd-spot", "kraken-eth-btc-spot"])
+        self.assertEqual(index.covering("assets", "2018-12-31", "2019-01-02"), [])
+        LOG.debug("\tTest 2: PASS")
+
+        LOG.debug("\tTest 3: Checkers")
+        api.metadata = index
+        api.calls = []
+        api.asset_checker("btc,eth")
+        api.metric_checker("PriceUSD")
+        api.market_checker("kraken-eth-btc-spot")
+        api.asset_metric_checker("eth", "TxCnt,FeeMeanUSD")
+        with self.assertRaises(coinmetrics.errors.InvalidExchangeError):
+            api.exchange_checker("binance")
+        with self.assertRaises(coinmetrics.errors.InvalidMetricError):
+            api.asset_metric_checker("btc", "SplyCur")
+        self.assertEqual(api.calls, [])
+        LOG.debug("\tTest 3: PASS")
+
+
+class InfoBatcherTests(unittest.TestCase):
+    """
+    Tests for batched info fetching.
+    """
+    def test_info_batcher(self):
+        """
+        1. Subsets are split into URL-safe groups and merged in the requested order.
+        2. IDs are validated against a catalog fetched once.
+        """
+        api = OfflineCommunity()
+        base = len(api._request_url("market_info", {"subset": ""}))  # pylint: disable=W0212
+        batcher = coinmetrics.InfoBatcher(api, max_length=base + 45)
+        markets = list(reversed(OfflineCommunity.MARKETS))
+
+        LOG.debug("\tTest 1: Groups")
+        groups = batcher.groups("market_info", markets)
+        self.assertEqual(len(groups), 2)
+        self.assertEqual(",".join(groups), ",".join(markets))
+        infos = batcher.market_info(markets + markets[:1])
+        self.assertEqual([info["id"] for info in infos], markets + markets[:1])
+        self.assertEqual([call[0] for call in api.calls].count("market_info"), 2)
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Validation")
+        self.assertEqual([info["id"] for info in batcher.asset_info("eth,btc")], ["eth", "btc"])
+        with self.assertRaises(coinmetrics.errors.InvalidMarketError):
+            batcher.market_info(["kraken-xrp-usd-spot"])
+        self.assertEqual([call[0] for call in api.calls].count("markets"), 1)
+        LOG.debug("\tTest 2: PASS")
+
+
+class StreamingStatsTests(unittest.TestCase):
+    """
+    Tests for streaming statistics.
+    """
+    def test_streaming_stats(self):
+        """
+        1. Batched summaries match the statistics of the whole range.
+        2. Summaries of separate chunks merge into the summary of the whole.
+        3. Quantiles are within the sketch accuracy.
+        """
+        import numpy as np
+        api = OfflineCommunity()
+        data = api.get_asset_metric_data("btc", "PriceUSD,TxCnt", "2019-01-01", "2019-01-31",
+                                         "hour")
+        data["series"][10]["values"][0] = None
+        values = coinmetrics.cm_to_numpy(data)["values"][:, 0]
+        present = values[~np.isnan(values)]
+
+        LOG.debug("\tTest 1: Batches")
+        stats = coinmetrics.StreamingStats()
+        for offset in range(0, len(data["series"]), 100):
+            stats.update({"metrics": data["metrics"],
+                          "series": data["series"][offset:offset + 100]})
+        result = stats.result()["PriceUSD"]
+        self.assertEqual((result["count"], result["nulls"]), (len(present), 1))
+        self.assertAlmostEqual(result["mean"], present.mean())
+        self.assertAlmostEqual(result["variance"], present.var(ddof=1))
+        self.assertEqual((result["min"], result["max"]), (present.min(), present.max()))
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Merge")
+        first, second = coinmetrics.StreamingStats(), coinmetrics.StreamingStats()
+        first.update({"metrics": data["metrics"], "series": data["series"][:250]})
+        second.update({"metrics": data["metrics"], "series": data["series"][250:]})
+        first.merge(second)
+        merged = first.result()["PriceUSD"]
+        for key in ("count", "nulls", "min", "max", "p50"):
+            self.assertEqual(merged[key], result[key])
+        self.assertAlmostEqual(merged["variance"], result["variance"])
+        LOG.debug("\tTest 2: PASS")
+
+        LOG.debug("\tTest 3: Quantiles")
+        for fraction in (0.01, 0.5, 0.99):
+            exact = np.quantile(present, fraction, method="lower")
+            estimate = result["p{:g}".format(fraction * 100)]
+            self.assertLessEqual(abs(estimate - exact), 0.01 * exact)
+        LOG.debug("\tTest 3: PASS")
+
+
+class CorrelationTests(unittest.TestCase):
+    """
+    Tests for cross-asset covariance and correlation.
+    """
+    def test_correlation(self):
+        """
+        1. Panels align several assets on one time axis.
+        2. Full matrices match pandas pairwise-complete estimates.
+        3. Rolling and incremental matrices match the matrix of each window.
+        """
+        import numpy as np
+        from coinmetrics import correlation
+        api = OfflineCommunity()
+
+        LOG.debug("\tTest 1: Panel")
+        panel = correlation.panel(api, ["btc", "eth"], "PriceUSD", "2019-01-01", "2019-01-10")
+        self.assertEqual(panel["values"].shape, (10, 2))
+        self.assertEqual(panel["values"][0, 1], float(OfflineCommunity.value(
+            "eth", "PriceUSD", int(panel["time"][0]))))
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Full matrices")
+        values = np.random.default_rng(1).normal(size=(120, 4)).cumsum(axis=0) + 50
+        values[np.random.default_rng(2).random(values.shape) < 0.1] = np.nan
+        changes = correlation.returns(values)
+        frame = pd.DataFrame(changes)
+        np.testing.assert_allclose(correlation.correlation(changes), frame.corr(), atol=1e-12)
+        np.testing.assert_allclose(correlation.covariance(changes), frame.cov(), atol=1e-12)
+        LOG.debug("\tTest 2: PASS")
+
+        LOG.debug("\tTest 3: Rolling and incremental")
+        rolled = correlation.rolling(changes, 30, min_periods=20)
+        self.assertEqual(rolled.shape, (len(changes) - 29, 4, 4))
+        np.testing.assert_allclose(rolled[-1], correlation.correlation(changes[-30:], 20),
+                                   atol=1e-10)
+        chunked = correlation.rolling(changes, 30, min_periods=20, kind="covariance", chunk=7)
+        for k in range(len(chunked)):
+            np.testing.assert_allclose(chunked[k], correlation.covariance(changes[k:k + 30],
+                                                                          min_periods=20),
+                                       atol=1e-10)
+        incremental = coinmetrics.IncrementalCorrelation(4, window=30, min_periods=20)
+        incremental.update(changes[:-1])
+        incremental.update(changes[-1])
+        np.testing.assert_allclose(incremental.correlation(), rolled[-1], atol=1e-10)
+        LOG.debug("\tTest 3: PASS")
+
+
+class AsOfTests(unittest.TestCase):
+    """
+    Tests for as-of lookups.
+    """
+    def test_asof(self):
+        """
+        1. Each query matches the latest point at or before it, skipping nulls.
+        2. Tolerances and queries before the first point leave no match.
+        3. Binary series files and store cells give the same answers.
+        """
+        import numpy as np
+        from coinmetrics.asof import NOT_FOUND, lookup, store_series
+        from coinmetrics.binary import write_metric_data
+        from coinmetrics.intervals import to_epoch
+        api = OfflineCommunity()
+        data = api.get_asset_metric_data("btc", "PriceUSD,TxCnt", "2019-01-01", "2019-01-10")
+        data["series"][3]["values"][1] = None
+        day = 86400
+        base = to_epoch("2019-01-04")
+        queries = [base - 1, base, base + day // 2, to_epoch("2018-12-31"), base + 30 * day]
+
+        LOG.debug("\tTest 1: Matches")
+        result = lookup(data, queries)
+        self.assertEqual(result["metrics"], ["PriceUSD", "TxCnt"])
+        self.assertEqual(list(result["time"][:3, 0]), [base - day, base, base])
+        self.assertEqual(list(result["time"][:3, 1]), [base - day] * 3)
+        self.assertEqual(result["values"][1, 0],
+                         float(OfflineCommunity.value("btc", "PriceUSD", base)))
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: No match")
+        self.assertFalse(result["found"][3].any())
+        self.assertEqual(result["time"][3, 0], NOT_FOUND)
+        self.assertTrue(result["found"][4].all())
+        self.assertFalse(lookup(data, queries, tolerance=day)["found"][4].any())
+        strict = lookup(data, queries, skip_missing=False)
+        self.assertTrue(np.isnan(strict["values"][1, 1]))
+        LOG.debug("\tTest 2: PASS")
+
+        LOG.debug("\tTest 3: Binary series and store")
+        series = write_metric_data(tempfile.mkdtemp(), "btc", data)["PriceUSD"]
+        np.testing.assert_array_equal(series.asof(queries)["values"], result["values"][:, 0])
+        store = coinmetrics.SeriesStore()
+        store.put("btc", data, to_epoch("2019-01-01"), to_epoch("2019-01-10"))
+        times, values = store_series(store, "btc", "TxCnt")
+        np.testing.assert_array_equal(coinmetrics.asof.asof(times, values, queries)["time"],
+                                      result["time"][:, 1])
+        LOG.debug("\tTest 3: PASS")
+
+
+class DownsampleTests(unittest.TestCase):
+    """
+    Tests for LTTB and envelope downsampling.
+    """
+    def test_downsample(self):
+        """
+        1. LTTB keeps the requested number of points, including the first and last.
+        2. Envelopes hold the minimum and maximum of each bucket.
+        3. Data objects and series files are downsampled per metric.
+        """
+        import numpy as np
+        from coinmetrics.binary import write_metric_data
+        from coinmetrics.downsample import downsample, envelope, lttb
+        times = np.arange(1000, dtype=np.int64) * 3600
+        values = np.sin(np.arange(1000) / 25.0) * 100
+        values[500] = 1000
+        values[10] = np.nan
+
+        LOG.debug("\tTest 1: LTTB")
+        kept_times, kept = lttb(times, values, 100)
+        self.assertEqual(len(kept_times), 100)
+        self.assertEqual((kept_times[0], kept_times[-1]), (times[0], times[-1]))
+        self.assertTrue(np.all(np.diff(kept_times) > 0))
+        self.assertIn(1000, kept)
+        self.assertFalse(np.isnan(kept).any())
+        self.assertEqual(len(lttb(times[:50], values[:50], 100)[0]), 49)
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Envelope")
+        starts, minimum, maximum = envelope(times, values, 10)
+        self.assertEqual(list(starts), list(times[::100]))
+        self.assertEqual(maximum[5], 1000)
+        np.testing.assert_array_equal(minimum, np.nanmin(values.reshape(10, 100), axis=1))
+        LOG.debug("\tTest 2: PASS")
+
+        LOG.debug("\tTest 3: Data objects and series files")
+        api = OfflineCommunity()
+        data = api.get_asset_metric_data("btc", "PriceUSD,TxCnt", "2019-01-01", "2019-01-31",
+                                         "hour")
+        result = downsample(data, 200, buckets=50)
+        self.assertEqual(sorted(result), ["PriceUSD", "TxCnt"])
+        self.assertEqual((len(result["TxCnt"]["time"]), len(result["TxCnt"]["max"])), (200, 50))
+        series = write_metric_data(tempfile.mkdtemp(), "btc", data, "hour")["TxCnt"]
+        np.testing.assert_array_equal(lttb(*series.range(0, 2 ** 40), 200)[0],
+                                      result["TxCnt"]["time"])
+        LOG.debug("\tTest 3: PASS")
+
+
+class SQLSinkTests(unittest.TestCase):
+    """
+    Tests for the bulk SQL sink.
+    """
+    def test_sql_sink(self):
+        """
+        1. SQLite export loads one row per cell.
+        2. Rewritten cells are upserted instead of duplicated.
+        3. Streamed rows are loaded in batches.
+        4. Existing rows are kept unless the table is replaced explicitly.
+        """
+        import sqlite3
+        from coinmetrics.cli import parse_args, export
+        from coinmetrics.sinks import SQLSink
+        output = os.path.join(tempfile.mkdtemp(), "out.sqlite")
+
+        LOG.debug("\tTest 1: SQLite export")
+        args = parse_args(["export", "--assets", "btc", "--metrics", "PriceUSD,TxCnt",
+                           "--start", "2019-01-01", "--end", "2019-01-10",
+                           "--format", "sqlite", "--output", output])
+        self.assertEqual(export(args, OfflineCommunity()), 0)
+        with sqlite3.connect(output) as connection:
+            self.assertEqual(connection.execute("SELECT COUNT(*) FROM metric_data").fetchone(),
+                             (20,))
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Upsert")
+        sink = SQLSink(output, batch_size=3)
+        data = OfflineCommunity().get_asset_metric_data("btc", "PriceUSD", "2019-01-01",
+                                                        "2019-01-01")
+        data["series"][0]["values"][0] = Decimal("0.1")
+        self.assertEqual(sink.write("btc", data), 1)
+        LOG.debug("\tTest 2: PASS")
+
+        LOG.debug("\tTest 3: Streamed rows")
+        records = [("eth", "2019-01-%02dT00:00:00.000Z" % day, "TxCnt", day)
+                   for day in range(1, 8)] + [("eth", "2019-01-08T00:00:00.000Z", "TxCnt", None)]
+        self.assertEqual(sink.write_rows(iter(records)), 8)
+        sink.close()
+        with sqlite3.connect(output) as connection:
+            self.assertEqual(connection.execute("SELECT COUNT(*) FROM metric_data").fetchone(),
+                             (28,))
+            self.assertEqual(connection.execute(
+                "SELECT value FROM metric_data WHERE asset = 'btc' AND metric = 'PriceUSD' "
+                "ORDER BY time LIMIT 1").fetchone(), ("0.1",))
+        LOG.debug("\tTest 3: PASS")
+
+        LOG.debug("\tTest 4: Replacing the table")
+        SQLSink(output).close()
+        with sqlite3.connect(output) as connection:
+            self.assertEqual(connection.execute("SELECT COUNT(*) FROM metric_data").fetchone(),
+                             (28,))
+        SQLSink(output, append=False).close()
+        with sqlite3.connect(output) as connection:
+            self.assertEqual(connection.execute("SELECT COUNT(*) FROM metric_data").fetchone(),
+                             (0,))
+        LOG.debug("\tTest 4: PASS")
+
+
+class PipelineTests(unittest.TestCase):
+    """
+    Tests for the streaming pipeline.
+    """
+    def test_pipeline(self):
+        """
+        1. Every chunk is transformed and written to every sink.
+        2. A slow sink bounds the chunks fetched ahead of it.
+        3. A failing sink stops the pipeline and raises.
+        """
+        import time
+        from coinmetrics.pipeline import CallbackSink, drop_nulls
+        from coinmetrics.sinks import CSVSink
+        api = OfflineCommunity()
+        received = []
+
+        def slow(asset, data):
+            time.sleep(0.005)
+            received.append((asset, sum(call[0].endswith("/metricdata") for call in api.calls)))
+
+        LOG.debug("\tTest 1: Transforms and sinks")
+        output = os.path.join(tempfile.mkdtemp(), "out.csv")
+        csv_sink = CSVSink(output)
+        pipeline = coinmetrics.Pipeline(api, [csv_sink, CallbackSink(slow)],
+                                        transforms=[drop_nulls], workers=4, buffer=1, window=2)
+        requests = pipeline.plan(["btc", "eth"], "PriceUSD,TxCnt", "2019-01-01", "2019-01-31")
+        summary = pipeline.run(requests)
+        csv_sink.close()
+        self.assertEqual(summary["chunks"], len(requests))
+        self.assertEqual(summary["rows"], [2 * 31 * 2, 2 * 31])
+        self.assertEqual(summary["failed"], [])
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Backpressure")
+        ahead = [calls - written for written, (_, calls) in enumerate(received, 1)]
+        self.assertLessEqual(max(ahead), 4 + 2 * 1 + 2)
+        LOG.debug("\tTest 2: PASS")
+
+        LOG.debug("\tTest 3: Failing sink")
+
+        def broken(asset, data):
+            raise IOError("disk full")
+        pipeline = coinmetrics.Pipeline(OfflineCommunity(), [CallbackSink(broken)], buffer=1)
+        with self.assertRaises(IOError):
+            pipeline.run(requests)
+        LOG.debug("\tTest 3: PASS")
+
+
+class BoundedBatchTests(unittest.TestCase):
+    """
+    Tests for memory-bounded batches.
+    """
+    def test_bounded_batch(self):
+        """
+        1. Every request is yielded with the same data as a direct call.
+        2. The byte budget bounds the results fetched ahead of the consumer.
+        3. Oversized and failed requests do not stall the batch.
+        """
+        import time
+        api = OfflineCommunity()
+        requests = [(asset, "PriceUSD,TxCnt", "2019-01-{:02d}".format(day),
+                     "2019-01-{:02d}".format(day + 1))
+                    for asset in ("btc", "eth") for day in range(1, 30, 2)]
+
+        LOG.debug("\tTest 1: Results")
+        batch = coinmetrics.BoundedBatch(api, workers=4)
+        results = dict(batch.iterate(requests))
+        self.assertEqual(sorted(results), sorted(requests))
+        for request in requests:
+            self.assertEqual(results[request], api.get_asset_metric_data(*request))
+        LOG.debug("\tTest 1: PASS")
+
+        LOG.debug("\tTest 2: Budget")
+        api = OfflineCommunity()
+        batch = coinmetrics.BoundedBatch(api, workers=4)
+        size = batch.estimate(requests[0])
+        batch.max_bytes = 2 * size
+        ahead = []
+        for consumed, _ in enumerate(batch.iterate(requests)):
+            time.sleep(0.002)
+            fetched = sum(call[0].endswith("/metricdata") for call in api.calls)
+            ahead.append(fetched - consumed)
+        self.assertLessEqual(max(ahead), 2)
+        self.assertLessEqual(batch.peak, 2 * size)
+        LOG.debug("\tTest 2: PASS")
+
+        LOG.debug("\tTest 3: Oversized and failed requests")
+        batch.max_bytes = size // 2
+        received = []
+        summary = batch.run(requests[:3] + [("xyz", "PriceUSD", "2019-01-01", "2019-01-02")],
+                            lambda request, data: received.append(request))
+        self.assertEqual(summary["completed"], 3)
+        self.assertEqual(sorted(received), sorted(requests[:3]))
+        self.assertEqual([request[0] for request, _ in summary["failed"]], ["xyz"])
+        LOG.debug("\tTest 3: PASS")
+
+
 if __name__ == '__main__':
     unittest.main(verbosity=2)